@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+CyberGuard AI - Auth Check Benchmark
+Measures session verification (the check behind every authenticated
+request) with a fresh SQLite connection per call, as the Database class
+used to do, against its persistent per-thread connections, with and
+without the in-process session cache.
+
+Usage:
+    python benchmarks/bench_auth.py [--sessions 500] [--calls 20000] [--threads 8]
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import logging
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List
+
+# Add the source directory to the path to allow imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from utils.database import Database
+
+
+def verify_per_call(db_path: str, token: str):
+    """Session check as it was done before connections were kept open."""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        SELECT s.id, s.user_id, s.expires_at, u.email, u.fullname
+        FROM sessions s
+        JOIN users u ON s.user_id = u.id
+        WHERE s.token = ?
+        """,
+        (token,)
+    )
+    session = cursor.fetchone()
+    conn.close()
+    if not session or datetime.fromisoformat(session[2]) < datetime.now():
+        return None
+    return session
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def measure(check: Callable[[str], object], tokens: List[str], calls: int, threads: int) -> Dict:
+    """
+    Run session checks from a pool of threads.
+
+    Args:
+        check: Function verifying one token
+        tokens: Valid tokens, used in turn
+        calls: Total number of checks
+        threads: Number of concurrent threads
+
+    Returns:
+        Dictionary with throughput and p50/p99 latency
+    """
+    latencies: List[float] = []
+    lock = threading.Lock()
+    clock = time.perf_counter
+
+    def worker(offset: int) -> None:
+        local = []
+        for index in range(offset, calls, threads):
+            start = clock()
+            if check(tokens[index % len(tokens)]) is None:
+                raise RuntimeError("Valid session was rejected")
+            local.append(clock() - start)
+        with lock:
+            latencies.extend(local)
+
+    began = clock()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for future in [pool.submit(worker, offset) for offset in range(threads)]:
+            future.result()
+    elapsed = clock() - began
+    latencies.sort()
+
+    return {
+        "threads": threads,
+        "calls": calls,
+        "throughput_per_s": round(calls / elapsed, 1),
+        "p50_us": round(percentile(latencies, 0.50) * 1e6, 1),
+        "p99_us": round(percentile(latencies, 0.99) * 1e6, 1),
+    }
+
+
+def main():
+    """Run the benchmark and print the results"""
+    parser = argparse.ArgumentParser(description="Benchmark session verification")
+    parser.add_argument("--sessions", type=int, default=500, help="Number of sessions in the database")
+    parser.add_argument("--calls", type=int, default=20000, help="Checks per case")
+    parser.add_argument("--threads", type=int, default=8, help="Threads of the concurrent cases")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, "auth.db")
+        db = Database(db_path, session_cache_size=0)
+        cached = Database(db_path, session_cache_size=args.sessions)
+        db.create_user("bench@example.com", "Bench User", "correct horse battery staple")
+        user = db.verify_user("bench@example.com", "correct horse battery staple")
+        tokens = [db.create_session(user["id"])["token"] for _ in range(args.sessions)]
+
+        results = {}
+        for threads in sorted({1, args.threads}):
+            results[f"per_call_connect.threads_{threads}"] = measure(
+                lambda token: verify_per_call(db_path, token), tokens, args.calls, threads
+            )
+            results[f"persistent.threads_{threads}"] = measure(db.verify_session, tokens, args.calls, threads)
+            results[f"session_cache.threads_{threads}"] = measure(cached.verify_session, tokens, args.calls, threads)
+        db.close()
+        cached.close()
+
+    for threads in sorted({1, args.threads}):
+        before = results[f"per_call_connect.threads_{threads}"]["throughput_per_s"]
+        for case in ("persistent", "session_cache"):
+            after = results[f"{case}.threads_{threads}"]["throughput_per_s"]
+            results[f"speedup.{case}.threads_{threads}"] = round(after / before, 1)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+CyberGuard AI - Blocklist Benchmark
+Generates a synthetic blocklist file and reports load time, memory per
+million entries and lookup throughput of DomainBlocklist.
+
+Usage:
+    python benchmarks/bench_blocklist.py [--entries 1000000]
+"""
+
+import os
+import sys
+import time
+import random
+import string
+import argparse
+import tempfile
+import tracemalloc
+
+# Add the source directory to the path to allow imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from core.blocklist import DomainBlocklist
+
+TLDS = ["com", "net", "org", "info", "xyz", "online", "ru", "cn", "top", "co.uk"]
+
+
+def random_domain(rng: random.Random) -> str:
+    """Generate a plausible random domain name."""
+    labels = rng.randint(1, 3)
+    name = ".".join(
+        "".join(rng.choices(string.ascii_lowercase + string.digits + "-", k=rng.randint(4, 14))).strip("-") or "x"
+        for _ in range(labels)
+    )
+    return f"{name}.{rng.choice(TLDS)}"
+
+
+def main():
+    """Run the benchmark and print the results"""
+    parser = argparse.ArgumentParser(description="Benchmark the offline blocklist index")
+    parser.add_argument("--entries", type=int, default=1_000_000, help="Number of blocklist entries")
+    parser.add_argument("--lookups", type=int, default=200_000, help="Number of lookups to time")
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    domains = [random_domain(rng) for _ in range(args.entries)]
+
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        path = f.name
+        for index, domain in enumerate(domains):
+            # Mix the supported formats: plain, hosts-file and URL prefixes
+            if index % 10 == 0:
+                f.write(f"0.0.0.0 {domain}\n")
+            elif index % 10 == 1:
+                f.write(f"https://{domain}/login/\n")
+            else:
+                f.write(f"{domain}\n")
+
+    try:
+        start = time.perf_counter()
+        blocklist = DomainBlocklist.load([path])
+        load_time = time.perf_counter() - start
+
+        # Measure memory on a second load, as tracing slows loading down
+        del blocklist
+        tracemalloc.start()
+        blocklist = DomainBlocklist.load([path])
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        os.remove(path)
+
+    hits = [f"https://login.{domain}/account" for domain in rng.sample(domains, min(len(domains), args.lookups // 2))]
+    misses = [f"https://{random_domain(rng)}/account" for _ in range(args.lookups // 2)]
+    lookups = hits + misses
+    rng.shuffle(lookups)
+
+    start = time.perf_counter()
+    found = sum(1 for url in lookups if blocklist.match_url(url))
+    lookup_time = time.perf_counter() - start
+
+    per_million = 1_000_000 / max(len(blocklist), 1)
+    print(f"entries:              {len(blocklist):,}")
+    print(f"load time:            {load_time:.2f} s ({load_time * per_million:.2f} s per million)")
+    print(f"index memory:         {blocklist.memory_bytes() / 2**20:.1f} MiB "
+          f"({blocklist.memory_bytes() * per_million / 2**20:.1f} MiB per million)")
+    print(f"retained after load:  {current / 2**20:.1f} MiB (peak while loading {peak / 2**20:.1f} MiB)")
+    print(f"lookups:              {len(lookups):,} in {lookup_time:.2f} s "
+          f"({lookup_time / len(lookups) * 1e6:.2f} us each, {found:,} matched)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+CyberGuard AI - Chat Load Benchmark
+Sends concurrent chat messages through OpenRouterCyberGuardBot against the
+local fake completions server, once with the blocking chat() called from
+the event loop (as the API server used to do), once with achat() and once
+streamed with astream_chat(). For every mode it reports when users saw the
+first words of the reply as well as the whole reply.
+
+Usage:
+    python benchmarks/bench_chat.py [--users 50] [--latency 0.2] [--token-delay 0.02] [--concurrency 16]
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+from typing import Dict, List
+
+PORT = 8098
+
+# Talk to the fake server only, without VirusTotal lookups
+os.environ["OPENROUTER_API_URL"] = f"http://127.0.0.1:{PORT}/api/v1"
+os.environ["OPENROUTER_API_KEY"] = "fake-key"
+os.environ["VIRUSTOTAL_API_KEY"] = ""
+
+# Add the source directory to the path to allow imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from models.openrouter import OpenRouterCyberGuardBot
+from utils.model_router import ModelRouter
+from utils.openrouter_client import OpenRouterClient
+from fake_openrouter import serve
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+async def run_users(mode: str, users: int, client: OpenRouterClient) -> Dict:
+    """
+    Let every user send one message at the same time.
+
+    Args:
+        mode: "blocking" (chat() on the event loop), "async" (achat()) or "stream" (astream_chat())
+        users: Number of concurrent users
+        client: Client shared by the users' chatbots
+
+    Returns:
+        Dictionary with throughput and per-message latency
+    """
+    router = ModelRouter(client, fallback_models=[], hedge=False)
+    bots = []
+    for _ in range(users):
+        bot = OpenRouterCyberGuardBot(enable_threat_detection=False)
+        bot.router = router
+        bots.append(bot)
+    latencies: List[float] = []
+    first_words: List[float] = []
+
+    async def user(bot: OpenRouterCyberGuardBot, number: int) -> None:
+        # Every user sends at the same moment; latency counts from then, so time
+        # spent waiting for a blocked event loop is included
+        await asyncio.sleep(0)
+        message = f"Is this link safe? http://example.com/{number}"
+        if mode == "stream":
+            first = None
+            async for _ in bot.astream_chat(message, max_tokens=64):
+                if first is None:
+                    first = time.perf_counter() - began
+            first_words.append(first)
+            reply = bot.history[-1]["content"]
+        elif mode == "blocking":
+            reply = bot.chat(message, max_tokens=64)
+        else:
+            reply = await bot.achat(message, max_tokens=64)
+        if reply.startswith("Error"):
+            raise RuntimeError(reply)
+        latencies.append(time.perf_counter() - began)
+        if mode != "stream":
+            # Without streaming the first words arrive with the whole reply
+            first_words.append(latencies[-1])
+
+    began = time.perf_counter()
+    await asyncio.gather(*(user(bot, number) for number, bot in enumerate(bots)))
+    elapsed = time.perf_counter() - began
+    latencies.sort()
+    first_words.sort()
+    if mode != "blocking":
+        await client.aclose()
+
+    return {
+        "messages": users,
+        "seconds": round(elapsed, 2),
+        "throughput_per_s": round(users / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1e3, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1e3, 1),
+        "first_words_p50_ms": round(percentile(first_words, 0.50) * 1e3, 1),
+        "first_words_p99_ms": round(percentile(first_words, 0.99) * 1e3, 1),
+    }
+
+
+def main():
+    """Run the benchmark and print the results"""
+    parser = argparse.ArgumentParser(description="Benchmark concurrent chat completions")
+    parser.add_argument("--users", type=int, default=50, help="Concurrent users, one message each")
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds until the first token on the fake server")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="Seconds between further words")
+    parser.add_argument("--concurrency", type=int, default=16, help="Completions in flight per worker")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    server = serve(port=PORT, latency=args.latency, token_delay=args.token_delay)
+    results = {}
+    try:
+        for mode in ("blocking", "async", "stream"):
+            client = OpenRouterClient("fake-key", max_concurrency=args.concurrency)
+            server.state.peak_in_flight = 0
+            results[mode] = asyncio.run(run_users(mode, args.users, client))
+            results[mode]["server_peak_in_flight"] = server.state.peak_in_flight
+            client.close()
+    finally:
+        server.shutdown()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
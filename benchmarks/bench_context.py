@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+CyberGuard AI - Prompt Size Benchmark
+Replays a long chat session in which the user pastes a large log early on,
+and compares the prompts built the old way (the last five history
+messages) with the token-budgeted window and rolling summary.
+
+Usage:
+    python benchmarks/bench_context.py [--turns 60] [--log-lines 2000]
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+from typing import Dict, List
+
+# Add the source directory to the path to allow imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from core.chatbot import BaseChatbot
+from core.conversation import message_tokens
+
+
+def last_five(bot: BaseChatbot, user_input: str) -> List[Dict[str, str]]:
+    """Build the prompt as _create_chat_messages used to, from the last five history messages."""
+    system_prompt = bot._create_cybersecurity_prompt(user_input)
+    return [{"role": "system", "content": system_prompt}] + bot.history[-5:] + [{"role": "user", "content": user_input}]
+
+
+def replay(mode: str, turns: int, log: str) -> Dict:
+    """
+    Replay the session and measure every prompt.
+
+    Args:
+        mode: "last_five" or "budgeted"
+        turns: Number of user messages
+        log: Text pasted by the user on the third turn
+
+    Returns:
+        Dictionary with prompt token statistics, build time and retained history
+    """
+    bot = BaseChatbot(enable_threat_detection=False)
+    sizes: List[int] = []
+    build = 0.0
+    for turn in range(turns):
+        user_input = log if turn == 2 else f"Is this email asking for my bank password a scam? (message {turn})"
+        began = time.perf_counter()
+        messages = last_five(bot, user_input) if mode == "last_five" else bot._create_chat_messages(user_input)
+        build += time.perf_counter() - began
+        sizes.append(sum(message_tokens(message) for message in messages))
+
+        reply = f"Reply {turn}: never share your password; report the email to your bank. " * 6
+        if mode == "last_five":
+            bot.history.append({"role": "user", "content": user_input})
+            bot.history.append({"role": "assistant", "content": reply})
+        else:
+            bot._remember(user_input, reply)
+
+    later = sizes[3:]
+    return {
+        "prompt_tokens_total": sum(sizes),
+        "prompt_tokens_max_after_log": max(later),
+        "prompt_tokens_mean_after_log": round(sum(later) / len(later), 1),
+        "build_us_per_turn": round(build / turns * 1e6, 1),
+        "history_messages_kept": len(bot.history),
+        "history_chars_kept": sum(len(message["content"]) for message in bot.history),
+    }
+
+
+def main():
+    """Run the benchmark and print the results"""
+    parser = argparse.ArgumentParser(description="Benchmark prompt sizes over a long session")
+    parser.add_argument("--turns", type=int, default=60, help="User messages in the session")
+    parser.add_argument("--log-lines", type=int, default=2000, help="Lines of the pasted log")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    log = "2024-05-01 12:00:00 sshd[811]: Failed password for root from 203.0.113.7 port 52144\n" * args.log_lines
+    results = {mode: replay(mode, args.turns, log) for mode in ("last_five", "budgeted")}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
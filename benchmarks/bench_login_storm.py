@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+CyberGuard AI - Login Storm Benchmark
+Measures how long chat messages wait for the event loop while a burst of
+logins is processed on the same loop, once with password hashing run inline
+(as the login handler used to do) and once through AsyncDatabase, which
+runs queries and hashing off the loop.
+
+A chat message handler is simulated by a task that wakes up every few
+milliseconds; its delay past the scheduled time is the latency a WebSocket
+client would see added to every frame.
+
+Usage:
+    python benchmarks/bench_login_storm.py [--logins 200] [--concurrency 50]
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+from typing import Dict, List
+
+# Add the source directory to the path to allow imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from utils.database import AsyncDatabase, Database
+from utils.passwords import PasswordHasherBusy
+
+EMAIL = "storm@example.com"
+PASSWORD = "correct horse battery staple"
+
+# Interval of the simulated chat messages, in seconds
+CHAT_INTERVAL = 0.005
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+async def chat_probe(stop: asyncio.Event, delays: List[float]) -> None:
+    """Simulated chat traffic: record how late each message handler runs."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        scheduled = loop.time() + CHAT_INTERVAL
+        await asyncio.sleep(CHAT_INTERVAL)
+        delays.append(max(0.0, loop.time() - scheduled))
+
+
+async def storm(db: Database, async_db: AsyncDatabase, mode: str, logins: int, concurrency: int) -> Dict:
+    """
+    Run a burst of logins next to simulated chat traffic.
+
+    Args:
+        db: Database holding the test user
+        async_db: Awaitable interface to it
+        mode: "none" (chat only), "inline" or "offloaded"
+        logins: Number of login attempts
+        concurrency: Logins in flight at once
+
+    Returns:
+        Dictionary with chat latency percentiles and login outcomes
+    """
+    stop = asyncio.Event()
+    delays: List[float] = []
+    probe = asyncio.create_task(chat_probe(stop, delays))
+    outcomes = {"ok": 0, "rejected": 0}
+    gate = asyncio.Semaphore(concurrency)
+
+    async def login() -> None:
+        async with gate:
+            if mode == "inline":
+                user = db.verify_user(EMAIL, PASSWORD)
+                # Yield as an async handler returning its response would
+                await asyncio.sleep(0)
+            else:
+                try:
+                    user = await async_db.verify_user(EMAIL, PASSWORD)
+                except PasswordHasherBusy:
+                    outcomes["rejected"] += 1
+                    return
+            if user is None:
+                raise RuntimeError("Valid login was rejected")
+            outcomes["ok"] += 1
+
+    began = time.perf_counter()
+    if mode == "none":
+        await asyncio.sleep(1.0)
+    else:
+        await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - began
+    stop.set()
+    await probe
+    delays.sort()
+
+    return {
+        "logins_ok": outcomes["ok"],
+        "logins_rejected": outcomes["rejected"],
+        "seconds": round(elapsed, 2),
+        "chat_messages": len(delays),
+        "chat_delay_p50_ms": round(percentile(delays, 0.50) * 1e3, 2),
+        "chat_delay_p99_ms": round(percentile(delays, 0.99) * 1e3, 2),
+        "chat_delay_max_ms": round(delays[-1] * 1e3, 2),
+    }
+
+
+def main():
+    """Run the benchmark and print the results"""
+    parser = argparse.ArgumentParser(description="Benchmark chat latency during a login storm")
+    parser.add_argument("--logins", type=int, default=200, help="Login attempts per storm")
+    parser.add_argument("--concurrency", type=int, default=50, help="Logins in flight at once")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    with tempfile.TemporaryDirectory() as directory:
+        db = Database(os.path.join(directory, "storm.db"))
+        async_db = AsyncDatabase(db)
+        db.create_user(EMAIL, "Storm User", PASSWORD)
+
+        results = {}
+        for mode in ("none", "inline", "offloaded"):
+            results[mode] = asyncio.run(storm(db, async_db, mode, args.logins, args.concurrency))
+        async_db.close()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+CyberGuard AI - Phrase Matcher Benchmark
+Compares the Aho-Corasick phrase matcher with a single case-insensitive
+regex alternation as the phrase dictionary grows.
+
+Usage:
+    python benchmarks/bench_phrases.py [--sizes 100,1000,5000]
+"""
+
+import os
+import re
+import sys
+import time
+import random
+import string
+import argparse
+
+# Add the source directory to the path to allow imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from core.phrase_matcher import PhraseMatcher
+
+
+def random_phrase(rng: random.Random) -> str:
+    """Generate a phrase of two to four random words."""
+    return " ".join(
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9)))
+        for _ in range(rng.randint(2, 4))
+    )
+
+
+def best_of(repeat: int, func) -> float:
+    """Return the fastest of several timed runs."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    """Run the benchmark and print the results"""
+    parser = argparse.ArgumentParser(description="Benchmark the phrase matcher against regex alternation")
+    parser.add_argument("--sizes", default="100,1000,5000", help="Comma-separated dictionary sizes")
+    parser.add_argument("--text-size", type=int, default=50_000, help="Characters of text to search")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    words = [random_phrase(rng) for _ in range(2000)]
+    text = ""
+    while len(text) < args.text_size:
+        text += rng.choice(words) + rng.choice([" ", ". ", "\n"])
+
+    print(f"{'phrases':>8} {'build ms':>9} {'matcher us/KB':>14} {'regex us/KB':>12} {'speedup':>8}")
+    for size in (int(value) for value in args.sizes.split(",")):
+        phrases = [random_phrase(rng) for _ in range(size)]
+
+        start = time.perf_counter()
+        matcher = PhraseMatcher({"phrases": phrases})
+        build = time.perf_counter() - start
+
+        alternation = re.compile(
+            r"\b(?:" + "|".join(re.escape(phrase) for phrase in phrases) + r")\b",
+            re.IGNORECASE
+        )
+
+        matcher_time = best_of(args.repeat, lambda: matcher.match(text))
+        regex_time = best_of(args.repeat, lambda: alternation.findall(text))
+
+        kilobytes = len(text) / 1024
+        print(
+            f"{size:>8} {build * 1000:>9.1f} {matcher_time / kilobytes * 1e6:>14.0f} "
+            f"{regex_time / kilobytes * 1e6:>12.0f} {regex_time / matcher_time:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
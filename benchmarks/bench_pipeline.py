@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+CyberGuard AI - Detection Pipeline Benchmark
+Measures throughput, p50/p99 latency and peak memory of the detection
+pipeline on a seeded synthetic corpus, and compares the results with a
+stored baseline.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--output results.json]
+    python benchmarks/bench_pipeline.py --save-baseline benchmarks/baseline.json
+    python benchmarks/bench_pipeline.py --baseline benchmarks/baseline.json [--threshold 0.25]
+
+With --baseline the exit status is 1 if any case regressed by more than the
+threshold. Timings depend on the machine, so compare against a baseline
+recorded on the same kind of machine.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import tracemalloc
+from typing import Callable, Dict, List
+
+# Benchmark the local pipeline only: no VirusTotal lookups, no result cache
+os.environ["VIRUSTOTAL_API_KEY"] = ""
+os.environ["ANALYSIS_CACHE_SIZE"] = "0"
+
+# Add the source directory to the path to allow imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from core.threat_detector import ThreatDetector
+from core.chatbot import BaseChatbot
+from corpus import generate_corpus
+
+# Calls per case (huge pastes are slow, so they get fewer)
+ITERATIONS = {"huge_paste": 30}
+
+# Peak memory increases below this are noise
+MEMORY_SLACK_KB = 64
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def measure(func: Callable, inputs: List, iterations: int, warmup: int = 20) -> Dict:
+    """
+    Time a function over a list of inputs and measure its peak memory.
+
+    Args:
+        func: Function called with one input at a time
+        inputs: Inputs, used in turn
+        iterations: Number of timed calls
+        warmup: Untimed calls made first
+
+    Returns:
+        Dictionary with calls, throughput, p50/p99 latency and peak memory
+    """
+    for index in range(min(warmup, iterations)):
+        func(inputs[index % len(inputs)])
+
+    latencies = []
+    clock = time.perf_counter
+    began = clock()
+    for index in range(iterations):
+        start = clock()
+        func(inputs[index % len(inputs)])
+        latencies.append(clock() - start)
+    elapsed = clock() - began
+    latencies.sort()
+
+    # tracemalloc slows allocations down, so memory gets its own pass
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    for index in range(min(len(inputs), 50, max(5, iterations // 10))):
+        func(inputs[index])
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+
+    return {
+        "calls": iterations,
+        "throughput_per_s": round(iterations / elapsed, 1),
+        "p50_us": round(percentile(latencies, 0.50) * 1e6, 1),
+        "p99_us": round(percentile(latencies, 0.99) * 1e6, 1),
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+def run(seed: int, count: int, iterations: int) -> Dict:
+    """
+    Run every benchmark case.
+
+    Args:
+        seed: Corpus seed
+        count: Corpus size
+        iterations: Timed calls per case
+
+    Returns:
+        Results document with metadata and per-case metrics
+    """
+    corpus = generate_corpus(seed, count)
+    by_kind: Dict[str, List[str]] = {}
+    for kind, message in corpus:
+        by_kind.setdefault(kind, []).append(message)
+
+    detector = ThreatDetector()
+    rules = detector.rules.current()
+    results: Dict[str, Dict] = {}
+
+    for kind, messages in sorted(by_kind.items()):
+        results[f"analyze_message.{kind}"] = measure(
+            detector.analyze_message, messages, ITERATIONS.get(kind, iterations)
+        )
+
+    # Scoring alone, on precomputed matches of the non-benign messages
+    risky = [message for kind, message in corpus if kind in ("phishing", "credential_leak")]
+    matched = [(message, rules.match(message)) for message in risky]
+
+    def evaluate(item):
+        message, matches = item
+        result = {"risk_level": "none", "threat_categories": [], "indicators": [], "recommendations": []}
+        detector._evaluate_threats(message, dict(matches), [], result, rules)
+
+    results["evaluate_threats"] = measure(evaluate, matched, iterations)
+
+    analyses = [detector.analyze_message(message) for message in risky]
+    results["get_security_recommendations"] = measure(detector.get_security_recommendations, analyses, iterations)
+
+    # Prompt assembly with a full conversation history
+    chatbot = BaseChatbot(enable_threat_detection=False)
+    for message in by_kind["benign"][:10]:
+        chatbot.history.append({"role": "user", "content": message})
+        chatbot.history.append({"role": "assistant", "content": message[::-1]})
+    recommendations = [detector.get_security_recommendations(analysis) for analysis in analyses]
+    prompts = list(zip(risky, recommendations)) + [(message, None) for message in by_kind["benign"]]
+    results["create_chat_messages"] = measure(
+        lambda item: chatbot._create_chat_messages(*item), prompts, iterations
+    )
+
+    return {
+        "meta": {
+            "seed": seed,
+            "corpus_size": count,
+            "iterations": iterations,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "rule_pack": rules.version,
+            "classifier": detector.classifier.version if detector.classifier is not None else None,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """
+    Find the metrics that regressed against a baseline.
+
+    Args:
+        current: Results document of this run
+        baseline: Stored results document
+        threshold: Allowed relative regression (0.25 = 25%)
+
+    Returns:
+        List of regression descriptions (empty if none)
+    """
+    regressions = []
+    for case, base in baseline["results"].items():
+        now = current["results"].get(case)
+        if now is None:
+            continue
+        if now["throughput_per_s"] < base["throughput_per_s"] * (1 - threshold):
+            regressions.append(f"{case}: throughput {now['throughput_per_s']}/s vs {base['throughput_per_s']}/s")
+        for metric in ("p50_us", "p99_us"):
+            if now[metric] > base[metric] * (1 + threshold):
+                regressions.append(f"{case}: {metric} {now[metric]} vs {base[metric]}")
+        memory, base_memory = now["peak_memory_kb"], base["peak_memory_kb"]
+        if memory > base_memory * (1 + threshold) and memory - base_memory > MEMORY_SLACK_KB:
+            regressions.append(f"{case}: peak_memory_kb {memory} vs {base_memory}")
+    return regressions
+
+
+def main():
+    """Run the benchmark, write the results and check them against a baseline"""
+    parser = argparse.ArgumentParser(description="Benchmark the detection pipeline")
+    parser.add_argument("--seed", type=int, default=1, help="Corpus seed")
+    parser.add_argument("--count", type=int, default=1000, help="Corpus size")
+    parser.add_argument("--iterations", type=int, default=2000, help="Timed calls per case")
+    parser.add_argument("--output", help="Write the results to this file (default: standard output)")
+    parser.add_argument("--baseline", help="Baseline results to compare with")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed relative regression")
+    parser.add_argument("--save-baseline", help="Also store the results as a baseline at this path")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    results = run(args.seed, args.count, args.iterations)
+    document = json.dumps(results, indent=2)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(document + "\n")
+    else:
+        print(document)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            f.write(document + "\n")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+CyberGuard AI - Model Routing Benchmark
+Sends chat completions through ModelRouter against the local fake
+completions server with injected faults, in two scenarios:
+
+- outage: the primary model fails every request after a delay; requests
+  pinned to it are compared with requests routed to a fallback model
+  behind a circuit breaker
+- tail: a few requests to the primary model are very slow; requests
+  without hedging are compared with hedged requests
+
+Usage:
+    python benchmarks/bench_routing.py [--requests 200] [--users 10] [--latency 0.1]
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+from typing import Dict, List
+
+PORT = 8098
+PRIMARY = "fake/primary"
+FALLBACK = "fake/fallback"
+
+# Talk to the fake server only
+os.environ["OPENROUTER_API_URL"] = f"http://127.0.0.1:{PORT}/api/v1"
+
+# Add the source directory to the path to allow imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from utils.model_router import ModelRouter
+from utils.openrouter_client import OpenRouterClient, OpenRouterError
+from fake_openrouter import Fault, serve
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+async def run(router: ModelRouter, requests: int, users: int) -> Dict:
+    """
+    Send requests from concurrent users, one after the other per user.
+
+    Args:
+        router: Router under test
+        requests: Total number of requests
+        users: Number of concurrent users
+
+    Returns:
+        Dictionary with success rate, latency percentiles and routing counts
+    """
+    latencies: List[float] = []
+    outcomes = {"ok": 0, "failed": 0}
+    answered: Dict[str, int] = {}
+    queue = list(range(requests))
+
+    async def user() -> None:
+        while queue:
+            number = queue.pop()
+            messages = [{"role": "user", "content": f"What is phishing? #{number}"}]
+            began = time.perf_counter()
+            try:
+                model, _ = await router.acomplete(messages, PRIMARY, max_tokens=64)
+                outcomes["ok"] += 1
+                answered[model] = answered.get(model, 0) + 1
+            except OpenRouterError:
+                outcomes["failed"] += 1
+            latencies.append(time.perf_counter() - began)
+
+    began = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(users)))
+    elapsed = time.perf_counter() - began
+    await router.client.aclose()
+    latencies.sort()
+    stats = router.stats()
+
+    return {
+        "ok": outcomes["ok"],
+        "failed": outcomes["failed"],
+        "seconds": round(elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1e3, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1e3, 1),
+        "answered_by": answered,
+        "fallbacks": stats["fallbacks"],
+        "hedges": stats["hedges"],
+        "hedge_wins": stats["hedge_wins"],
+        "primary_state": stats["models"].get(PRIMARY, {}).get("state"),
+    }
+
+
+def main():
+    """Run the benchmark and print the results"""
+    parser = argparse.ArgumentParser(description="Benchmark model fallback and hedging")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per run")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent users")
+    parser.add_argument("--latency", type=float, default=0.1, help="Seconds per completion on the fake server")
+    args = parser.parse_args()
+
+    # The injected failures would otherwise be logged as errors
+    logging.disable(logging.ERROR)
+    scenarios = {
+        # The primary model fails after a second, like a provider timing out
+        "outage": (Fault(errors=1.0, delay=1.0), [
+            ("pinned", dict(fallback_models=[], failure_threshold=10 ** 9)),
+            ("routed", dict(fallback_models=[FALLBACK], reset_timeout=60)),
+        ]),
+        # One request in twenty to the primary model takes two seconds longer
+        "tail": (Fault(slow=0.05, slow_delay=2.0), [
+            ("unhedged", dict(fallback_models=[FALLBACK], hedge=False)),
+            ("hedged", dict(fallback_models=[FALLBACK], hedge=True, hedge_min_delay=0.05, hedge_min_samples=20)),
+        ]),
+    }
+
+    results = {}
+    for scenario, (fault, runs) in scenarios.items():
+        server = serve(port=PORT, latency=args.latency, faults={PRIMARY: fault})
+        try:
+            for name, options in runs:
+                router = ModelRouter(OpenRouterClient("fake-key"), **options)
+                results[f"{scenario}_{name}"] = asyncio.run(run(router, args.requests, args.users))
+                router.client.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+CyberGuard AI - Synthetic Message Corpus
+Generates a reproducible mix of benign questions, phishing lures,
+credential leaks and huge pastes (logs, email dumps) for benchmarks.
+
+Usage:
+    python benchmarks/corpus.py [--seed N] [--count N] > corpus.jsonl
+"""
+
+import json
+import random
+import argparse
+from typing import Dict, List, Tuple
+
+BENIGN = [
+    "How do I set up two-factor authentication on my {service} account?",
+    "What is the difference between a VPN and a proxy?",
+    "Can you explain how {service} stores passwords securely?",
+    "Is it safe to use public Wi-Fi at the {place} for online banking?",
+    "Our team moved to {service} last week, which sharing settings should we review?",
+    "Thanks, that helped. How often should I rotate my SSH keys?",
+    "What does a firewall actually block on a home network?",
+    "My laptop has been slow since yesterday, could it be malware or just updates?",
+]
+
+PHISHING = [
+    "URGENT: your {service} account has been suspended. Verify your identity within 24 hours at {url}",
+    "Dear customer, we detected unusual activity. Confirm your password at {url} or your account will be closed.",
+    "Congratulations! You have won a {prize}. Claim your prize now: {url}",
+    "Your parcel is held at customs. Pay the small fee at {url} to release it today.",
+    "Final notice: your {service} subscription failed to renew. Update your billing details at {url}",
+    "IT department: your mailbox is full. Log in at {url} immediately to avoid losing email.",
+    "Send a {prize} gift card to finish the wire transfer, this is urgent and confidential.",
+]
+
+LEAKS = [
+    "here is the config for prod: db_user=admin password: {secret} host {ip}",
+    "my card is {card}, exp 04/27, can you check why the payment failed?",
+    "SSN {ssn} was in the attachment invoice.pdf.exe, is that a problem?",
+    "run this to fix it: powershell -encoded {secret}",
+    "password={secret} and the backup server is {ip}",
+]
+
+SERVICES = ["PayPal", "Microsoft 365", "Google", "Dropbox", "Slack", "Amazon", "Netflix", "your bank"]
+PLACES = ["airport", "hotel", "coffee shop", "library", "conference"]
+PRIZES = ["$500 Amazon voucher", "new iPhone", "free cruise", "$1000 Walmart"]
+DOMAINS = ["verify-secure.com", "login-update.net", "account-check.online", "paypa1-support.tk", "github.com", "docs.python.org"]
+LOG_LEVELS = ["INFO", "DEBUG", "WARN", "ERROR"]
+
+# Approximate share of each kind in a generated corpus
+DEFAULT_MIX = {"benign": 0.6, "phishing": 0.2, "credential_leak": 0.15, "huge_paste": 0.05}
+
+
+def _url(rng: random.Random) -> str:
+    scheme = rng.choice(["http", "https"])
+    path = "/".join(rng.choice(["login", "verify", "account", "secure", "update", "id"]) for _ in range(rng.randint(1, 3)))
+    return f"{scheme}://{rng.choice(DOMAINS)}/{path}?session={rng.getrandbits(32):08x}"
+
+
+def _ip(rng: random.Random) -> str:
+    return ".".join(str(rng.randint(1, 254)) for _ in range(4))
+
+
+def _fill(rng: random.Random, template: str) -> str:
+    return template.format(
+        service=rng.choice(SERVICES),
+        place=rng.choice(PLACES),
+        prize=rng.choice(PRIZES),
+        url=_url(rng),
+        ip=_ip(rng),
+        secret=f"{rng.getrandbits(48):012x}",
+        card=" ".join(f"{rng.randint(0, 9999):04d}" for _ in range(4)),
+        ssn=f"{rng.randint(100, 899)}-{rng.randint(10, 99)}-{rng.randint(1000, 9999)}",
+    )
+
+
+def _huge_paste(rng: random.Random, lines: int) -> str:
+    """A pasted log or email dump with a few indicators buried in it."""
+    out = []
+    for number in range(lines):
+        level = rng.choice(LOG_LEVELS)
+        if rng.random() < 0.01:
+            body = _fill(rng, rng.choice(PHISHING + LEAKS))
+        else:
+            body = f"request {rng.getrandbits(32):08x} from {_ip(rng)} completed in {rng.randint(1, 900)}ms"
+        out.append(f"2024-05-{rng.randint(1, 28):02d}T12:{number % 60:02d}:00Z {level} worker-{rng.randint(1, 8)} {body}")
+    return "\n".join(out)
+
+
+def generate_message(rng: random.Random, kind: str, paste_lines: int = 2000) -> str:
+    """
+    Generate one message of the given kind.
+
+    Args:
+        rng: Seeded random generator
+        kind: "benign", "phishing", "credential_leak" or "huge_paste"
+        paste_lines: Number of lines in a huge paste
+
+    Returns:
+        Message text
+    """
+    if kind == "benign":
+        return " ".join(_fill(rng, rng.choice(BENIGN)) for _ in range(rng.randint(1, 3)))
+    if kind == "phishing":
+        return _fill(rng, rng.choice(PHISHING))
+    if kind == "credential_leak":
+        return _fill(rng, rng.choice(LEAKS))
+    if kind == "huge_paste":
+        return _huge_paste(rng, paste_lines)
+    raise ValueError(f"Unknown message kind: {kind}")
+
+
+def generate_corpus(seed: int = 1, count: int = 1000, mix: Dict[str, float] = None,
+                    paste_lines: int = 2000) -> List[Tuple[str, str]]:
+    """
+    Generate a reproducible corpus.
+
+    Args:
+        seed: Random seed; the same seed always gives the same corpus
+        count: Number of messages
+        mix: Kind -> share of the corpus (default: DEFAULT_MIX)
+        paste_lines: Number of lines in each huge paste
+
+    Returns:
+        List of (kind, message) tuples
+    """
+    rng = random.Random(seed)
+    mix = mix or DEFAULT_MIX
+    kinds, weights = list(mix), list(mix.values())
+    return [
+        (kind, generate_message(rng, kind, paste_lines))
+        for kind in rng.choices(kinds, weights=weights, k=count)
+    ]
+
+
+def main():
+    """Write a corpus as JSON Lines to standard output"""
+    parser = argparse.ArgumentParser(description="Generate a synthetic message corpus")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    parser.add_argument("--count", type=int, default=1000, help="Number of messages")
+    args = parser.parse_args()
+
+    for kind, message in generate_corpus(args.seed, args.count):
+        print(json.dumps({"kind": kind, "text": message}))
+
+
+if __name__ == "__main__":
+    main()
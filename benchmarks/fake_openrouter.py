@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+CyberGuard AI - Fake OpenRouter Server
+A minimal local stand-in for the OpenRouter chat completions endpoint, used
+to test and load-test the chat path without an API key or quota.
+
+Every completion echoes the last user message. Its first token takes
+--latency seconds and every further word --token-delay seconds; requests
+with "stream": true receive the words as server-sent events as they are
+"generated", the others wait for the whole reply.
+
+Faults can be injected per model with --fault: a share of requests that fail
+(after an optional delay) and a share that are slow, e.g. to watch the model
+router fall back, open a circuit breaker or hedge.
+
+Usage:
+    python benchmarks/fake_openrouter.py --port 8098 --latency 0.5 --token-delay 0.02
+    python benchmarks/fake_openrouter.py --fault "some/model:errors=1,delay=2" --fault "*:slow=0.05,slow_delay=3"
+    OPENROUTER_API_URL=http://127.0.0.1:8098/api/v1 python src/api/server.py
+"""
+
+import json
+import time
+import random
+import argparse
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIX = "/api/v1"
+
+
+@dataclass
+class Fault:
+    """Faults injected into the requests for one model."""
+
+    errors: float = 0.0       # share of requests that fail
+    status: int = 503         # status of the failures
+    delay: float = 0.0        # seconds before a failure is returned
+    slow: float = 0.0         # share of requests that take slow_delay seconds longer
+    slow_delay: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "Fault":
+        """Parse "errors=0.5,status=500,delay=1,slow=0.1,slow_delay=2"."""
+        fault = cls()
+        for item in filter(None, spec.split(",")):
+            name, _, value = item.partition("=")
+            name = name.strip()
+            if name not in cls.__dataclass_fields__:
+                raise ValueError(f"Unknown fault setting: {name}")
+            setattr(fault, name, int(value) if name == "status" else float(value))
+        return fault
+
+
+class FakeOpenRouter:
+    """In-memory state of the fake service."""
+
+    def __init__(self, latency: float, token_delay: float = 0.0,
+                 faults: Optional[Dict[str, Fault]] = None, seed: int = 0):
+        self.latency = latency
+        self.token_delay = token_delay
+        # Faults by model name; "*" applies to models without their own entry
+        self.faults = dict(faults or {})
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.failures = 0
+        self.requests_by_model: Dict[str, int] = {}
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.lock = threading.Lock()
+
+    def inject(self, model: str):
+        """
+        Draw the faults of one request.
+
+        Returns:
+            Tuple of (extra seconds before replying, error status or None)
+        """
+        fault = self.faults.get(model) or self.faults.get("*")
+        if fault is None:
+            return 0.0, None
+        with self.lock:
+            failed = self.random.random() < fault.errors
+            slow = self.random.random() < fault.slow
+            if failed:
+                self.failures += 1
+        if failed:
+            return fault.delay, fault.status
+        return (fault.slow_delay if slow else 0.0), None
+
+    @staticmethod
+    def reply(body: dict) -> str:
+        """Text of the reply to a request."""
+        messages = body.get("messages") or [{}]
+        prompt = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+        return f"Echo: {prompt[:200]}"
+
+    @staticmethod
+    def tokens(content: str) -> list:
+        """Split a reply into the pieces streamed one by one (words with their leading space)."""
+        words = content.split(" ")
+        return words[:1] + [" " + word for word in words[1:]]
+
+    def completion(self, body: dict) -> dict:
+        """Build the completion returned for a request."""
+        messages = body.get("messages") or [{}]
+        content = self.reply(body)
+        return {
+            "id": f"gen-{self.requests}",
+            "object": "chat.completion",
+            "model": body.get("model", "fake"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": sum(len(str(m.get("content", ""))) // 4 for m in messages),
+                      "completion_tokens": len(content) // 4},
+        }
+
+
+def make_handler(state: FakeOpenRouter):
+    """Build a request handler class bound to the given state."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _reply(self, status: int, payload: dict):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                # The client gave up, e.g. its read timeout expired
+                pass
+
+        def _stream(self, body: dict, extra: float = 0.0):
+            """Send the reply as server-sent events, one word per chunk."""
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            def write(event: str):
+                chunk = event.encode("utf-8")
+                self.wfile.write(f"{len(chunk):x}\r\n".encode("ascii") + chunk + b"\r\n")
+                self.wfile.flush()
+
+            def send(data: str):
+                write(f"data: {data}\n\n")
+
+            try:
+                # Keep-alive comment, as OpenRouter sends while a request is queued
+                write(": OPENROUTER PROCESSING\n\n")
+                time.sleep(state.latency + extra)
+                tokens = state.tokens(state.reply(body))
+                for index, token in enumerate(tokens):
+                    if index:
+                        time.sleep(state.token_delay)
+                    send(json.dumps({
+                        "id": f"gen-{state.requests}",
+                        "object": "chat.completion.chunk",
+                        "model": body.get("model", "fake"),
+                        "choices": [{"index": 0, "delta": {"role": "assistant", "content": token},
+                                     "finish_reason": "stop" if index == len(tokens) - 1 else None}],
+                    }))
+                send("[DONE]")
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            raw = self.rfile.read(length)
+            if self.path != PREFIX + "/chat/completions":
+                self._reply(404, {"error": {"message": "Not found", "code": 404}})
+                return
+            if not self.headers.get("Authorization", "").startswith("Bearer "):
+                self._reply(401, {"error": {"message": "No auth credentials found", "code": 401}})
+                return
+            try:
+                body = json.loads(raw or b"{}")
+            except ValueError:
+                self._reply(400, {"error": {"message": "Invalid JSON", "code": 400}})
+                return
+
+            model = body.get("model", "fake")
+            with state.lock:
+                state.requests += 1
+                state.requests_by_model[model] = state.requests_by_model.get(model, 0) + 1
+                state.in_flight += 1
+                state.peak_in_flight = max(state.peak_in_flight, state.in_flight)
+            try:
+                extra, error = state.inject(model)
+                if error is not None:
+                    time.sleep(extra)
+                    self._reply(error, {"error": {"message": f"Injected failure of {model}", "code": error}})
+                    return
+                if body.get("stream"):
+                    self._stream(body, extra)
+                    return
+                completion = state.completion(body)
+                tokens = len(state.tokens(completion["choices"][0]["message"]["content"]))
+                time.sleep(state.latency + extra + state.token_delay * (tokens - 1))
+                self._reply(200, completion)
+            finally:
+                with state.lock:
+                    state.in_flight -= 1
+
+    return Handler
+
+
+class _Server(ThreadingHTTPServer):
+    """Threaded server with a listen backlog large enough for load tests."""
+
+    daemon_threads = True
+    request_queue_size = 256
+
+
+def serve(host: str = "127.0.0.1", port: int = 8098, latency: float = 0.5,
+          token_delay: float = 0.0, faults: Optional[Dict[str, Fault]] = None) -> ThreadingHTTPServer:
+    """
+    Start the fake server in a background thread.
+
+    Args:
+        faults: Faults injected per model ("*" for every other model)
+
+    Returns:
+        The running server; call shutdown() to stop it
+    """
+    state = FakeOpenRouter(latency, token_delay, faults)
+    server = _Server((host, port), make_handler(state))
+    server.state = state
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    """Run the fake server in the foreground"""
+    parser = argparse.ArgumentParser(description="Fake OpenRouter chat completions API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8098)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds until the first token")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds between further words")
+    parser.add_argument("--fault", action="append", default=[], metavar="MODEL:SETTINGS",
+                        help='Inject faults, e.g. "some/model:errors=0.5,delay=1" or "*:slow=0.1,slow_delay=2"')
+    args = parser.parse_args()
+
+    faults = {}
+    for spec in args.fault:
+        model, _, settings = spec.rpartition(":")
+        faults[model or "*"] = Fault.parse(settings)
+    server = serve(args.host, args.port, args.latency, args.token_delay, faults)
+    print(f"Fake OpenRouter listening on http://{args.host}:{args.port}{PREFIX}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
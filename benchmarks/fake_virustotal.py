@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+CyberGuard AI - Fake VirusTotal Server
+A minimal local stand-in for the VirusTotal v3 URL endpoints, used to test
+and load-test the reputation client without an API key or quota.
+
+Unknown URLs return 404 on lookup, can be submitted with POST /urls, and
+their analysis completes after --analysis-delay seconds. URLs containing
+any of the --malicious markers are reported as malicious.
+
+Usage:
+    python benchmarks/fake_virustotal.py --port 8099 --latency 0.2
+    VIRUSTOTAL_API_URL=http://127.0.0.1:8099/api/v3 python src/cli.py
+"""
+
+import json
+import time
+import base64
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+PREFIX = "/api/v3"
+
+
+class FakeVirusTotal:
+    """In-memory state of the fake service."""
+
+    def __init__(self, latency: float, analysis_delay: float, malicious, known_all: bool):
+        self.latency = latency
+        self.analysis_delay = analysis_delay
+        self.malicious = malicious
+        self.known_all = known_all
+        self.known = set()
+        self.analyses = {}
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def stats(self, url: str):
+        """Return the engine statistics reported for a URL."""
+        if any(marker in url for marker in self.malicious):
+            return {"malicious": 7, "suspicious": 2, "harmless": 50, "undetected": 11}
+        return {"malicious": 0, "suspicious": 0, "harmless": 60, "undetected": 10}
+
+
+def make_handler(state: FakeVirusTotal):
+    """Build a request handler class bound to the given state."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _reply(self, status: int, payload: dict):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                # The client gave up, e.g. its deadline expired
+                pass
+
+        def _begin(self) -> bool:
+            with state.lock:
+                state.requests += 1
+            time.sleep(state.latency)
+            if not self.headers.get("x-apikey"):
+                self._reply(401, {"error": {"code": "AuthenticationRequiredError"}})
+                return False
+            return True
+
+        def do_GET(self):
+            if not self._begin():
+                return
+            path = self.path[len(PREFIX):] if self.path.startswith(PREFIX) else self.path
+
+            if path.startswith("/urls/"):
+                identifier = path[len("/urls/"):]
+                url = base64.urlsafe_b64decode(identifier + "=" * (-len(identifier) % 4)).decode("utf-8")
+                if url not in state.known and not state.known_all:
+                    self._reply(404, {"error": {"code": "NotFoundError"}})
+                    return
+                self._reply(200, {"data": {"id": identifier, "attributes": {"last_analysis_stats": state.stats(url)}}})
+
+            elif path.startswith("/analyses/"):
+                analysis_id = path[len("/analyses/"):]
+                url, submitted = state.analyses.get(analysis_id, (None, 0))
+                if url is None:
+                    self._reply(404, {"error": {"code": "NotFoundError"}})
+                elif time.time() - submitted < state.analysis_delay:
+                    self._reply(200, {"data": {"id": analysis_id, "attributes": {"status": "queued", "stats": {}}}})
+                else:
+                    state.known.add(url)
+                    self._reply(200, {"data": {"id": analysis_id, "attributes": {
+                        "status": "completed", "stats": state.stats(url)
+                    }}})
+            else:
+                self._reply(404, {"error": {"code": "NotFoundError"}})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            form = parse_qs(self.rfile.read(length).decode("utf-8"))
+            if not self._begin():
+                return
+            url = form.get("url", [""])[0]
+            if not url:
+                self._reply(400, {"error": {"code": "BadRequestError"}})
+                return
+            analysis_id = f"u-{len(state.analyses)}-{int(time.time())}"
+            state.analyses[analysis_id] = (url, time.time())
+            self._reply(200, {"data": {"type": "analysis", "id": analysis_id}})
+
+    return Handler
+
+
+def serve(host: str = "127.0.0.1", port: int = 8099, latency: float = 0.0, analysis_delay: float = 1.0,
+          malicious=("malware", "phish"), known_all: bool = False) -> ThreadingHTTPServer:
+    """
+    Start the fake server in a background thread.
+
+    Returns:
+        The running server; call shutdown() to stop it
+    """
+    state = FakeVirusTotal(latency, analysis_delay, list(malicious), known_all)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.state = state
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    """Run the fake server in the foreground"""
+    parser = argparse.ArgumentParser(description="Fake VirusTotal v3 URL API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--analysis-delay", type=float, default=1.0, help="Seconds until a submitted URL is analyzed")
+    parser.add_argument("--malicious", action="append", default=None, help="Substring marking a URL as malicious")
+    parser.add_argument("--known-all", action="store_true", help="Treat every URL as already analyzed")
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, args.latency, args.analysis_delay,
+                   args.malicious or ("malware", "phish"), args.known_all)
+    print(f"Fake VirusTotal listening on http://{args.host}:{args.port}{PREFIX}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -10,19 +10,26 @@ import os
 import logging
 import sys
 import uuid
-from typing import Dict, List, Optional, Union
+import json
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
 from fastapi import FastAPI, HTTPException, Request, Depends, Query, WebSocket, WebSocketDisconnect
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, Field, EmailStr
 from datetime import datetime, timedelta
-from src.utils.database import db
+from src.utils.database import async_db
 
 # Add parent directory to path to allow imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from models.openrouter import OpenRouterCyberGuardBot
+from core.rules import get_rules
+from utils.metrics import metrics
+from utils.passwords import PasswordHasherBusy
+from utils.openrouter_client import OpenRouterError, aclose_openrouter_clients
+from utils.model_router import get_model_routers
 from config import settings
 
 # Configure logging
@@ -86,6 +93,9 @@ class LoginRequest(BaseModel):
     email: EmailStr = Field(..., title="Email address")
     password: str = Field(..., title="Password")
 
+class MetricsToggle(BaseModel):
+    enabled: bool = Field(..., title="Whether to record pipeline metrics")
+
 class AuthResponse(BaseModel):
     token: str = Field(..., title="Authentication token")
     expires: str = Field(..., title="Expiry timestamp in ISO format")
@@ -133,10 +143,10 @@ def get_openrouter_chatbot(session_id: str, model_name: Optional[str] = None) ->
 # Security utilities
 security = HTTPBearer()
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Verify the authentication token and return the user info"""
     token = credentials.credentials
-    user_data = db.verify_session(token)
+    user_data = await async_db.verify_session(token)
     
     if not user_data:
         raise HTTPException(
@@ -145,8 +155,31 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Keep the token for logout (the session cache only knows its hash)
+    user_data["token"] = token
     return user_data
 
+# Background task deleting expired sessions
+session_sweeper: Optional[asyncio.Task] = None
+
+@app.on_event("startup")
+async def start_session_sweeper():
+    """Start sweeping expired sessions in the background"""
+    global session_sweeper
+    session_sweeper = asyncio.create_task(async_db.sweep_sessions())
+
+@app.on_event("shutdown")
+async def close_database():
+    """Stop the session sweeper and the database threads, and close their connections"""
+    if session_sweeper is not None:
+        session_sweeper.cancel()
+    async_db.close()
+
+@app.on_event("shutdown")
+async def close_openrouter():
+    """Close the OpenRouter connection pools"""
+    await aclose_openrouter_clients()
+
 # Routes
 @app.get("/")
 async def root():
@@ -173,52 +206,137 @@ async def api_status():
         }
     }
 
+def get_chatbot_for(request: ChatRequest) -> Tuple[str, Union['LocalCyberGuardBot', OpenRouterCyberGuardBot], str]:
+    """Resolve the session, chatbot and model label of a chat request"""
+    # Use provided session ID or generate a new one
+    session_id = request.session_id or str(uuid.uuid4())
+    
+    # Determine which model to use
+    model_type = request.model_type.lower() if request.model_type else "openrouter"
+    
+    # Get or create the appropriate chatbot
+    if model_type == "local" and has_local_model:
+        chatbot = get_local_chatbot(session_id)
+        model_used = f"local:{request.model_name or settings.LOCAL_MODEL_NAME}"
+    else:
+        chatbot = get_openrouter_chatbot(session_id, request.model_name)
+        model_used = f"openrouter:{request.model_name or settings.OPENROUTER_MODEL_NAME}"
+    
+    return session_id, chatbot, model_used
+
+def get_model_used(chatbot, model_used: str) -> str:
+    """Label of the model that answered, which differs from the requested one after a fallback"""
+    answered = getattr(chatbot, "last_model_used", None)
+    return f"openrouter:{answered}" if answered else model_used
+
+def get_detected_threats(chatbot, message: str) -> Optional[List[str]]:
+    """Return the threat categories found in a message, reusing the analysis done by chat()"""
+    if chatbot.enable_threat_detection and chatbot.threat_detector:
+        try:
+            threat_analysis = chatbot.last_threat_analysis or chatbot.analyze_security_threats(message)
+            if threat_analysis["risk_level"] != "none":
+                return threat_analysis["threat_categories"]
+        except Exception as e:
+            logger.error(f"Error extracting threat information: {e}")
+    return None
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
     """Process a chat message and get a response"""
     try:
-        # Use provided session ID or generate a new one
-        session_id = request.session_id or str(uuid.uuid4())
+        session_id, chatbot, model_used = get_chatbot_for(request)
         
-        # Determine which model to use
-        model_type = request.model_type.lower() if request.model_type else "openrouter"
-        
-        # Get or create the appropriate chatbot
-        if model_type == "local" and has_local_model:
-            chatbot = get_local_chatbot(session_id)
-            model_used = f"local:{request.model_name or settings.LOCAL_MODEL_NAME}"
+        # Process the user message (the local model computes in a worker thread)
+        chatbot.last_threat_analysis = None
+        if hasattr(chatbot, "achat"):
+            response = await chatbot.achat(
+                user_input=request.message,
+                max_tokens=request.max_tokens,
+                temperature=request.temperature
+            )
         else:
-            chatbot = get_openrouter_chatbot(session_id, request.model_name)
-            model_used = f"openrouter:{request.model_name or settings.OPENROUTER_MODEL_NAME}"
-        
-        # Process the user message
-        response = chatbot.chat(
-            user_input=request.message,
-            max_tokens=request.max_tokens,
-            temperature=request.temperature
-        )
-        
-        # Extract detected threats if available
-        detected_threats = None
-        if chatbot.enable_threat_detection and chatbot.threat_detector:
-            try:
-                threat_analysis = chatbot.analyze_security_threats(request.message)
-                if threat_analysis["risk_level"] != "none":
-                    detected_threats = threat_analysis["threat_categories"]
-            except Exception as e:
-                logger.error(f"Error extracting threat information: {e}")
+            response = await asyncio.to_thread(
+                chatbot.chat,
+                user_input=request.message,
+                max_tokens=request.max_tokens,
+                temperature=request.temperature
+            )
         
         return ChatResponse(
             response=response,
             session_id=session_id,
-            detected_threats=detected_threats,
-            model_used=model_used
+            detected_threats=get_detected_threats(chatbot, request.message),
+            model_used=get_model_used(chatbot, model_used)
         )
         
     except Exception as e:
         logger.error(f"Error processing chat request: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def sse_event(event: str, data: Dict) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Process a chat message and stream the response as server-sent events.
+    
+    Sends a "delta" event for every piece of the response as it is generated,
+    then a "done" event carrying the same fields as the /chat response, or an
+    "error" event if the completion fails part way.
+    """
+    try:
+        session_id, chatbot, model_used = get_chatbot_for(request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error processing chat request: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    async def events() -> AsyncIterator[str]:
+        chatbot.last_threat_analysis = None
+        parts = []
+        try:
+            if hasattr(chatbot, "astream_chat"):
+                async for delta in chatbot.astream_chat(
+                    user_input=request.message,
+                    max_tokens=request.max_tokens,
+                    temperature=request.temperature
+                ):
+                    parts.append(delta)
+                    yield sse_event("delta", {"delta": delta})
+            else:
+                # The local model does not stream; send its reply as a single delta
+                response = await asyncio.to_thread(
+                    chatbot.chat,
+                    user_input=request.message,
+                    max_tokens=request.max_tokens,
+                    temperature=request.temperature
+                )
+                parts.append(response)
+                yield sse_event("delta", {"delta": response})
+        except OpenRouterError as e:
+            yield sse_event("error", {"detail": f"Unable to process your request. {e}"})
+            return
+        except Exception as e:
+            logger.error(f"Error streaming chat response: {e}")
+            yield sse_event("error", {"detail": str(e)})
+            return
+        
+        yield sse_event("done", {
+            "response": "".join(parts),
+            "session_id": session_id,
+            "detected_threats": get_detected_threats(chatbot, request.message),
+            "model_used": get_model_used(chatbot, model_used)
+        })
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/clear-session/{session_id}")
 async def clear_session(
     session_id: str, 
@@ -243,6 +361,29 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy"}
 
+@app.get("/api/rules/stats")
+async def rule_stats(user_data: dict = Depends(verify_token)):
+    """Get hit counters and timings of the active detection rule pack"""
+    return get_rules().current().stats()
+
+@app.get("/api/metrics")
+async def export_metrics(
+    format: str = Query("json", pattern="^(json|prometheus)$", description="json or prometheus"),
+    user_data: dict = Depends(verify_token)
+):
+    """Export the detection pipeline's latency histograms and counters"""
+    # Make sure the per-rule counters are registered
+    get_rules()
+    if format == "prometheus":
+        return PlainTextResponse(metrics.prometheus(), media_type="text/plain; version=0.0.4")
+    return metrics.snapshot()
+
+@app.put("/api/metrics")
+async def toggle_metrics(request: MetricsToggle, user_data: dict = Depends(verify_token)):
+    """Switch metrics recording on or off at runtime"""
+    metrics.set_enabled(request.enabled)
+    return {"enabled": metrics.enabled}
+
 @app.get("/models")
 async def list_models():
     """List available models"""
@@ -264,44 +405,55 @@ async def list_models():
             "local": has_local_model,
             "openrouter": True
         },
-        "models": models
+        "models": models,
+        # Health of the models used so far: circuit breaker state, error rate and latency
+        "routing": [router.stats() for router in get_model_routers()]
     }
 
 # Authentication endpoints
+def auth_overloaded() -> HTTPException:
+    """Error returned when the password hashing pool is saturated"""
+    return HTTPException(
+        status_code=429,
+        detail="Too many authentication requests, please retry shortly",
+        headers={"Retry-After": "1"}
+    )
+
 @app.post("/api/signup", response_model=AuthResponse)
 async def signup(request: SignupRequest):
     """Create a new user account"""
-    # Create the user
-    success = db.create_user(
-        email=request.email,
-        fullname=request.fullname,
-        password=request.password
-    )
+    # Create the user (the password is hashed once, off the event loop)
+    try:
+        user_id = await async_db.create_user(
+            email=request.email,
+            fullname=request.fullname,
+            password=request.password
+        )
+    except PasswordHasherBusy:
+        raise auth_overloaded()
     
-    if not success:
+    if not user_id:
         raise HTTPException(status_code=400, detail="User already exists or registration failed")
     
-    # Verify to get user id
-    user = db.verify_user(request.email, request.password)
-    if not user:
-        raise HTTPException(status_code=500, detail="User created but verification failed")
-    
     # Create session
-    session = db.create_session(user["id"])
+    session = await async_db.create_session(user_id)
     if not session:
         raise HTTPException(status_code=500, detail="Failed to create session")
     
     return {
         "token": session["token"],
         "expires": session["expires"],
-        "email": user["email"],
-        "fullname": user["fullname"]
+        "email": session["email"],
+        "fullname": session["fullname"]
     }
 
 @app.post("/api/login", response_model=AuthResponse)
 async def login(request: LoginRequest):
     """Log in an existing user"""
-    user = db.verify_user(request.email, request.password)
+    try:
+        user = await async_db.verify_user(request.email, request.password)
+    except PasswordHasherBusy:
+        raise auth_overloaded()
     
     if not user:
         raise HTTPException(
@@ -311,7 +463,7 @@ async def login(request: LoginRequest):
         )
     
     # Create session
-    session = db.create_session(user["id"])
+    session = await async_db.create_session(user["id"])
     if not session:
         raise HTTPException(status_code=500, detail="Failed to create session")
     
@@ -325,7 +477,7 @@ async def login(request: LoginRequest):
 @app.post("/api/logout")
 async def logout(user_data: dict = Depends(verify_token)):
     """Log out a user"""
-    db.logout(user_data["token"])
+    await async_db.logout(user_data["token"])
     return {"success": True}
 
 @app.get("/api/me")
@@ -372,18 +524,34 @@ async def websocket_chat(websocket: WebSocket):
         return
 
     # Verify token
-    user_data = db.verify_session(token)
+    user_data = await async_db.verify_session(token)
     if not user_data:
         await websocket.close(code=1008, reason="Invalid or expired token")
         return
 
     # Generate client ID using user ID and a unique identifier
-    client_id = f"{user_data['id']}_{str(uuid.uuid4())}"
+    client_id = f"{user_data['user_id']}_{str(uuid.uuid4())}"
     session_id = str(uuid.uuid4())  # Create a new session for this connection
     
     # Get chatbot instance for this session
     chatbot = get_openrouter_chatbot(session_id)
     
+    # Push URL reputation results that arrive after the reply was sent
+    loop = asyncio.get_running_loop()
+    
+    def push_threat_update(analysis: Dict) -> None:
+        asyncio.run_coroutine_threadsafe(manager.send_message({
+            "type": "threat_update",
+            "session_id": session_id,
+            "risk_level": analysis.get("risk_level", "none"),
+            "threat_categories": analysis.get("threat_categories", []),
+            "indicators": analysis.get("indicators", []),
+            "recommendations": analysis.get("recommendations", []),
+            "timestamp": datetime.now().isoformat()
+        }, client_id), loop)
+    
+    chatbot.on_threat_enriched = push_threat_update
+    
     try:
         # Accept connection
         await manager.connect(websocket, client_id)
@@ -426,18 +594,32 @@ async def websocket_chat(websocket: WebSocket):
             }, client_id)
 
             try:
-                # Process the message with the chatbot
-                response = chatbot.chat(
+                # Stream the reply as it is generated; history is kept only once it completes
+                parts = []
+                stream = chatbot.astream_chat(
                     user_input=message,
                     max_tokens=1024
                 )
-
-                # Send the response back to the client
+                try:
+                    async for delta in stream:
+                        parts.append(delta)
+                        await manager.send_message({
+                            "type": "delta",
+                            "session_id": session_id,
+                            "delta": delta
+                        }, client_id)
+                finally:
+                    # Release the upstream connection at once if the client went away
+                    await stream.aclose()
+                response = "".join(parts)
+
+                # Send the complete response back to the client
                 await manager.send_message({
                     "type": "message",
                     "session_id": session_id,
                     "response": response,
-                    "model_used": f"openrouter:{model}",
+                    "model_used": get_model_used(chatbot, f"openrouter:{model}"),
+                    "threat_analysis": chatbot.last_threat_analysis,
                     "timestamp": datetime.now().isoformat()
                 }, client_id)
 
@@ -454,6 +636,8 @@ async def websocket_chat(websocket: WebSocket):
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
         manager.disconnect(client_id)
+    finally:
+        chatbot.on_threat_enriched = None
 
 # Run the API server
 if __name__ == "__main__":
@@ -30,6 +30,116 @@ HUGGINGFACE_TOKEN = os.getenv('HUGGINGFACE_TOKEN')
 OPENROUTER_MODEL_NAME = os.getenv('OPENROUTER_MODEL_NAME', 'nvidia/llama-3.1-nemotron-ultra-253b-v1:free')
 LOCAL_MODEL_NAME = os.getenv('LOCAL_MODEL_NAME', 'meta-llama/Meta-Llama-3.1-8B-Instruct')
 
+# OpenRouter client configuration (point OPENROUTER_API_URL at a local fake server for load tests)
+OPENROUTER_API_URL = os.getenv('OPENROUTER_API_URL', 'https://openrouter.ai/api/v1')
+OPENROUTER_MAX_CONNECTIONS = int(os.getenv('OPENROUTER_MAX_CONNECTIONS', 20))
+# Completions in flight per worker; further requests wait for a slot
+OPENROUTER_MAX_CONCURRENCY = int(os.getenv('OPENROUTER_MAX_CONCURRENCY', 16))
+OPENROUTER_CONNECT_TIMEOUT = float(os.getenv('OPENROUTER_CONNECT_TIMEOUT', 5))
+OPENROUTER_READ_TIMEOUT = float(os.getenv('OPENROUTER_READ_TIMEOUT', 60))
+# Use HTTP/2 when the h2 package is installed
+OPENROUTER_HTTP2 = os.getenv('OPENROUTER_HTTP2', 'true').lower() in ('1', 'true', 'yes')
+# Models tried in order when the requested one fails, separated by commas; a model's circuit breaker
+# opens after OPENROUTER_BREAKER_FAILURES consecutive failures and lets a probe through after
+# OPENROUTER_BREAKER_RESET seconds. Latency and error rates cover the last OPENROUTER_ROUTER_WINDOW requests
+OPENROUTER_FALLBACK_MODELS = [model.strip() for model in os.getenv('OPENROUTER_FALLBACK_MODELS', '').split(',') if model.strip()]
+OPENROUTER_BREAKER_FAILURES = int(os.getenv('OPENROUTER_BREAKER_FAILURES', 5))
+OPENROUTER_BREAKER_RESET = float(os.getenv('OPENROUTER_BREAKER_RESET', 30))
+OPENROUTER_ROUTER_WINDOW = int(os.getenv('OPENROUTER_ROUTER_WINDOW', 100))
+# Duplicate a request to the next model once it runs longer than the model's p95 latency
+# (at least OPENROUTER_HEDGE_MIN_DELAY seconds, after OPENROUTER_HEDGE_MIN_SAMPLES successful requests)
+OPENROUTER_HEDGE = os.getenv('OPENROUTER_HEDGE', 'false').lower() in ('1', 'true', 'yes')
+OPENROUTER_HEDGE_MIN_DELAY = float(os.getenv('OPENROUTER_HEDGE_MIN_DELAY', 1))
+OPENROUTER_HEDGE_MIN_SAMPLES = int(os.getenv('OPENROUTER_HEDGE_MIN_SAMPLES', 20))
+# Completion cache shared by all sessions (size 0 disables it); only requests with a temperature of at
+# most COMPLETION_CACHE_MAX_TEMPERATURE are cached, and identical ones in flight share one upstream call.
+# Set COMPLETION_CACHE_PATH to a SQLite file to share completions between workers and keep them across restarts
+COMPLETION_CACHE_SIZE = int(os.getenv('COMPLETION_CACHE_SIZE', 1000))
+COMPLETION_CACHE_TTL = float(os.getenv('COMPLETION_CACHE_TTL', 3600))
+COMPLETION_CACHE_MAX_TEMPERATURE = float(os.getenv('COMPLETION_CACHE_MAX_TEMPERATURE', 0.2))
+COMPLETION_CACHE_PATH = os.getenv('COMPLETION_CACHE_PATH', '')
+
+# VirusTotal client configuration
+VIRUSTOTAL_API_URL = os.getenv('VIRUSTOTAL_API_URL', 'https://www.virustotal.com/api/v3')
+VIRUSTOTAL_MAX_CONNECTIONS = int(os.getenv('VIRUSTOTAL_MAX_CONNECTIONS', 10))
+VIRUSTOTAL_TIMEOUT = float(os.getenv('VIRUSTOTAL_TIMEOUT', 10))
+VIRUSTOTAL_POLL_INTERVAL = float(os.getenv('VIRUSTOTAL_POLL_INTERVAL', 5))
+VIRUSTOTAL_MAX_POLLS = int(os.getenv('VIRUSTOTAL_MAX_POLLS', 5))
+# Overall time budget for the URL lookups of one message, in seconds
+VIRUSTOTAL_DEADLINE = float(os.getenv('VIRUSTOTAL_DEADLINE', 8))
+# VirusTotal lookups allowed per minute and per API key (public API: 4), and burst size
+VIRUSTOTAL_RATE_LIMIT = float(os.getenv('VIRUSTOTAL_RATE_LIMIT', 4))
+VIRUSTOTAL_BURST = float(os.getenv('VIRUSTOTAL_BURST', 4))
+# Look up URLs in the background and return the local verdict at once
+VIRUSTOTAL_BACKGROUND = os.getenv('VIRUSTOTAL_BACKGROUND', 'true').lower() in ('1', 'true', 'yes')
+ENRICHMENT_WORKERS = int(os.getenv('ENRICHMENT_WORKERS', 2))
+ENRICHMENT_QUEUE_SIZE = int(os.getenv('ENRICHMENT_QUEUE_SIZE', 1000))
+
+# URL reputation cache (set REPUTATION_CACHE_PATH to an empty string for memory only)
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data')
+REPUTATION_CACHE_PATH = os.getenv('REPUTATION_CACHE_PATH', os.path.join(DATA_DIR, 'reputation_cache.db'))
+REPUTATION_CACHE_SIZE = int(os.getenv('REPUTATION_CACHE_SIZE', 10000))
+REPUTATION_TTL_MALICIOUS = float(os.getenv('REPUTATION_TTL_MALICIOUS', 86400))
+REPUTATION_TTL_CLEAN = float(os.getenv('REPUTATION_TTL_CLEAN', 3600))
+REPUTATION_TTL_NEGATIVE = float(os.getenv('REPUTATION_TTL_NEGATIVE', 300))
+REPUTATION_TTL_ERROR = float(os.getenv('REPUTATION_TTL_ERROR', 60))
+
+# Offline domain/URL blocklist files, separated by os.pathsep (":" on Linux)
+BLOCKLIST_PATHS = [path for path in os.getenv('BLOCKLIST_PATHS', '').split(os.pathsep) if path]
+
+# Detection rule pack, reloaded when the file changes (checked at most every RULES_RELOAD_INTERVAL seconds)
+RULES_PATH = os.getenv('RULES_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rules', 'default.json'))
+RULES_RELOAD_INTERVAL = float(os.getenv('RULES_RELOAD_INTERVAL', 2))
+# Record per-rule match timings (adds a small overhead to every scan)
+RULE_PROFILING = os.getenv('RULE_PROFILING', 'false').lower() in ('1', 'true', 'yes')
+
+# Input budgets: only the first MAX_MESSAGE_LENGTH characters of a message are analyzed, and
+# matching stops after ANALYSIS_TIME_BUDGET seconds (checked every SCAN_WINDOW characters)
+MAX_MESSAGE_LENGTH = int(os.getenv('MAX_MESSAGE_LENGTH', 100000))
+ANALYSIS_TIME_BUDGET = float(os.getenv('ANALYSIS_TIME_BUDGET', 0.5))
+SCAN_WINDOW = int(os.getenv('SCAN_WINDOW', 16384))
+
+# Record latency histograms and counters for the detection pipeline (can be switched at runtime)
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+
+# Prompt size: chat messages sent to a model are kept within CONTEXT_TOKEN_BUDGET (estimated) tokens;
+# exchanges that do not fit are folded into a summary of at most CONTEXT_SUMMARY_TOKENS, and a session
+# keeps at most HISTORY_MAX_MESSAGES messages of history
+CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', 2000))
+CONTEXT_SUMMARY_TOKENS = int(os.getenv('CONTEXT_SUMMARY_TOKENS', 400))
+HISTORY_MAX_MESSAGES = int(os.getenv('HISTORY_MAX_MESSAGES', 40))
+
+# Threat analysis result cache, shared by all sessions (size 0 disables it)
+ANALYSIS_CACHE_SIZE = int(os.getenv('ANALYSIS_CACHE_SIZE', 10000))
+ANALYSIS_CACHE_TTL = float(os.getenv('ANALYSIS_CACHE_TTL', 600))
+
+# Hashed n-gram classifier run after the rules (disabled if the model file does not exist);
+# messages scored at least CLASSIFIER_THRESHOLD add CLASSIFIER_WEIGHT * probability to the risk score
+CLASSIFIER_PATH = os.getenv('CLASSIFIER_PATH', os.path.join(DATA_DIR, 'classifier.npz'))
+CLASSIFIER_THRESHOLD = float(os.getenv('CLASSIFIER_THRESHOLD', 0.5))
+CLASSIFIER_WEIGHT = float(os.getenv('CLASSIFIER_WEIGHT', 3))
+
+# User/session database: seconds to wait for a lock, page cache per connection in KiB,
+# and fsync policy (NORMAL is safe with the WAL journal; FULL also survives power loss)
+DATABASE_BUSY_TIMEOUT = float(os.getenv('DATABASE_BUSY_TIMEOUT', 5))
+DATABASE_CACHE_SIZE_KB = int(os.getenv('DATABASE_CACHE_SIZE_KB', 8192))
+DATABASE_SYNCHRONOUS = os.getenv('DATABASE_SYNCHRONOUS', 'NORMAL').upper()
+# Threads running database queries for the async API server
+DATABASE_WORKERS = int(os.getenv('DATABASE_WORKERS', 4))
+# Verified sessions cached per process (size 0 disables it); logouts made in other worker
+# processes are picked up every SESSION_REVOCATION_INTERVAL seconds (0 turns this off)
+SESSION_CACHE_SIZE = int(os.getenv('SESSION_CACHE_SIZE', 10000))
+SESSION_CACHE_TTL = float(os.getenv('SESSION_CACHE_TTL', 60))
+SESSION_REVOCATION_INTERVAL = float(os.getenv('SESSION_REVOCATION_INTERVAL', 1))
+# Expired sessions are swept every SESSION_SWEEP_INTERVAL seconds, SESSION_SWEEP_BATCH rows per
+# transaction; a user's oldest sessions beyond SESSION_MAX_PER_USER are evicted (0 means no cap)
+SESSION_SWEEP_INTERVAL = float(os.getenv('SESSION_SWEEP_INTERVAL', 300))
+SESSION_SWEEP_BATCH = int(os.getenv('SESSION_SWEEP_BATCH', 500))
+SESSION_MAX_PER_USER = int(os.getenv('SESSION_MAX_PER_USER', 10))
+# Password hashing threads, and hashes running or queued before logins/signups get a 429
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv('PASSWORD_HASH_QUEUE_SIZE', 32))
+
 # API server settings
 API_PORT = int(os.getenv('PORT', 8000))
 API_HOST = os.getenv('HOST', '0.0.0.0')
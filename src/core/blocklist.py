@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+CyberGuard AI - Offline Blocklist
+This module loads large local domain and URL blocklists into a compact
+in-memory index that is consulted before any online reputation lookup.
+"""
+
+import os
+import sys
+import logging
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Iterable, List, Optional, Tuple
+
+# Add parent directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import settings
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Hosts-file addresses that prefix a domain on the same line
+_HOSTS_ADDRESSES = {"0.0.0.0", "127.0.0.1", "::", "::1"}
+
+
+def normalize_host(host: str) -> str:
+    """Lowercase a host name and strip port, trailing dot and wildcard prefix."""
+    host = host.strip().lower()
+    if host.startswith("*."):
+        host = host[2:]
+    host = host.lstrip(".").rstrip(".")
+    if ":" in host and not host.startswith("["):
+        host = host.split(":", 1)[0]
+    return host
+
+
+def _url_key(url: str) -> Optional[Tuple[str, str]]:
+    """Split a URL into its normalized host and path (scheme, query and fragment dropped)."""
+    url = url.strip()
+    scheme_end = url.find("://")
+    if scheme_end < 0:
+        return None
+    rest = url[scheme_end + 3:]
+
+    # A cheaper equivalent of urlsplit for the parts we need
+    netloc_end = len(rest)
+    for delimiter in "/?#":
+        position = rest.find(delimiter, 0, netloc_end)
+        if position >= 0:
+            netloc_end = position
+    netloc = rest[:netloc_end].rsplit("@", 1)[-1]
+    if not netloc:
+        return None
+
+    path = rest[netloc_end:]
+    for delimiter in "?#":
+        position = path.find(delimiter)
+        if position >= 0:
+            path = path[:position]
+    return normalize_host(netloc), path or "/"
+
+
+def _sorted_hashes(keys: Iterable[str]) -> array:
+    """Build a sorted array of 64-bit hashes."""
+    return array("q", sorted({hash(key) for key in keys}))
+
+
+def _contains(index: array, key: str) -> bool:
+    """Binary search a sorted hash array."""
+    value = hash(key)
+    position = bisect_left(index, value)
+    return position < len(index) and index[position] == value
+
+
+class DomainBlocklist:
+    """
+    Compact index of blocked domains and URL prefixes.
+
+    Entries are stored as sorted arrays of 64-bit string hashes (8 bytes per
+    entry) and looked up with binary search. A host matches if it, or any
+    parent domain, is listed, so a lookup costs one search per label.
+    URL prefixes match at path segment boundaries. Hashes are only ever
+    compared within one process, and with 64 bits a false positive needs a
+    collision that is negligible even at millions of entries.
+    """
+
+    def __init__(self, domains: Iterable[str] = (), url_prefixes: Iterable[str] = ()):
+        """
+        Build the index.
+
+        Args:
+            domains: Blocked domains (subdomains are blocked too)
+            url_prefixes: Blocked URL prefixes, e.g. "https://example.com/phish/"
+        """
+        self._domains = _sorted_hashes(normalize_host(domain) for domain in domains if domain.strip())
+
+        prefix_keys = []
+        for prefix in url_prefixes:
+            key = _url_key(prefix)
+            if key:
+                prefix_keys.append(key[0] + key[1].rstrip("/"))
+        self._prefixes = _sorted_hashes(prefix_keys)
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[str]) -> "DomainBlocklist":
+        """
+        Parse blocklist lines.
+
+        Supported formats are one domain per line (optionally "*.domain"),
+        hosts-file lines ("0.0.0.0 domain"), and full URLs, which are treated
+        as URL prefixes. Blank lines and "#" comments are ignored.
+
+        Args:
+            lines: Lines of one or more blocklist files
+
+        Returns:
+            The built blocklist
+        """
+        domains: List[str] = []
+        prefixes: List[str] = []
+        for line in lines:
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            fields = line.split()
+            entry = fields[-1] if fields[0] in _HOSTS_ADDRESSES else fields[0]
+            if "://" in entry:
+                prefixes.append(entry)
+            else:
+                domains.append(entry)
+        return cls(domains, prefixes)
+
+    @classmethod
+    def load(cls, paths: Iterable[str]) -> "DomainBlocklist":
+        """
+        Load blocklist files.
+
+        Args:
+            paths: Paths of blocklist files
+
+        Returns:
+            The built blocklist
+        """
+        def lines():
+            for path in paths:
+                try:
+                    with open(path, "r", encoding="utf-8", errors="replace") as f:
+                        yield from f
+                except OSError as e:
+                    logger.error(f"Error reading blocklist {path}: {e}")
+
+        return cls.from_lines(lines())
+
+    def __len__(self) -> int:
+        return len(self._domains) + len(self._prefixes)
+
+    def match_host(self, host: str) -> Optional[str]:
+        """
+        Check a host name against the blocked domains.
+
+        Args:
+            host: Host name
+
+        Returns:
+            The listed domain that matched (the host or a parent), or None
+        """
+        if not self._domains:
+            return None
+        return self._match_suffix(normalize_host(host))
+
+    def _match_suffix(self, host: str) -> Optional[str]:
+        """Look up a normalized host and each of its parent domains."""
+        position = 0
+        while True:
+            suffix = host[position:]
+            if suffix and _contains(self._domains, suffix):
+                return suffix
+            position = host.find(".", position) + 1
+            if position == 0:
+                return None
+
+    def match_url(self, url: str) -> Optional[str]:
+        """
+        Check a URL against the blocked domains and URL prefixes.
+
+        Args:
+            url: URL to check
+
+        Returns:
+            The matching domain or "host/path" prefix, or None
+        """
+        key = _url_key(url)
+        if key is None:
+            return None
+        host, path = key
+
+        matched = self._match_suffix(host) if self._domains else None
+        if matched or not self._prefixes:
+            return matched
+
+        # Try the host, then each path segment boundary
+        candidate = host
+        if _contains(self._prefixes, candidate):
+            return candidate
+        for segment in path.strip("/").split("/"):
+            if not segment:
+                break
+            candidate = f"{candidate}/{segment}"
+            if _contains(self._prefixes, candidate):
+                return candidate
+        return None
+
+    def memory_bytes(self) -> int:
+        """Return the memory used by the index arrays."""
+        return (
+            self._domains.buffer_info()[1] * self._domains.itemsize +
+            self._prefixes.buffer_info()[1] * self._prefixes.itemsize
+        )
+
+
+# Blocklist shared by all detectors in this process
+_shared_blocklist: Optional[DomainBlocklist] = None
+_shared_lock = threading.Lock()
+
+
+def get_blocklist() -> Optional[DomainBlocklist]:
+    """
+    Get the process-wide blocklist loaded from settings.BLOCKLIST_PATHS.
+
+    Returns:
+        The blocklist, or None if no blocklist files are configured
+    """
+    global _shared_blocklist
+    if not settings.BLOCKLIST_PATHS:
+        return None
+    with _shared_lock:
+        if _shared_blocklist is None:
+            _shared_blocklist = DomainBlocklist.load(settings.BLOCKLIST_PATHS)
+            logger.info(
+                f"Loaded {len(_shared_blocklist)} blocklist entries "
+                f"({_shared_blocklist.memory_bytes() // 1024} KiB)"
+            )
+        return _shared_blocklist
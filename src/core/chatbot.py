@@ -7,13 +7,15 @@ Base implementation for the cybersecurity chatbot.
 """
 
 import logging
-from typing import Dict, List, Optional, Union
+from typing import Callable, Dict, List, Optional, Union
 import os
 import sys
 
 # Add parent directory to path to allow imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from core.threat_detector import ThreatDetector
+from core.conversation import RollingSummary, build_messages
+from config import settings
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -42,6 +44,17 @@ class BaseChatbot:
         self.enable_threat_detection = enable_threat_detection
         self.history = []
         
+        # Exchanges that no longer fit in the prompt budget, condensed
+        self.summary = RollingSummary(settings.CONTEXT_SUMMARY_TOKENS)
+        
+        # Result of the most recent analyze_security_threats call, so callers
+        # of chat() can report it without analyzing the message again
+        self.last_threat_analysis: Optional[Dict] = None
+        
+        # Called with the complete analysis when background URL reputation
+        # lookups finish after analyze_security_threats has returned
+        self.on_threat_enriched: Optional[Callable[[Dict], None]] = None
+        
         # Initialize the threat detector if enabled
         self.threat_detector = None
         if self.enable_threat_detection:
@@ -63,19 +76,46 @@ class BaseChatbot:
             Dictionary with threat analysis results
         """
         if not self.enable_threat_detection or not self.threat_detector:
-            return {"risk_level": "none", "threat_categories": []}
+            self.last_threat_analysis = {"risk_level": "none", "threat_categories": []}
+            return self.last_threat_analysis
             
         try:
-            return self.threat_detector.analyze_message(message)
+            self.last_threat_analysis = self.threat_detector.analyze_message(
+                message, on_enriched=self.on_threat_enriched
+            )
         except Exception as e:
             logger.error(f"Error analyzing security threats: {e}")
-            return {"risk_level": "none", "threat_categories": []}
+            self.last_threat_analysis = {"risk_level": "none", "threat_categories": []}
+        return self.last_threat_analysis
     
     def clear_history(self) -> None:
         """Clear the conversation history."""
         self.history = []
+        self.summary.clear()
         logger.info("Conversation history cleared")
     
+    def _remember(self, user_input: str, response: str) -> None:
+        """
+        Add an exchange to the conversation history.
+        
+        History beyond HISTORY_MAX_MESSAGES is folded into the summary and
+        dropped, so a long session does not keep growing in memory.
+        
+        Args:
+            user_input: The user's message
+            response: The chatbot's response
+        """
+        self.history.append({"role": "user", "content": user_input})
+        self.history.append({"role": "assistant", "content": response})
+        
+        excess = len(self.history) - settings.HISTORY_MAX_MESSAGES
+        if excess > 0:
+            excess += excess % 2  # drop whole exchanges
+            if excess > self.summary.covered:
+                self.summary.fold(self.history[self.summary.covered:excess])
+            del self.history[:excess]
+            self.summary.forget(excess)
+    
     def _create_cybersecurity_prompt(self, user_input: str, security_recommendations: List[str] = None) -> str:
         """
         Create a cybersecurity-focused prompt for the model.
@@ -116,21 +156,8 @@ Always prioritize user security and privacy in your responses. Be detailed and f
         # Get the system prompt
         system_prompt = self._create_cybersecurity_prompt(user_input, security_recommendations)
         
-        # Create the chat messages
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_input}
-        ]
-        
-        # Add conversation history if available (limiting to last 5 exchanges)
-        if self.history:
-            # Extract the most recent history (limited to 5 exchanges)
-            recent_history = self.history[-5:]
-            
-            # Insert history before the user's current message
-            messages = [{"role": "system", "content": system_prompt}] + recent_history + [{"role": "user", "content": user_input}]
-        
-        return messages
+        # Add as many recent exchanges as fit in the token budget; older ones are summarized
+        return build_messages(system_prompt, self.history, user_input, self.summary, settings.CONTEXT_TOKEN_BUDGET)
     
     def chat(self, user_input: str) -> str:
         """
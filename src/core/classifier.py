@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+CyberGuard AI - Message Classifier
+This module provides a compact logistic regression model over hashed word
+n-grams, used as a second detection stage after the rule pack. It runs on
+the CPU with NumPy only.
+"""
+
+import os
+import re
+import sys
+import zlib
+import hashlib
+import logging
+import threading
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Add parent directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import settings
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"\w+")
+
+
+class HashedNGramClassifier:
+    """
+    Logistic regression over hashed word n-grams.
+
+    A message is lowercased and split into words; every word n-gram up to
+    ``ngram`` words long is hashed (CRC-32) into one of ``n_features``
+    buckets. The model is a weight per bucket plus a bias, and the
+    probability of a message is the logistic function of the bias plus the
+    weights of the distinct buckets it hits.
+    """
+
+    def __init__(self, weights: np.ndarray, bias: float = 0.0, ngram: int = 2):
+        """
+        Initialize a classifier from its parameters.
+
+        Args:
+            weights: Weight per hash bucket; its length must be a power of two
+            bias: Bias term
+            ngram: Longest word n-gram hashed
+        """
+        weights = np.asarray(weights, dtype=np.float32)
+        size = len(weights)
+        if size == 0 or size & (size - 1):
+            raise ValueError("number of weights must be a power of two")
+        self.weights = weights
+        self.bias = float(bias)
+        self.ngram = int(ngram)
+        self._mask = size - 1
+
+        digest = hashlib.sha256(weights.tobytes())
+        digest.update(f"{self.bias!r}:{self.ngram}".encode())
+        self.version = digest.hexdigest()[:16]
+
+    @property
+    def n_features(self) -> int:
+        """Number of hash buckets."""
+        return len(self.weights)
+
+    def buckets(self, text: str) -> List[int]:
+        """
+        Get the distinct hash buckets of a text.
+
+        Args:
+            text: Text to hash
+
+        Returns:
+            List of bucket indices
+        """
+        words = _TOKEN.findall(text.lower())
+        mask = self._mask
+        found = set()
+        for size in range(1, self.ngram + 1):
+            for start in range(len(words) - size + 1):
+                gram = " ".join(words[start:start + size])
+                found.add(zlib.crc32(gram.encode("utf-8", "surrogatepass")) & mask)
+        return list(found)
+
+    def _hash_batch(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Hash texts into flat (row, bucket) index arrays."""
+        rows: List[int] = []
+        columns: List[int] = []
+        for row, text in enumerate(texts):
+            buckets = self.buckets(text)
+            rows.extend([row] * len(buckets))
+            columns.extend(buckets)
+        return np.array(rows, dtype=np.intp), np.array(columns, dtype=np.intp)
+
+    def _logits(self, rows: np.ndarray, columns: np.ndarray, count: int, weights: np.ndarray, bias: float) -> np.ndarray:
+        """Sum the weights hit by each row."""
+        return bias + np.bincount(rows, weights=weights[columns], minlength=count)
+
+    def predict_proba(self, texts: Iterable[str]) -> np.ndarray:
+        """
+        Compute the probability that each text is malicious.
+
+        Args:
+            texts: Texts to classify
+
+        Returns:
+            Vector of probabilities, one per text
+        """
+        texts = list(texts)
+        if not texts:
+            return np.zeros(0)
+        rows, columns = self._hash_batch(texts)
+        logits = self._logits(rows, columns, len(texts), self.weights, self.bias)
+        return 1.0 / (1.0 + np.exp(-logits))
+
+    @classmethod
+    def train(
+        cls,
+        texts: Sequence[str],
+        labels: Sequence[int],
+        n_features: int = 2 ** 18,
+        ngram: int = 2,
+        epochs: int = 10,
+        learning_rate: float = 0.5,
+        l2: float = 1e-6,
+        batch_size: int = 64,
+        seed: int = 0
+    ) -> "HashedNGramClassifier":
+        """
+        Train a classifier with mini-batch gradient descent on the log loss.
+
+        Args:
+            texts: Training texts
+            labels: 1 for malicious texts, 0 for benign ones
+            n_features: Number of hash buckets (a power of two)
+            ngram: Longest word n-gram hashed
+            epochs: Passes over the training data
+            learning_rate: Gradient step size
+            l2: L2 regularization strength
+            batch_size: Texts per gradient step
+            seed: Seed of the shuffling order
+
+        Returns:
+            Trained classifier
+        """
+        labels = np.asarray(labels, dtype=np.float64)
+        if len(texts) != len(labels) or not len(texts):
+            raise ValueError("need the same, non-zero number of texts and labels")
+
+        model = cls(np.zeros(n_features, dtype=np.float32), 0.0, ngram)
+        hashed = [np.array(model.buckets(text), dtype=np.intp) for text in texts]
+        weights = np.zeros(n_features, dtype=np.float64)
+        bias = 0.0
+        random = np.random.default_rng(seed)
+
+        for _ in range(epochs):
+            order = random.permutation(len(texts))
+            for start in range(0, len(order), batch_size):
+                batch = order[start:start + batch_size]
+                columns = np.concatenate([hashed[index] for index in batch])
+                rows = np.repeat(np.arange(len(batch)), [len(hashed[index]) for index in batch])
+                probabilities = 1.0 / (1.0 + np.exp(-model._logits(rows, columns, len(batch), weights, bias)))
+                errors = (probabilities - labels[batch]) / len(batch)
+                if l2:
+                    weights *= 1.0 - learning_rate * l2
+                np.subtract.at(weights, columns, learning_rate * errors[rows])
+                bias -= learning_rate * errors.sum()
+
+        return cls(weights, bias, ngram)
+
+    def save(self, path: str) -> None:
+        """
+        Save the model as a NumPy .npz file.
+
+        Args:
+            path: Destination path
+        """
+        with open(path, "wb") as f:
+            np.savez_compressed(f, weights=self.weights, bias=np.float64(self.bias), ngram=np.int64(self.ngram))
+
+    @classmethod
+    def load(cls, path: str) -> "HashedNGramClassifier":
+        """
+        Load a model saved with ``save``.
+
+        Args:
+            path: Path of the .npz file
+
+        Returns:
+            Loaded classifier
+        """
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["weights"], float(data["bias"]), int(data["ngram"]))
+
+
+# Model shared by all detectors in this process, loaded on first use
+_shared_classifier: Optional[HashedNGramClassifier] = None
+_shared_loaded = False
+_shared_lock = threading.Lock()
+
+
+def get_classifier() -> Optional[HashedNGramClassifier]:
+    """
+    Get the process-wide classifier loaded from CLASSIFIER_PATH.
+
+    Returns:
+        The classifier, or None if no model file is configured or it cannot be loaded
+    """
+    global _shared_classifier, _shared_loaded
+    with _shared_lock:
+        if not _shared_loaded:
+            _shared_loaded = True
+            path = settings.CLASSIFIER_PATH
+            if not path or not os.path.exists(path):
+                logger.info("No classifier model found, classifier stage disabled")
+            else:
+                try:
+                    _shared_classifier = HashedNGramClassifier.load(path)
+                    logger.info(f"Loaded classifier model {_shared_classifier.version} from {path}")
+                except (OSError, KeyError, ValueError) as e:
+                    logger.error(f"Error loading classifier model {path}: {e}")
+        return _shared_classifier
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+CyberGuard AI - Conversation Window
+This module fits the conversation history into a token budget: recent
+exchanges are sent verbatim, older ones are folded into a rolling summary
+that is kept between turns and only extended with the exchanges it has not
+seen yet.
+"""
+
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+# Estimated tokens added by the chat format to every message (role, separators)
+MESSAGE_OVERHEAD = 4
+
+# Characters kept from each side of an exchange in the summary
+SUMMARY_USER_CHARS = 120
+SUMMARY_ASSISTANT_CHARS = 160
+
+SUMMARY_HEADER = "Summary of the earlier conversation (oldest first):"
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens of a text without tokenizing it.
+
+    Uses the common rule of thumb of four characters per token, which is
+    close for English prose and costs O(1) however long the text is.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Estimated token count
+    """
+    return (len(text) + 3) // 4
+
+
+def message_tokens(message: Dict[str, str]) -> int:
+    """Estimated tokens of a chat message, including its formatting overhead."""
+    return estimate_tokens(message.get("content") or "") + MESSAGE_OVERHEAD
+
+
+def clip(text: str, limit: int) -> str:
+    """
+    Shorten a text to at most ``limit`` characters on a word boundary.
+
+    Only the start of the text is looked at, so a pasted log costs as little
+    as a short message.
+
+    Args:
+        text: Text to shorten
+        limit: Maximum number of characters
+
+    Returns:
+        The text with whitespace collapsed, ending in "..." if it was cut
+    """
+    head = " ".join((text or "")[:limit * 2].split())
+    if len(head) <= limit and len(text or "") <= limit * 2:
+        return head
+    cut = head[:limit].rsplit(" ", 1)[0] if " " in head[:limit] else head[:limit]
+    return cut + "..."
+
+
+class RollingSummary:
+    """
+    Extractive summary of the oldest part of a conversation.
+
+    Every exchange folded in becomes one line quoting the start of the
+    question and of the answer. When the summary grows past ``max_tokens``
+    the oldest lines are dropped. ``covered`` is the number of history
+    messages it stands for; they are never sent verbatim again.
+    """
+
+    def __init__(self, max_tokens: int):
+        """
+        Initialize an empty summary.
+
+        Args:
+            max_tokens: Maximum estimated size of the summary
+        """
+        self.max_tokens = max_tokens
+        self.covered = 0
+        self._lines: deque = deque()
+        self._tokens = 0
+        self._message: Optional[Dict[str, str]] = None
+
+        # Sizes of the history messages after the covered ones, measured once each
+        self._sizes: deque = deque()
+        self._sizes_total = 0
+        self._tail: Optional[Dict[str, str]] = None
+
+    def fold(self, messages: List[Dict[str, str]]) -> None:
+        """
+        Add messages that follow the ones already covered.
+
+        Args:
+            messages: History messages, in (user, assistant) order
+        """
+        for index in range(0, len(messages), 2):
+            question = clip(messages[index].get("content", ""), SUMMARY_USER_CHARS)
+            answer = (
+                clip(messages[index + 1].get("content", ""), SUMMARY_ASSISTANT_CHARS)
+                if index + 1 < len(messages) else ""
+            )
+            line = f"- User: {question} | Assistant: {answer}"
+            self._lines.append(line)
+            self._tokens += estimate_tokens(line) + 1
+        while self._lines and self._tokens > self.max_tokens:
+            self._tokens -= estimate_tokens(self._lines.popleft()) + 1
+        self.covered += len(messages)
+        self._message = None
+        for _ in range(min(len(messages), len(self._sizes))):
+            self._sizes_total -= self._sizes.popleft()
+
+    def measure(self, pending: List[Dict[str, str]]) -> Tuple[int, deque]:
+        """
+        Get the estimated tokens of the history messages not covered.
+
+        Only messages appended since the last call are measured, so a turn
+        costs the same however long the conversation is.
+
+        Args:
+            pending: History messages after the covered ones
+
+        Returns:
+            Tuple of (total estimated tokens, estimated tokens per message)
+        """
+        sizes = self._sizes
+        measured = len(sizes)
+        if measured == len(pending) and (not measured or pending[-1] is self._tail):
+            return self._sizes_total, sizes
+        if measured > len(pending) or (measured and pending[measured - 1] is not self._tail):
+            # The history was changed in place; measure it again
+            sizes.clear()
+            self._sizes_total = 0
+        for message in pending[len(sizes):]:
+            size = message_tokens(message)
+            sizes.append(size)
+            self._sizes_total += size
+        self._tail = pending[-1] if pending else None
+        return self._sizes_total, sizes
+
+    def forget(self, count: int) -> None:
+        """Account for the first ``count`` history messages being deleted (they must be covered)."""
+        self.covered -= count
+
+    def message(self) -> Optional[Dict[str, str]]:
+        """
+        Get the summary as a chat message, built once per change.
+
+        Returns:
+            A system message, or None if nothing has been summarized
+        """
+        if self._message is None and self._lines:
+            self._message = {"role": "system", "content": SUMMARY_HEADER + "\n" + "\n".join(self._lines)}
+        return self._message
+
+    def clear(self) -> None:
+        """Drop the summary."""
+        self.covered = 0
+        self._lines.clear()
+        self._tokens = 0
+        self._message = None
+        self._sizes.clear()
+        self._sizes_total = 0
+        self._tail = None
+
+
+def build_messages(
+    system_prompt: str,
+    history: List[Dict[str, str]],
+    user_input: str,
+    summary: RollingSummary,
+    budget: int
+) -> List[Dict[str, str]]:
+    """
+    Build the chat messages of a turn within a token budget.
+
+    The system prompt and the new message are always sent. The most recent
+    whole exchanges that fit in the rest of the budget follow the system
+    prompt; older exchanges are folded into the summary, which is sent as a
+    second system message.
+
+    Args:
+        system_prompt: System prompt of the turn
+        history: Conversation history as (user, assistant) message pairs
+        user_input: The user's new message
+        summary: Rolling summary of this conversation, updated in place
+        budget: Maximum estimated tokens of the prompt
+
+    Returns:
+        List of chat messages in the format [{"role": "...", "content": "..."}]
+    """
+    system = {"role": "system", "content": system_prompt}
+    current = {"role": "user", "content": user_input}
+    available = budget - estimate_tokens(system_prompt) - estimate_tokens(user_input) - 2 * MESSAGE_OVERHEAD
+
+    # Walk back over whole exchanges until the budget is used up
+    pending = history[summary.covered:]
+    total, sizes = summary.measure(pending)
+    summary_message = summary.message()
+    if total <= available - (message_tokens(summary_message) if summary_message else 0):
+        start = 0
+    else:
+        # Leave room for the summary as large as it may grow
+        available -= summary.max_tokens + estimate_tokens(SUMMARY_HEADER) + MESSAGE_OVERHEAD + 1
+        start = len(pending)
+        used = 0
+        while start >= 2 and used + sizes[start - 2] + sizes[start - 1] <= available:
+            used += sizes[start - 2] + sizes[start - 1]
+            start -= 2
+        if start:
+            summary.fold(pending[:start])
+
+    messages = [system]
+    summary_message = summary.message()
+    if summary_message is not None:
+        messages.append(summary_message)
+    messages.extend(pending[start:])
+    messages.append(current)
+    return messages
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+CyberGuard AI - Risk Features
+This module turns rule matches into fixed-width numeric feature vectors and
+scores whole feature matrices at once with NumPy.
+"""
+
+import os
+import sys
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Add parent directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.rules import RulePack, _distinct_values
+
+# Columns that do not come from a match key
+BASE_FEATURES = ["message_length", "url_count"]
+
+
+class RiskFeatures:
+    """
+    Feature layout and vectorized scoring table of one rule pack.
+
+    A feature vector holds the message length, the number of URLs in the
+    message and, for every match key of the pack (pattern names, phrase
+    categories and detector-provided keys such as ``blocklisted_url``), the
+    number of distinct values matched. ``score`` applies the pack's scoring
+    table to a matrix of such vectors with a few matrix operations, so a
+    stored matrix can be re-scored with new weights without scanning the
+    messages again.
+
+    Scoring rules fire on the sum of their keys' distinct counts, so a value
+    matched by two keys of the same rule counts twice here, where
+    ``RulePack.score`` counts it once.
+    """
+
+    def __init__(self, rules: RulePack):
+        """
+        Build the feature layout and scoring matrices of a rule pack.
+
+        Args:
+            rules: Rule pack to take the match keys and scoring table from
+        """
+        self.version = rules.version
+        self.scoring = rules.scoring
+        self.risk_levels = rules.risk_levels
+
+        keys: List[str] = list(rules.patterns)
+        if rules.phrase_matcher is not None:
+            keys.extend(rules.phrase_matcher.categories)
+        for rule in rules.scoring:
+            for key in rule.when_any + rule.requires_any:
+                if key not in keys:
+                    keys.append(key)
+        self.keys = keys
+        self.names = BASE_FEATURES + keys
+        self.index = {name: column for column, name in enumerate(self.names)}
+
+        # One column per scoring rule: which features it fires on / requires
+        width, count = len(self.names), len(rules.scoring)
+        self._when = np.zeros((width, count), dtype=np.float64)
+        self._requires = np.zeros((width, count), dtype=np.float64)
+        for column, rule in enumerate(rules.scoring):
+            for key in rule.when_any:
+                self._when[self.index[key], column] = 1.0
+            for key in rule.requires_any:
+                self._requires[self.index[key], column] = 1.0
+        self._has_requires = np.array([bool(rule.requires_any) for rule in rules.scoring])
+        self._min_count = np.array([max(rule.min_count, 1) for rule in rules.scoring], dtype=np.float64)
+        self._per_match = np.array([rule.per_match for rule in rules.scoring])
+        self._scores = np.array([rule.score for rule in rules.scoring], dtype=np.float64)
+
+    @property
+    def width(self) -> int:
+        """Number of features per message."""
+        return len(self.names)
+
+    def vector(self, message: str, matches: Dict) -> np.ndarray:
+        """
+        Build the feature vector of one message.
+
+        Args:
+            message: Analyzed message
+            matches: Matches of the message, including detector-provided keys
+
+        Returns:
+            Float vector of length ``width``
+        """
+        vector = np.zeros(self.width, dtype=np.float64)
+        vector[0] = len(message)
+        vector[1] = len(matches.get("url") or ())
+        for column, key in enumerate(self.keys, len(BASE_FEATURES)):
+            matched = matches.get(key)
+            if matched:
+                vector[column] = len(_distinct_values(matched))
+        return vector
+
+    def fired(self, features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Work out which scoring rules fire for each message.
+
+        Args:
+            features: Feature matrix, one row per message
+
+        Returns:
+            Tuple of (boolean matrix with one column per scoring rule, matrix
+            of each rule's matched value counts)
+        """
+        features = np.atleast_2d(features)
+        counts = features @ self._when
+        fired = counts >= self._min_count
+        required = (features @ self._requires) > 0
+        fired &= required | ~self._has_requires
+        return fired, counts
+
+    def score(self, features: np.ndarray, weights: Optional[Dict[str, float]] = None) -> np.ndarray:
+        """
+        Compute the risk score of each message.
+
+        Args:
+            features: Feature matrix, one row per message
+            weights: Scoring rule name -> score overrides (optional)
+
+        Returns:
+            Vector of risk scores
+        """
+        scores = self._scores
+        if weights:
+            scores = scores.copy()
+            for column, rule in enumerate(self.scoring):
+                if rule.name in weights:
+                    scores[column] = weights[rule.name]
+
+        fired, counts = self.fired(features)
+        # per_match rules add their score once per distinct value
+        multiplier = np.where(self._per_match, counts, 1.0)
+        return (fired * multiplier) @ scores
+
+    def levels(self, risk_scores: np.ndarray, thresholds: Optional[Dict[str, float]] = None) -> np.ndarray:
+        """
+        Map risk scores to risk levels.
+
+        Args:
+            risk_scores: Vector of risk scores
+            thresholds: Risk level -> minimum score overrides (optional)
+
+        Returns:
+            Array of risk level names ("none" below every threshold)
+        """
+        risk_levels = self.risk_levels
+        if thresholds:
+            risk_levels = sorted(
+                ((thresholds.get(level, threshold), level) for threshold, level in risk_levels),
+                reverse=True
+            )
+        risk_scores = np.asarray(risk_scores)
+        return np.select(
+            [risk_scores >= threshold for threshold, _ in risk_levels],
+            [level for _, level in risk_levels],
+            default="none"
+        )
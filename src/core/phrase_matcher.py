@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+CyberGuard AI - Phrase Matcher
+This module implements an Aho-Corasick automaton that finds phishing and
+scam phrases from large multilingual dictionaries in a single linear pass.
+"""
+
+import re
+import json
+import logging
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Scripts from this code point on are written without spaces between words
+# (CJK, kana), so phrases in them are matched inside longer runs of text
+_UNSPACED_SCRIPTS_START = 0x2E80
+
+# Runs of whitespace, including line breaks, match the single spaces of phrases
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _is_word_char(char: str) -> bool:
+    """Tell whether a character continues a space-delimited word."""
+    return char.isalnum() and ord(char) < _UNSPACED_SCRIPTS_START
+
+
+class PhraseMatcher:
+    """
+    Multi-pattern phrase matcher built on an Aho-Corasick automaton.
+
+    The automaton is built once from category -> phrase lists. Matching is
+    case-insensitive (Unicode casefolding) and runs in time linear in the
+    text length regardless of how many phrases there are. By default phrases
+    only match whole words, so "alert" does not fire inside "alerted".
+    """
+
+    def __init__(self, phrases: Dict[str, Iterable[str]], whole_words: bool = True):
+        """
+        Build the automaton.
+
+        Args:
+            phrases: Mapping of category name to the phrases in that category
+            whole_words: Only report phrases that are not part of a longer word
+        """
+        self.whole_words = whole_words
+        self.categories = list(phrases)
+
+        # goto[node] maps a character to the next node; node 0 is the root
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # out[node] lists (category, phrase, length) ending at that node
+        self._out: List[List[Tuple[str, str, int]]] = [[]]
+
+        count = 0
+        self.longest = 0
+        for category, entries in phrases.items():
+            for phrase in entries:
+                key = " ".join(phrase.casefold().split())
+                if key:
+                    self._add(key, category, phrase)
+                    self.longest = max(self.longest, len(key))
+                    count += 1
+        self._build_failure_links()
+        self.size = count
+        logger.debug(f"Built phrase matcher with {count} phrases and {len(self._goto)} states")
+
+    def _add(self, key: str, category: str, phrase: str) -> None:
+        """Insert a casefolded phrase into the trie."""
+        node = 0
+        for char in key:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = next_node
+        entry = (category, phrase, len(key))
+        if entry not in self._out[node]:
+            self._out[node].append(entry)
+
+    def _build_failure_links(self) -> None:
+        """Compute failure links breadth-first and merge outputs along them."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def stream(self) -> "PhraseStream":
+        """Start matching text that arrives in chunks."""
+        return PhraseStream(self)
+
+    def match(self, text: str) -> Dict[str, Dict[str, int]]:
+        """
+        Find the phrases occurring in a text.
+
+        Args:
+            text: Text to search
+
+        Returns:
+            Dictionary mapping each matched category to a dictionary of the
+            phrases found and their number of occurrences
+        """
+        stream = self.stream()
+        stream.feed(text)
+        return stream.finish()
+
+
+class PhraseStream:
+    """
+    Incremental matching state of a PhraseMatcher.
+
+    Feeding a text in several chunks gives the same result as feeding it at
+    once, including whole-word checks on phrases that touch a chunk boundary.
+    """
+
+    def __init__(self, matcher: PhraseMatcher):
+        self._matcher = matcher
+        self._node = 0
+        # Last characters seen, for the whole-word check before a phrase
+        self._tail = " "
+        # Matches that end at the end of the last chunk, waiting for the next character
+        self._pending: List[Tuple[str, str]] = []
+        # category -> phrase -> occurrences, bounded by the dictionary size
+        self._hits: Dict[str, Dict[str, int]] = {}
+
+    def feed(self, chunk: str) -> None:
+        """
+        Match the next chunk of text.
+
+        Args:
+            chunk: Text chunk
+        """
+        if not chunk:
+            return
+        matcher = self._matcher
+        goto, fail, out = matcher._goto, matcher._fail, matcher._out
+        whole_words = matcher.whole_words
+        record = self._record
+
+        text = _WHITESPACE.sub(" ", chunk.casefold())
+        if text[0] == " " and self._tail[-1] == " ":
+            # Whitespace run continued from the previous chunk
+            text = text[1:]
+            if not text:
+                return
+        if self._pending:
+            if not (whole_words and _is_word_char(text[0])):
+                for category, phrase in self._pending:
+                    record(category, phrase)
+            self._pending = []
+
+        # Prepend the end of the previous chunk for the start-of-phrase check
+        context = self._tail + text
+        offset = len(self._tail)
+        last = len(text) - 1
+
+        node = self._node
+        for index, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if not out[node]:
+                continue
+            for category, phrase, size in out[node]:
+                if whole_words:
+                    start = offset + index - size + 1
+                    if _is_word_char(context[start - 1]) and _is_word_char(context[start]):
+                        continue
+                    if _is_word_char(char):
+                        if index == last:
+                            # The next character decides, it is in the next chunk
+                            self._pending.append((category, phrase))
+                            continue
+                        if _is_word_char(text[index + 1]):
+                            continue
+                record(category, phrase)
+
+        self._node = node
+        self._tail = context[-(matcher.longest + 1):]
+
+    def _record(self, category: str, phrase: str) -> None:
+        """Count one phrase occurrence."""
+        phrases = self._hits.setdefault(category, {})
+        phrases[phrase] = phrases.get(phrase, 0) + 1
+
+    def finish(self) -> Dict[str, Dict[str, int]]:
+        """
+        Finish matching.
+
+        Returns:
+            Dictionary mapping each matched category to a dictionary of the
+            phrases found and their number of occurrences
+        """
+        for category, phrase in self._pending:
+            self._record(category, phrase)
+        self._pending = []
+        return self._hits
+
+
+def parse_phrases(data: Dict) -> Dict[str, List[str]]:
+    """
+    Read phrase lists from a parsed phrase file.
+
+    The file maps category names either to a list of phrases or to an object
+    mapping language codes to lists of phrases. Keys starting with "_" are
+    ignored.
+
+    Args:
+        data: Parsed JSON object
+
+    Returns:
+        Dictionary mapping categories to phrases
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Phrase file must contain a JSON object")
+
+    phrases: Dict[str, List[str]] = {}
+    for category, entries in data.items():
+        if category.startswith("_"):
+            continue
+        if isinstance(entries, dict):
+            entries = [phrase for language in entries.values() for phrase in language]
+        if not isinstance(entries, list) or not all(isinstance(phrase, str) for phrase in entries):
+            raise ValueError(f"Phrases of category '{category}' must be strings")
+        phrases[category] = entries
+    return phrases
+
+
+def load_phrases(path: str) -> Dict[str, List[str]]:
+    """
+    Load phrase lists from a JSON file.
+
+    Args:
+        path: Path of the JSON file
+
+    Returns:
+        Dictionary mapping categories to phrases
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return parse_phrases(json.load(f))
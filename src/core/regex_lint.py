@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+CyberGuard AI - Pattern Linter
+This module checks detection patterns for constructs prone to catastrophic
+backtracking (ReDoS) before they are compiled into a rule pack.
+"""
+
+import re
+from typing import Dict, List, Optional
+
+try:
+    import re._parser as sre_parse
+    from re._constants import ANY, BRANCH, IN, LITERAL, MAXREPEAT, MAX_REPEAT, MIN_REPEAT, NOT_LITERAL, SUBPATTERN
+except ImportError:  # Python < 3.11
+    import sre_parse
+    from sre_constants import ANY, BRANCH, IN, LITERAL, MAXREPEAT, MAX_REPEAT, MIN_REPEAT, NOT_LITERAL, SUBPATTERN
+
+from core.scanner import _first_class
+
+# Characters used to decide whether two character classes overlap
+_SAMPLE = [chr(code) for code in range(0x300)] + ["Ѐ", " ", "　", "一", "０"]
+
+
+def _item_class(op, av) -> Optional[str]:
+    """Character class source of the first character one parsed item matches."""
+    if op is ANY:
+        return "."
+    if op is NOT_LITERAL:
+        return f"[^{re.escape(chr(av))}]"
+    if op in (MAX_REPEAT, MIN_REPEAT):
+        return _sequence_class(av[2])
+    return _first_class([(op, av)])
+
+
+def _last_class(op, av) -> Optional[str]:
+    """Character class source of the last character a repeat's iteration matches."""
+    if op in (MAX_REPEAT, MIN_REPEAT):
+        body = _flatten(av[2])
+        if not body:
+            return None
+        last_op, last_av = body[-1]
+        if len(body) > 1 and last_op in (MAX_REPEAT, MIN_REPEAT) and last_av[0] == 0:
+            # With an optional tail, the iteration may end on an earlier item
+            return None
+        return _last_class(last_op, last_av)
+    return _item_class(op, av)
+
+
+def _sequence_class(items) -> Optional[str]:
+    """Character class source of the first character a parsed sequence matches."""
+    if len(items) == 1:
+        return _item_class(*items[0])
+    return _first_class(items)
+
+
+def _overlap(first: Optional[str], second: Optional[str], flags: int) -> bool:
+    """Tell whether two character classes share a character (unknown classes always do)."""
+    if first is None or second is None:
+        return True
+    first_re, second_re = re.compile(first, flags | re.DOTALL), re.compile(second, flags | re.DOTALL)
+    return any(first_re.match(char) and second_re.match(char) for char in _SAMPLE)
+
+
+def _unbounded(op, av) -> bool:
+    """Tell whether an item is a repeat without an upper bound that can match text."""
+    return op in (MAX_REPEAT, MIN_REPEAT) and av[1] == MAXREPEAT and _can_match_text(av[2])
+
+
+def _repeats_unbounded(op, av) -> bool:
+    """
+    Tell whether an item repeats an unbounded match: it is an unbounded repeat,
+    or a repeat of more than one iteration whose body contains one. A bounded
+    outer repeat does not help: ``(a+){2,40}`` backtracks as badly as ``(a+)+``.
+    """
+    if _unbounded(op, av):
+        return True
+    return (
+        op in (MAX_REPEAT, MIN_REPEAT) and av[1] > 1
+        and any(_has_unbounded(*item) for item in av[2])
+    )
+
+
+def _has_unbounded(op, av) -> bool:
+    """Tell whether an item is or contains an unbounded repeat."""
+    if _unbounded(op, av):
+        return True
+    if op in (MAX_REPEAT, MIN_REPEAT):
+        return any(_has_unbounded(*item) for item in av[2])
+    if op is SUBPATTERN:
+        return any(_has_unbounded(*item) for item in av[-1])
+    if op is BRANCH:
+        return any(_has_unbounded(*item) for branch in av[1] for item in branch)
+    return False
+
+
+def _can_match_text(items) -> bool:
+    """Tell whether a parsed sequence can consume characters."""
+    for op, av in items:
+        if op in (LITERAL, NOT_LITERAL, ANY, IN):
+            return True
+        if op is SUBPATTERN and _can_match_text(av[-1]):
+            return True
+        if op is BRANCH and any(_can_match_text(branch) for branch in av[1]):
+            return True
+        if op in (MAX_REPEAT, MIN_REPEAT) and av[1] > 0 and _can_match_text(av[2]):
+            return True
+    return False
+
+
+def _mandatory(op, av) -> bool:
+    """Tell whether an item always consumes at least one character."""
+    if op in (LITERAL, NOT_LITERAL, ANY, IN):
+        return True
+    if op in (MAX_REPEAT, MIN_REPEAT):
+        return av[0] >= 1 and any(_mandatory(*item) for item in av[2])
+    if op is SUBPATTERN:
+        return any(_mandatory(*item) for item in av[-1])
+    return False
+
+
+def _flatten(items) -> List:
+    """Inline non-repeated groups so that a sequence can be inspected item by item."""
+    flat = []
+    for op, av in items:
+        if op is SUBPATTERN:
+            flat.extend(_flatten(av[-1]))
+        else:
+            flat.append((op, av))
+    return flat
+
+
+def _check_sequence(items, flags: int, problems: List[str]) -> None:
+    """Walk a parsed sequence and record backtracking hazards."""
+    flat = _flatten(items)
+
+    for position, (op, av) in enumerate(flat):
+        if op is BRANCH:
+            for branch in av[1]:
+                _check_sequence(branch, flags, problems)
+            continue
+        if op not in (MAX_REPEAT, MIN_REPEAT):
+            continue
+
+        body = _flatten(av[2])
+        unbounded = _repeats_unbounded(op, av)
+
+        if unbounded:
+            # (x|.)* : each iteration can take either branch, doubling the paths
+            for branch_op, branch_av in body:
+                if branch_op is not BRANCH:
+                    continue
+                classes = [_sequence_class(branch) for branch in branch_av[1]]
+                if any(
+                    _overlap(first, second, flags)
+                    for index, first in enumerate(classes) for second in classes[index + 1:]
+                ):
+                    problems.append("alternation with overlapping branches under an unbounded quantifier")
+
+            # (\w+\s?)+ : an inner repeat not separated by a distinct mandatory character
+            for inner_position, inner in enumerate(body):
+                if not _has_unbounded(*inner):
+                    continue
+                inner_class = _item_class(*inner)
+                separated = any(
+                    _mandatory(*other) and not _overlap(inner_class, _item_class(*other), flags)
+                    for other_position, other in enumerate(body) if other_position != inner_position
+                )
+                if not separated:
+                    problems.append("nested unbounded quantifiers")
+                    break
+
+        # \d+\d+ : adjacent repeats over the same characters split the input many ways
+        if unbounded and position + 1 < len(flat) and _repeats_unbounded(*flat[position + 1]):
+            if _overlap(_last_class(op, av), _item_class(*flat[position + 1]), flags):
+                problems.append("adjacent unbounded quantifiers over overlapping characters")
+
+        _check_sequence(av[2], flags, problems)
+
+
+def lint_pattern(source: str, flags: int = re.MULTILINE) -> List[str]:
+    """
+    Check a regular expression for catastrophic backtracking hazards.
+
+    Detected constructs are nested unbounded quantifiers without a
+    separating character (``(a+)+``), alternations with overlapping
+    branches under an unbounded quantifier (``(a|.)*``) and adjacent
+    unbounded quantifiers over overlapping characters (``\\d+\\d*``).
+    A repeat of more than one iteration around an unbounded quantifier
+    counts as unbounded, so ``(a+){2,40}`` and ``(.*a){20}`` are rejected
+    as well.
+
+    Args:
+        source: Pattern source
+        flags: Flags the pattern is compiled with
+
+    Returns:
+        List of problem descriptions (empty if none were found)
+
+    Raises:
+        re.error: If the pattern does not compile
+    """
+    parsed = sre_parse.parse(source, flags)
+    flags = parsed.state.flags if hasattr(parsed, "state") else flags
+    problems: List[str] = []
+    _check_sequence(list(parsed), flags & re.IGNORECASE, problems)
+    return list(dict.fromkeys(problems))
+
+
+def lint_patterns(patterns: Dict[str, str], flags: int = re.MULTILINE) -> None:
+    """
+    Check a set of named patterns, rejecting any with backtracking hazards.
+
+    Args:
+        patterns: Rule name -> pattern source
+        flags: Flags the patterns are compiled with
+
+    Raises:
+        ValueError: If a pattern is prone to catastrophic backtracking
+    """
+    rejected = []
+    for name, source in patterns.items():
+        problems = lint_pattern(source, flags)
+        if problems:
+            rejected.append(f"{name}: {', '.join(problems)}")
+    if rejected:
+        raise ValueError("Patterns prone to catastrophic backtracking: " + "; ".join(rejected))
@@ -0,0 +1,521 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+CyberGuard AI - Rule Packs
+This module loads declarative detection rule packs (patterns, phrase
+dictionaries and scoring rules), compiles them once, and hot-swaps them
+when the files change.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Add parent directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import settings
+from core.scanner import CompiledScanner
+from core.regex_lint import lint_patterns
+from utils.metrics import metrics
+from core.phrase_matcher import PhraseMatcher, parse_phrases
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class ScoringRule(NamedTuple):
+    """One entry of a rule pack's scoring table."""
+    name: str
+    when_any: Tuple[str, ...]
+    requires_any: Tuple[str, ...]
+    min_count: int
+    per_match: bool
+    score: float
+    categories: Tuple[str, ...]
+    indicator: str
+    recommendations: Tuple[str, ...]
+
+
+def _string_list(rule: Dict, key: str, required: bool = False) -> Tuple[str, ...]:
+    """Read an optional list of strings from a scoring rule."""
+    values = rule.get(key, [])
+    if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+        raise ValueError(f"Scoring rule '{rule.get('name')}': '{key}' must be a list of strings")
+    if required and not values:
+        raise ValueError(f"Scoring rule '{rule.get('name')}': '{key}' must not be empty")
+    return tuple(values)
+
+
+def _parse_scoring_rule(rule: Dict) -> ScoringRule:
+    """Validate a scoring rule from a pack file."""
+    if not isinstance(rule, dict) or not isinstance(rule.get("name"), str):
+        raise ValueError("Each scoring rule must be an object with a 'name'")
+    score = rule.get("score", 0)
+    if isinstance(score, bool) or not isinstance(score, (int, float)):
+        raise ValueError(f"Scoring rule '{rule['name']}': 'score' must be a number")
+    return ScoringRule(
+        name=rule["name"],
+        when_any=_string_list(rule, "when_any", required=True),
+        requires_any=_string_list(rule, "requires_any"),
+        min_count=int(rule.get("min_count", 1)),
+        per_match=bool(rule.get("per_match", False)),
+        score=score,
+        categories=_string_list(rule, "categories"),
+        indicator=str(rule.get("indicator", "")),
+        recommendations=_string_list(rule, "recommendations")
+    )
+
+
+def _distinct_values(matched) -> Dict:
+    """Distinct matched values of one match key, in order, with their counts."""
+    if isinstance(matched, dict):
+        return matched
+    values: Dict = {}
+    for value in matched:
+        values[value] = values.get(value, 0) + 1
+    return values
+
+
+class RulePack:
+    """
+    A compiled rule pack.
+
+    A pack file is a JSON object with:
+
+    - ``patterns``: rule name -> regular expression, compiled into one
+      ``CompiledScanner``
+    - ``phrases`` (optional): path of a phrase dictionary, relative to the
+      pack, compiled into one ``PhraseMatcher``; each phrase category becomes
+      a match key
+    - ``scoring``: list of scoring rules. A rule fires when any of its
+      ``when_any`` keys matched (at least ``min_count`` distinct values in
+      total) and, if given, any of its ``requires_any`` keys matched. It adds
+      ``score``, its ``categories``, its ``indicator`` and its
+      ``recommendations``. With ``per_match`` it fires once per distinct
+      value. Indicators may use ``{match}``, ``{value}`` and ``{count}``.
+    - ``risk_levels``: level -> minimum risk score
+
+    Match keys that are neither patterns nor phrase categories (such as
+    ``blocklisted_url``) are filled in by the detector.
+
+    Packs are immutable once built, so a request holding one is unaffected
+    by a reload. Hit counters and timings are kept per pack instance.
+    """
+
+    def __init__(self, data: Dict, base_dir: str = ".", version: str = "", profile: bool = False):
+        """
+        Compile a parsed rule pack.
+
+        Args:
+            data: Parsed pack file
+            base_dir: Directory that relative phrase paths are resolved against
+            version: Version identifier of the pack
+            profile: Record the time spent on each pattern rule
+        """
+        if not isinstance(data, dict) or not isinstance(data.get("patterns"), dict):
+            raise ValueError("Rule pack must be a JSON object with a 'patterns' object")
+
+        self.name = str(data.get("name", "rules"))
+        self.version = version
+        self.patterns: Dict[str, str] = dict(data["patterns"])
+        # Reject patterns that could backtrack catastrophically on user text
+        lint_patterns(self.patterns)
+        self.scanner = CompiledScanner(self.patterns, profile=profile)
+
+        self.phrase_matcher: Optional[PhraseMatcher] = None
+        self.phrases_path: Optional[str] = None
+        if data.get("phrases"):
+            self.phrases_path = os.path.join(base_dir, data["phrases"])
+            with open(self.phrases_path, "r", encoding="utf-8") as f:
+                self.phrase_matcher = PhraseMatcher(parse_phrases(json.load(f)))
+
+        self.scoring = [_parse_scoring_rule(rule) for rule in data.get("scoring", [])]
+        levels = data.get("risk_levels", {"high": 4, "medium": 2, "low": 1})
+        self.risk_levels = sorted(((float(score), level) for level, score in levels.items()), reverse=True)
+
+        self.profile = profile
+        self.loaded_at = time.time()
+        self.messages = 0
+        self.phrase_seconds = 0.0
+        self._match_hits: Dict[str, int] = {}
+        self._scoring_hits = [0] * len(self.scoring)
+        # Scanners with caller-provided rules added, built on first use
+        self._stream_scanners: Dict[Tuple[Tuple[str, str], ...], CompiledScanner] = {}
+
+    @classmethod
+    def load(cls, path: str, profile: bool = False) -> "RulePack":
+        """
+        Load and compile a rule pack file.
+
+        The version is derived from the contents of the pack and its phrase
+        dictionary, so it changes whenever either file does.
+
+        Args:
+            path: Path of the pack file
+            profile: Record the time spent on each pattern rule
+
+        Returns:
+            The compiled rule pack
+        """
+        with open(path, "rb") as f:
+            raw = f.read()
+        data = json.loads(raw)
+
+        digest = hashlib.sha256(raw)
+        if isinstance(data, dict) and data.get("phrases"):
+            with open(os.path.join(os.path.dirname(path), data["phrases"]), "rb") as f:
+                digest.update(f.read())
+
+        return cls(data, os.path.dirname(path), digest.hexdigest()[:16], profile)
+
+    def source_files(self, path: str) -> List[str]:
+        """List the files this pack was built from, for change detection."""
+        return [path] + ([self.phrases_path] if self.phrases_path else [])
+
+    def _count_matches(self, matches: Dict) -> None:
+        """Update the per-key hit counters."""
+        self.messages += 1
+        hits = self._match_hits
+        for key, values in matches.items():
+            if values:
+                hits[key] = hits.get(key, 0) + 1
+
+    def match(self, text: str) -> Dict:
+        """
+        Run the pattern and phrase matchers over a text.
+
+        Args:
+            text: Text to scan
+
+        Returns:
+            Dictionary mapping pattern names to their matched values and
+            phrase categories to phrase -> occurrence counts
+        """
+        matches = self.scanner.scan(text)
+        if self.phrase_matcher:
+            began = time.perf_counter() if self.profile else 0.0
+            matches.update(self.phrase_matcher.match(text))
+            if self.profile:
+                self.phrase_seconds += time.perf_counter() - began
+        self._count_matches(matches)
+        return matches
+
+    def match_within(self, text: str, deadline: float, window: int, overlap: int) -> Tuple[Dict, int]:
+        """
+        Run the matchers over a text, stopping once a deadline has passed.
+
+        Texts longer than ``window`` are matched one window at a time and
+        the deadline is checked between windows, so a long text cannot hold
+        a worker much past it. Matches spanning window boundaries are found
+        as in ``match``.
+
+        Args:
+            text: Text to scan
+            deadline: ``time.monotonic()`` value after which no new window is started
+            window: Characters matched per window
+            overlap: Characters rescanned across each window boundary
+
+        Returns:
+            Tuple of (matches as returned by ``match``, number of leading
+            characters matched; less than ``len(text)`` if the deadline passed)
+        """
+        if len(text) <= window:
+            return self.match(text), len(text)
+
+        scanned = 0
+
+        def chunks():
+            nonlocal scanned
+            while scanned < len(text):
+                if scanned and time.monotonic() > deadline:
+                    return
+                yield text[scanned:scanned + window]
+                scanned += window
+
+        matches = self.match_stream(chunks(), overlap=overlap, max_samples=None)
+        return matches, min(scanned, len(text))
+
+    def match_stream(
+        self,
+        chunks: Iterable[str],
+        overlap: int,
+        max_samples: Optional[int],
+        extra_patterns: Optional[Dict[str, str]] = None
+    ) -> Dict:
+        """
+        Run the pattern and phrase matchers over text arriving in chunks.
+
+        Args:
+            chunks: Iterable of text chunks, in order
+            overlap: Characters rescanned across each window boundary
+            max_samples: Maximum matched values kept per pattern
+            extra_patterns: Rules matched along with the pack's, for values
+                the caller needs from the text (not counted as hits)
+
+        Returns:
+            Dictionary of matches, as returned by ``match``, plus the matches
+            of the extra rules
+        """
+        scanner = self.scanner
+        if extra_patterns:
+            key = tuple(sorted(extra_patterns.items()))
+            scanner = self._stream_scanners.get(key)
+            if scanner is None:
+                lint_patterns(extra_patterns)
+                scanner = CompiledScanner({**self.patterns, **extra_patterns}, profile=self.profile)
+                self._stream_scanners[key] = scanner
+
+        phrases = self.phrase_matcher.stream() if self.phrase_matcher else None
+
+        def feed():
+            for chunk in chunks:
+                if phrases:
+                    phrases.feed(chunk)
+                yield chunk
+
+        matches = scanner.scan_stream(feed(), overlap=overlap, max_samples=max_samples)
+        if phrases:
+            matches.update(phrases.finish())
+        extra = {name: matches.pop(name) for name in extra_patterns or () if name in matches}
+        self._count_matches(matches)
+        matches.update(extra)
+        return matches
+
+    def score(self, matches: Dict) -> Tuple[List[str], List[str], List[str], float]:
+        """
+        Apply the scoring table to a set of matches.
+
+        Args:
+            matches: Dictionary of matches, including detector-provided keys
+
+        Returns:
+            Tuple of (indicators, recommendations, threat categories, risk score)
+        """
+        indicators: List[str] = []
+        recommendations: List[str] = []
+        categories: List[str] = []
+        risk_score = 0
+
+        for index, rule in enumerate(self.scoring):
+            values: Dict = {}
+            for key in rule.when_any:
+                if matches.get(key):
+                    values.update(_distinct_values(matches[key]))
+            if not values or len(values) < rule.min_count:
+                continue
+            if rule.requires_any and not any(matches.get(key) for key in rule.requires_any):
+                continue
+
+            self._scoring_hits[index] += 1
+            fired = values.items() if rule.per_match else [(None, None)]
+            for value, count in fired:
+                risk_score += rule.score
+                if rule.indicator:
+                    indicators.append(rule.indicator.format(match=value, value=count, count=len(values)))
+            for category in rule.categories:
+                if category not in categories:
+                    categories.append(category)
+            for recommendation in rule.recommendations:
+                if recommendation not in recommendations:
+                    recommendations.append(recommendation)
+
+        return indicators, recommendations, categories, risk_score
+
+    def risk_level(self, risk_score: float) -> str:
+        """
+        Map a risk score to a risk level.
+
+        Args:
+            risk_score: Total risk score
+
+        Returns:
+            Risk level name, or "none" below every threshold
+        """
+        for threshold, level in self.risk_levels:
+            if risk_score >= threshold:
+                return level
+        return "none"
+
+    def set_profiling(self, enabled: bool) -> None:
+        """
+        Start or stop recording the time spent on each pattern and on phrases.
+
+        Args:
+            enabled: Whether to record timings
+        """
+        self.profile = enabled
+        self.scanner.set_profiling(enabled)
+
+    def counters(self) -> List[Tuple[str, Dict[str, str], float]]:
+        """
+        Get the hit counters and timings as metric series.
+
+        Returns:
+            List of (metric name, labels, value)
+        """
+        stats = self.stats()
+        series: List[Tuple[str, Dict[str, str], float]] = [("rule_messages_total", {}, stats["messages"])]
+        for name, rule in stats["patterns"].items():
+            series.append(("rule_matches_total", {"rule": name}, rule["hits"]))
+            series.append(("rule_seconds_total", {"rule": name}, rule["seconds"]))
+        for category, phrase in stats["phrases"].items():
+            series.append(("rule_matches_total", {"rule": category}, phrase["hits"]))
+        series.append(("rule_seconds_total", {"rule": "phrases"}, stats["phrase_seconds"]))
+        for name, hits in stats["scoring"].items():
+            series.append(("scoring_rule_fired_total", {"rule": name}, hits))
+        return series
+
+    def stats(self) -> Dict:
+        """
+        Get per-rule hit counters and timings.
+
+        Returns:
+            Dictionary with the pack version, the number of messages matched,
+            and per pattern, phrase category and scoring rule hit counts
+            (and seconds spent per pattern when profiling)
+        """
+        timings = self.scanner.timings()
+        patterns = {
+            name: {"hits": self._match_hits.get(name, 0), "seconds": timings[name]}
+            for name in self.scanner.names
+        }
+        phrases = {
+            category: {"hits": self._match_hits.get(category, 0)}
+            for category in (self.phrase_matcher.categories if self.phrase_matcher else [])
+        }
+        return {
+            "name": self.name,
+            "version": self.version,
+            "loaded_at": self.loaded_at,
+            "profiling": self.profile,
+            "messages": self.messages,
+            "patterns": patterns,
+            "phrases": phrases,
+            "phrase_seconds": self.phrase_seconds,
+            "scoring": {rule.name: self._scoring_hits[index] for index, rule in enumerate(self.scoring)}
+        }
+
+
+class RuleSet:
+    """
+    The active rule pack, reloaded when its files change.
+
+    ``current()`` is called at the start of every analysis. At most once per
+    reload interval it compares the modification times of the pack files
+    and, if they changed, compiles the new pack and swaps it in with a single
+    reference assignment. Requests already holding the old pack finish with
+    it. If the new files fail to load, the old pack stays active.
+    """
+
+    def __init__(self, path: str, reload_interval: float = 2.0, profile: bool = False):
+        """
+        Load the initial rule pack.
+
+        Args:
+            path: Path of the rule pack file
+            reload_interval: Minimum seconds between change checks (0 checks
+                on every call, a negative value disables reloading)
+            profile: Record the time spent on each pattern rule
+        """
+        self.path = path
+        self.reload_interval = reload_interval
+        self.profile = profile
+        self._reload_lock = threading.Lock()
+        self._pack = RulePack.load(path, profile)
+        self._signature = self._file_signature(self._pack)
+        self._checked_at = time.monotonic()
+
+    def _file_signature(self, pack: RulePack) -> Tuple:
+        """Modification time and size of each file of a pack."""
+        signature = []
+        for path in pack.source_files(self.path):
+            try:
+                stat = os.stat(path)
+                signature.append((path, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append((path, None, None))
+        return tuple(signature)
+
+    def current(self) -> RulePack:
+        """
+        Get the active rule pack, reloading it first if its files changed.
+
+        Returns:
+            The active rule pack
+        """
+        if self.reload_interval >= 0 and time.monotonic() - self._checked_at >= self.reload_interval:
+            # Only one thread checks; the others keep using the current pack
+            if self._reload_lock.acquire(blocking=False):
+                try:
+                    self._checked_at = time.monotonic()
+                    if self._file_signature(self._pack) != self._signature:
+                        self.reload()
+                finally:
+                    self._reload_lock.release()
+        return self._pack
+
+    def set_profiling(self, enabled: bool) -> None:
+        """
+        Start or stop per-rule timing on the active pack and on packs loaded later.
+
+        Args:
+            enabled: Whether to record timings
+        """
+        self.profile = enabled
+        self._pack.set_profiling(enabled)
+
+    def reload(self) -> bool:
+        """
+        Compile the rule pack files and swap them in.
+
+        Returns:
+            True if the new pack is active, False if loading failed
+        """
+        signature = self._file_signature(self._pack)
+        try:
+            pack = RulePack.load(self.path, self.profile)
+        except (OSError, ValueError, TypeError, re.error) as e:
+            # Remember the broken files so they are not retried until they change again
+            self._signature = signature
+            logger.error(f"Error loading rule pack {self.path}, keeping version {self._pack.version}: {e}")
+            return False
+
+        self._signature = self._file_signature(pack)
+        previous, self._pack = self._pack, pack
+        if pack.version != previous.version:
+            logger.info(f"Loaded rule pack '{pack.name}' version {pack.version} (was {previous.version})")
+        return True
+
+
+# Rule set shared by all detectors in this process
+_shared_rules: Optional[RuleSet] = None
+_shared_lock = threading.Lock()
+
+
+def get_rules() -> RuleSet:
+    """
+    Get the process-wide rule set loaded from settings.RULES_PATH.
+
+    Returns:
+        The shared rule set
+    """
+    global _shared_rules
+    with _shared_lock:
+        if _shared_rules is None:
+            rules = RuleSet(
+                settings.RULES_PATH, settings.RULES_RELOAD_INTERVAL, settings.RULE_PROFILING or metrics.enabled
+            )
+            # Per-rule timings follow the metrics switch; hit counters are exported on demand
+            metrics.add_listener(lambda enabled: rules.set_profiling(enabled or settings.RULE_PROFILING))
+            metrics.add_collector(lambda: rules.current().counters())
+            _shared_rules = rules
+            pack = rules.current()
+            logger.info(f"Loaded rule pack '{pack.name}' version {pack.version}")
+        return _shared_rules
@@ -0,0 +1,542 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+CyberGuard AI - Compiled Scanner
+This module compiles a set of named detection patterns once into a small
+number of combined matchers that report per-rule matches in one pass.
+"""
+
+import re
+import time
+import logging
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+try:
+    import re._parser as sre_parse
+    from re._constants import (
+        AT, BRANCH, CATEGORY, IN, LITERAL, MAX_REPEAT, MIN_REPEAT, NEGATE, RANGE, SUBPATTERN
+    )
+except ImportError:  # Python < 3.11
+    import sre_parse
+    from sre_constants import (
+        AT, BRANCH, CATEGORY, IN, LITERAL, MAX_REPEAT, MIN_REPEAT, NEGATE, RANGE, SUBPATTERN
+    )
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Length of the literal prefixes used to locate candidate positions
+PREFIX_LENGTH = 4
+
+# Upper bound on the number of distinct prefixes derived from a single rule
+MAX_PREFIXES = 64
+
+# Characters kept on either side of a window boundary so that assertions
+# such as \b, ^ and $ see the same context as in the whole text
+STREAM_CONTEXT = 64
+
+# Entries kept in a class lane's cache of candidate rules per character pair
+# before it is cleared (the pairs seen depend on the input)
+CLASS_CACHE_SIZE = 4096
+
+# "İ" is the only character whose lowercase form is longer; the regex engine
+# matches it as "i", so it is lowercased to that to keep offsets unchanged
+_LOWER_KEEPING_OFFSETS = str.maketrans({"\u0130": "i"})
+
+# Placed after a single character, holds where \b held before it
+_WORD_START_BEHIND = r"(?<!\w\w)(?<!\W\W)(?<!^\W)"
+
+# Matches a single word character, as \b sees it
+_WORD_CHAR = re.compile(r"\w")
+
+# Regex source for the character categories that can appear in a class
+_CATEGORY_SOURCE = {
+    "CATEGORY_DIGIT": r"\d",
+    "CATEGORY_NOT_DIGIT": r"\D",
+    "CATEGORY_SPACE": r"\s",
+    "CATEGORY_NOT_SPACE": r"\S",
+    "CATEGORY_WORD": r"\w",
+    "CATEGORY_NOT_WORD": r"\W",
+}
+
+
+def _literal_prefixes(items, limit: int = PREFIX_LENGTH) -> Tuple[Set[str], bool]:
+    """
+    Derive the literal strings every match of a parsed pattern starts with.
+
+    Literals are lowercased so that the prefixes can be searched for in a
+    lowercased copy of the text regardless of the rule's case sensitivity.
+
+    Args:
+        items: Parsed pattern items (an sre_parse.SubPattern or list of ops)
+        limit: Maximum prefix length to derive
+
+    Returns:
+        Tuple of (prefixes, complete) where complete tells whether all items
+        were consumed. A prefix set containing "" means no literal prefix.
+    """
+    prefixes = {""}
+    for op, av in items:
+        if min(len(prefix) for prefix in prefixes) >= limit:
+            return prefixes, False
+
+        if op is AT:
+            # Zero-width assertions (\b, ^, $) do not consume characters
+            continue
+        elif op is LITERAL:
+            alternatives, complete = {chr(av).lower()}, True
+        elif op is IN:
+            if not all(kind is LITERAL for kind, _ in av) or len(av) > 8:
+                return prefixes, False
+            alternatives, complete = {chr(code).lower() for _, code in av}, True
+        elif op is BRANCH:
+            alternatives, complete = set(), True
+            for branch in av[1]:
+                branch_prefixes, branch_complete = _literal_prefixes(branch, limit)
+                alternatives |= branch_prefixes
+                complete = complete and branch_complete
+        elif op is SUBPATTERN:
+            alternatives, complete = _literal_prefixes(av[-1], limit)
+        elif op in (MAX_REPEAT, MIN_REPEAT) and av[0] >= 1:
+            alternatives, _ = _literal_prefixes(av[2], limit)
+            complete = False
+        else:
+            return prefixes, False
+
+        if "" in alternatives:
+            return prefixes, False
+        combined = {(prefix + alternative)[:limit] for prefix in prefixes for alternative in alternatives}
+        if len(combined) > MAX_PREFIXES:
+            return prefixes, False
+        prefixes = combined
+        if not complete:
+            return prefixes, False
+
+    return prefixes, True
+
+
+def _first_class(items) -> Optional[str]:
+    """
+    Derive a character class source matching the first character of a match.
+
+    Args:
+        items: Parsed pattern items
+
+    Returns:
+        Regex source of a character class, or None if it cannot be derived
+    """
+    for op, av in items:
+        if op is AT:
+            continue
+        if op is LITERAL:
+            return f"[{re.escape(chr(av))}]"
+        if op is SUBPATTERN:
+            return _first_class(av[-1])
+        if op in (MAX_REPEAT, MIN_REPEAT) and av[0] >= 1:
+            return _first_class(av[2])
+        if op is IN:
+            parts = []
+            for kind, value in av:
+                if kind is NEGATE:
+                    parts.insert(0, "^")
+                elif kind is LITERAL:
+                    parts.append(re.escape(chr(value)))
+                elif kind is RANGE:
+                    parts.append(f"{re.escape(chr(value[0]))}-{re.escape(chr(value[1]))}")
+                elif kind is CATEGORY and str(value) in _CATEGORY_SOURCE:
+                    parts.append(_CATEGORY_SOURCE[str(value)])
+                else:
+                    return None
+            return f"[{''.join(parts)}]"
+        return None
+    return None
+
+
+def _starts_at_word_boundary(items) -> bool:
+    """Tell whether a parsed pattern begins with a \\b assertion."""
+    for op, av in items:
+        if op is SUBPATTERN:
+            return _starts_at_word_boundary(av[-1])
+        return op is AT and str(av) == "AT_BOUNDARY"
+    return False
+
+
+def _findall_value(match: re.Match) -> object:
+    """Return the value ``re.findall`` would produce for a match."""
+    groups = match.re.groups
+    if groups == 0:
+        return match.group(0)
+    if groups == 1:
+        return match.group(1) or ""
+    return tuple(value or "" for value in match.groups())
+
+
+class CompiledScanner:
+    """
+    Scans text for a set of named patterns.
+
+    Rules are compiled once and partitioned into lanes:
+
+    - Rules that always start with a literal are located with a single
+      alternation of their lowercased prefixes, searched over a lowercased
+      copy of the text. The regex engine can skip through the text on the
+      first character of those prefixes, so this lane is one fast pass no
+      matter how many literal-led rules there are.
+    - Rules that start with a character class (digits, for example) share a
+      second pass over the union of their leading classes.
+    - Anything else is scanned on its own.
+
+    At each candidate position only the rules that can start there and are
+    not still inside one of their own previous matches are verified with an
+    anchored match. This reproduces the non-overlapping, leftmost semantics
+    of calling ``re.findall`` once per rule.
+    """
+
+    def __init__(self, patterns: Dict[str, str], flags: int = re.MULTILINE, profile: bool = False):
+        """
+        Compile the rule set.
+
+        Args:
+            patterns: Mapping of rule name to regular expression source
+            flags: Regex flags applied to every rule
+            profile: Record the time spent matching each rule (see ``timings``)
+        """
+        self.names = list(patterns)
+        self.flags = flags
+        self._rules = [re.compile(patterns[name], flags) for name in self.names]
+
+        # Seconds spent in each rule's own matching, when profiling
+        self._seconds = [0.0] * len(self._rules)
+        self.set_profiling(profile)
+
+        prefix_owners: Dict[str, List[int]] = {}
+        class_rules: List[Tuple[int, str, bool]] = []
+        self._standalone: List[int] = []
+
+        for index, rule in enumerate(self._rules):
+            parsed = sre_parse.parse(rule.pattern, rule.flags)
+            prefixes, _ = _literal_prefixes(parsed)
+            if "" not in prefixes:
+                for prefix in prefixes:
+                    prefix_owners.setdefault(prefix, []).append(index)
+                continue
+
+            first = _first_class(parsed)
+            if first is not None:
+                class_rules.append((index, first, _starts_at_word_boundary(parsed)))
+            else:
+                self._standalone.append(index)
+
+        # Literal lane: prefixes are searched for in the lowercased text
+        self._prefix_lane = None
+        if prefix_owners:
+            # Longest first so that shared prefixes do not shadow each other
+            ordered = sorted(prefix_owners, key=len, reverse=True)
+            source = "|".join(re.escape(prefix) for prefix in ordered)
+            # A located prefix also implies every shorter prefix it starts with
+            owners = {
+                prefix: tuple(sorted({
+                    index
+                    for other, indexes in prefix_owners.items() if prefix.startswith(other)
+                    for index in indexes
+                }))
+                for prefix in prefix_owners
+            }
+            # The case-insensitive locator runs on the original text, where a hit need not
+            # lowercase back to its prefix ("İ"), so its hits are mapped by group number
+            source_ci = "|".join(f"({re.escape(prefix)})" for prefix in ordered)
+            group_owners = tuple(owners[prefix] for prefix in ordered)
+            self._prefix_lane = (re.compile(source), re.compile(source_ci, re.IGNORECASE), owners, group_owners)
+
+        # Class lane: one pass over the union of leading character classes
+        self._class_lane = None
+        if class_rules:
+            flags_union = 0
+            for index, _, _ in class_rules:
+                flags_union |= self._rules[index].flags & re.IGNORECASE
+            classes = []
+            # Leading class -> whether every rule opening with it also opens with \b
+            sources: Dict[str, bool] = {}
+            for index, source, word_start in class_rules:
+                # The \b shortcut assumes Unicode word characters
+                word_start = word_start and not self._rules[index].flags & (re.ASCII | re.LOCALE)
+                classes.append((index, re.compile(source, flags_union), word_start))
+                sources[source] = sources.get(source, True) and word_start
+            # Locating only word starts skips the inside of numbers and words. \b is checked
+            # with lookbehinds after the class, so the engine still skips ahead on the class.
+            locator = re.compile(
+                "|".join(
+                    source + _WORD_START_BEHIND if word_start else source
+                    for source, word_start in sources.items()
+                ),
+                flags_union
+            )
+            # Candidate rules per (leading character, preceding character), filled in lazily
+            self._class_lane = (locator, classes, {})
+
+        literal_led = len(self.names) - len(class_rules) - len(self._standalone)
+        logger.debug(
+            f"Compiled {len(self.names)} rules: {literal_led} literal-led, "
+            f"{len(class_rules)} class-led, {len(self._standalone)} standalone"
+        )
+
+    def _verify(self, text: str, start: int, candidates, next_allowed: List[int], found: List) -> None:
+        """Run anchored matches for the candidate rules at a position."""
+        rules = self._rules
+        for index in candidates:
+            if next_allowed[index] > start:
+                continue
+            match = rules[index].match(text, start)
+            if match is None:
+                continue
+            end = match.end()
+            next_allowed[index] = end if end > start else end + 1
+            found.append((start, index, end, match))
+
+    def _verify_timed(self, text: str, start: int, candidates, next_allowed: List[int], found: List) -> None:
+        """Run anchored matches like ``_verify``, timing each rule."""
+        rules = self._rules
+        seconds = self._seconds
+        clock = time.perf_counter
+        for index in candidates:
+            if next_allowed[index] > start:
+                continue
+            began = clock()
+            match = rules[index].match(text, start)
+            seconds[index] += clock() - began
+            if match is None:
+                continue
+            end = match.end()
+            next_allowed[index] = end if end > start else end + 1
+            found.append((start, index, end, match))
+
+    def _scan_prefix_lane(self, text: str, pos: int, next_allowed: List[int], found: List) -> None:
+        """Locate literal-led rule matches with one pass over lowercased text."""
+        locator, locator_ci, owners, group_owners = self._prefix_lane
+        verify = self._verify
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            lowered = text.translate(_LOWER_KEEPING_OFFSETS).lower()
+        if len(lowered) == len(text):
+            search = locator.search
+            while True:
+                hit = search(lowered, pos)
+                if hit is None:
+                    return
+                start = hit.start()
+                verify(text, start, owners[hit.group()], next_allowed, found)
+                pos = start + 1
+
+        # Lowercasing still changed offsets (characters unknown to this module)
+        search = locator_ci.search
+        while True:
+            hit = search(text, pos)
+            if hit is None:
+                return
+            start = hit.start()
+            verify(text, start, group_owners[hit.lastindex - 1], next_allowed, found)
+            pos = start + 1
+
+    def _scan_class_lane(self, text: str, pos: int, next_allowed: List[int], found: List) -> None:
+        """Locate class-led rule matches with one pass over the text."""
+        locator, classes, owners = self._class_lane
+        search = locator.search
+
+        verify = self._verify
+        while True:
+            hit = search(text, pos)
+            if hit is None:
+                return
+            start = hit.start()
+            key = text[start - 1:start + 1] if start else text[0]
+            candidates = owners.get(key)
+            if candidates is None:
+                # Rules opening with \b are only tried where \b can hold
+                before = len(key) == 2 and _WORD_CHAR.match(key[0]) is not None
+                boundary = before != (_WORD_CHAR.match(key[-1]) is not None)
+                candidates = tuple(
+                    index for index, first, word_start in classes
+                    if first.match(key[-1]) and (boundary or not word_start)
+                )
+                if len(owners) >= CLASS_CACHE_SIZE:
+                    owners.clear()
+                owners[key] = candidates
+            if candidates:
+                verify(text, start, candidates, next_allowed, found)
+            pos = start + 1
+
+    def _scan_standalone(self, text: str, index: int, next_allowed: List[int], found: List) -> None:
+        """Scan a rule that has no usable prefix on its own."""
+        began = time.perf_counter() if self.profile else 0.0
+        for match in self._rules[index].finditer(text, next_allowed[index]):
+            found.append((match.start(), index, match.end(), match))
+        if self.profile:
+            self._seconds[index] += time.perf_counter() - began
+
+    def set_profiling(self, enabled: bool) -> None:
+        """
+        Start or stop recording the time spent matching each rule.
+
+        Args:
+            enabled: Whether to record timings
+        """
+        self.profile = enabled
+        if enabled:
+            self._verify = self._verify_timed
+        else:
+            # Fall back to the untimed class method
+            self.__dict__.pop("_verify", None)
+
+    def timings(self) -> Dict[str, float]:
+        """
+        Get the time spent matching each rule since the scanner was built.
+
+        Only the rule's own matching is attributed to it; the shared locator
+        passes are not. All values are zero unless profiling is enabled.
+
+        Returns:
+            Dictionary mapping rule names to seconds
+        """
+        return dict(zip(self.names, self._seconds))
+
+    def _collect(self, text: str, pos: int, resume: Optional[Dict[str, int]]) -> List:
+        """Run every lane and collect (start, rule index, end, match) tuples."""
+        next_allowed = [pos] * len(self._rules)
+        if resume:
+            for index, name in enumerate(self.names):
+                next_allowed[index] = max(pos, resume.get(name, pos))
+
+        found: List = []
+        if self._prefix_lane:
+            self._scan_prefix_lane(text, pos, next_allowed, found)
+        if self._class_lane:
+            self._scan_class_lane(text, pos, next_allowed, found)
+        for index in self._standalone:
+            self._scan_standalone(text, index, next_allowed, found)
+        return found
+
+    def iter_matches(
+        self,
+        text: str,
+        pos: int = 0,
+        resume: Optional[Dict[str, int]] = None
+    ) -> Iterator[Tuple[str, int, int, object]]:
+        """
+        Iterate over rule matches in order of their start position.
+
+        Args:
+            text: Text to scan
+            pos: Position to start scanning from (earlier text is still
+                visible to lookbehind and word-boundary assertions)
+            resume: Optional mapping of rule name to the earliest position a
+                new match of that rule may start at
+
+        Yields:
+            Tuples of (rule name, start, end, value), where value is what
+            ``re.findall`` would have returned for the match
+        """
+        found = self._collect(text, pos, resume)
+        found.sort(key=lambda item: (item[0], item[1]))
+        names = self.names
+        for start, index, end, match in found:
+            yield names[index], start, end, _findall_value(match)
+
+    def scan(self, text: str) -> Dict[str, List]:
+        """
+        Find all matches for every rule.
+
+        Args:
+            text: Text to scan
+
+        Returns:
+            Dictionary mapping rule names to their matches, containing only
+            rules that matched (the same shape as running ``re.findall``
+            per rule)
+        """
+        by_rule: List[List] = [[] for _ in self._rules]
+        # Lanes emit matches in order, and each rule belongs to exactly one lane
+        for _, index, _, match in self._collect(text, 0, None):
+            by_rule[index].append(_findall_value(match))
+        return {name: values for name, values in zip(self.names, by_rule) if values}
+
+    def scan_stream(
+        self,
+        chunks: Iterable[str],
+        overlap: int = 4096,
+        max_samples: Optional[int] = None
+    ) -> Dict[str, List]:
+        """
+        Find all matches for every rule in text that arrives in chunks.
+
+        The text is scanned in windows. Matches that start in the last
+        ``overlap`` characters of a window, or that run into its end (and so
+        may continue in the next chunk), are left for the next window, which
+        starts where the committed region ends. Per-rule resume positions
+        carry over between windows, so matches spanning a chunk boundary are
+        found exactly once and the result equals ``scan`` on the joined text,
+        provided no match needs more than ``overlap`` characters of text to
+        be recognised. Memory stays bounded by the window size plus the
+        overlap, except while a single match keeps growing past the window.
+
+        Args:
+            chunks: Iterable of text chunks, in order
+            overlap: Characters at the end of a window to rescan with the next one
+            max_samples: Maximum number of values to keep per rule (default: all)
+
+        Returns:
+            Dictionary mapping rule names to their matches, like ``scan``
+        """
+        overlap = max(overlap, STREAM_CONTEXT)
+        found: Dict[str, List] = {}
+        resume: Dict[str, int] = {}
+
+        buffer = ""
+        offset = 0      # Absolute position of buffer[0]
+        scan_from = 0   # Text before this index is context already scanned
+
+        def commit(name, start, end, value):
+            values = found.setdefault(name, [])
+            if max_samples is None or len(values) < max_samples:
+                values.append(value)
+            resume[name] = offset + end
+
+        iterator = iter(chunks)
+        final = False
+        while not final:
+            chunk = next(iterator, None)
+            if chunk is None:
+                final = True
+            else:
+                buffer += chunk
+                if len(buffer) - scan_from < 2 * overlap:
+                    continue
+
+            relative = {name: position - offset for name, position in resume.items()}
+            window = self.iter_matches(buffer, scan_from, relative)
+            if final:
+                for name, start, end, value in window:
+                    commit(name, start, end, value)
+                break
+
+            # Hold back matches that start in the overlap or touch the end
+            window = list(window)
+            cut = len(buffer) - overlap
+            for _, start, end, _ in window:
+                if end > len(buffer) - STREAM_CONTEXT:
+                    cut = min(cut, start)
+            if cut <= scan_from:
+                # A single match spans the whole window; read more text
+                continue
+
+            for name, start, end, value in window:
+                if start >= cut:
+                    break
+                commit(name, start, end, value)
+
+            keep_from = max(cut - STREAM_CONTEXT, 0)
+            buffer = buffer[keep_from:]
+            offset += keep_from
+            scan_from = cut - keep_from
+
+        return {name: found[name] for name in self.names if name in found}
@@ -7,21 +7,124 @@ This module handles detection of cybersecurity threats in user inputs.
 """
 
 import re
+import codecs
+import hashlib
+import time
 import logging
-from typing import Dict, List, Optional, Union
-import requests
-from urllib.parse import urlparse
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from functools import partial
+from itertools import islice
+from typing import IO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 import os
 import sys
 import json
+import numpy as np
 
 # Add parent directory to path to allow imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import settings
+from core.rules import RulePack, get_rules
+from core.features import RiskFeatures
+from core.classifier import HashedNGramClassifier, get_classifier
+from core.blocklist import get_blocklist
+from utils.virustotal import get_client
+from utils.cache import LRUCache, MISSING
+from utils.enrichment import PRIORITY_BATCH, PRIORITY_INTERACTIVE, get_enrichment_queue
+from utils.metrics import metrics
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Full URLs including the path, for URL-prefix blocklist entries
+FULL_URL_PATTERN = re.compile(r'https?://[^\s<>"\']+')
+
+# Name of the stream rule collecting full URLs (not a rule pack key)
+FULL_URL_RULE = "_full_url"
+
+# Analysis results shared by all detectors in this process, keyed by message hash
+_analysis_cache = (
+    LRUCache(settings.ANALYSIS_CACHE_SIZE, default_ttl=settings.ANALYSIS_CACHE_TTL)
+    if settings.ANALYSIS_CACHE_SIZE > 0 else None
+)
+
+def _reset_analysis_cache_after_fork() -> None:
+    """Give a forked child its own cache, as the parent's lock may be held."""
+    global _analysis_cache
+    if _analysis_cache is not None:
+        _analysis_cache = LRUCache(_analysis_cache.max_size, default_ttl=_analysis_cache.default_ttl)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_analysis_cache_after_fork)
+
+def _copy_result(result: Dict) -> Dict:
+    """Copy an analysis result so callers cannot modify a cached one."""
+    return {key: list(value) if isinstance(value, list) else value for key, value in result.items()}
+
+# Detector instance owned by each batch worker process
+_batch_detector = None
+_batch_scan_urls = False
+
+def _init_batch_worker(virustotal_api_key: Optional[str], scan_urls: bool) -> None:
+    """
+    Create the detector used by a batch worker process.
+    
+    Args:
+        virustotal_api_key: API key for VirusTotal
+        scan_urls: Whether workers should look up URLs on VirusTotal
+    """
+    global _batch_detector, _batch_scan_urls
+    _batch_detector = ThreatDetector(virustotal_api_key=virustotal_api_key)
+    _batch_scan_urls = scan_urls
+
+def _analyze_batch(messages: List[str]) -> List[Dict]:
+    """Analyze a chunk of messages inside a batch worker process."""
+    return [
+        _batch_detector.analyze_message(message, priority=PRIORITY_BATCH, scan_urls=_batch_scan_urls)
+        for message in messages
+    ]
+
+def _iter_text_chunks(source, window_size: int, encoding: str) -> Iterator[str]:
+    """
+    Read a text, bytes, memory-mapped or file source in fixed-size windows.
+    
+    Bytes are decoded incrementally, so multi-byte characters split across
+    windows are decoded the same way as in the whole buffer.
+    
+    Args:
+        source: str, bytes-like object, mmap, or file object opened in text
+            or binary mode
+        window_size: Number of characters or bytes to read at a time
+        encoding: Encoding used to decode bytes
+        
+    Yields:
+        Decoded text chunks
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    
+    if isinstance(source, str):
+        for start in range(0, len(source), window_size):
+            yield source[start:start + window_size]
+        return
+    
+    if hasattr(source, "read") and not hasattr(source, "madvise"):
+        read = source.read
+        while True:
+            data = read(window_size)
+            if not data:
+                break
+            yield data if isinstance(data, str) else decoder.decode(data)
+    else:
+        # bytes, bytearray, memoryview and mmap are sliced without copying
+        # the whole buffer or moving an mmap's file position
+        view = memoryview(source)
+        for start in range(0, len(view), window_size):
+            yield decoder.decode(view[start:start + window_size])
+    
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
 class ThreatDetector:
     """
     Detects potential cybersecurity threats in user inputs.
@@ -38,35 +141,167 @@ class ThreatDetector:
         """
         self.virustotal_api_key = virustotal_api_key or settings.VIRUSTOTAL_API_KEY
         
-        # Define patterns for threat detection
-        self.patterns = {
-            # URLs and domains
-            'url': r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+',
-            'ip_address': r'\b(?:\d{1,3}\.){3}\d{1,3}\b',
-            'suspicious_domain': r'(?:verify|secure|account|login|banking|update)[-.](?:com|net|org|online)',
-            
-            # Credential and sensitive information patterns
-            'password': r'(?i)password\s*[=:]\s*\S+',
-            'credit_card': r'\b(?:\d{4}[- ]?){3}\d{4}\b',
-            'ssn': r'\b\d{3}-\d{2}-\d{4}\b',
-            
-            # Malware and phishing indicators
-            'executable': r'(?:\.exe|\.bat|\.cmd|\.ps1|\.sh|\.dll|\.scr)$',
-            'double_extension': r'\.(?:doc|pdf|txt|jpg|png)\.(?:exe|bat|cmd|ps1|sh|dll|scr)$',
-            'suspicious_command': r'(?:powershell|cmd)(?:.exe)?\s+(?:-w|/c|/e|/encoded)',
-            
-            # Common phishing phrases
-            'urgency': r'(?i)(?:urgent|immediate|alert|attention required|important update|verify now)',
-            'threat': r'(?i)(?:account (?:suspended|blocked|locked)|unauthorized access|unusual activity)',
-        }
+        # Detection patterns, phrases and scores come from the shared rule
+        # pack, which is reloaded when its files change
+        self.rules = get_rules()
+        
+        # Local blocklist, consulted before any network lookup
+        self.blocklist = get_blocklist()
         
         # Initialize VirusTotal integration if API key is provided
         self.virustotal_enabled = bool(self.virustotal_api_key)
+        self.virustotal_deadline = settings.VIRUSTOTAL_DEADLINE
+        self.virustotal = get_client(self.virustotal_api_key) if self.virustotal_enabled else None
+        
+        # Lookups go through a shared rate-limited queue; by default the local
+        # verdict is returned at once and the URL verdicts are added later
+        self.enrichment = get_enrichment_queue() if self.virustotal_enabled else None
+        self.background_enrichment = settings.VIRUSTOTAL_BACKGROUND
+        
+        # Optional second stage after the rules, loaded once per process
+        self.classifier: Optional[HashedNGramClassifier] = get_classifier()
+        self.classifier_threshold = settings.CLASSIFIER_THRESHOLD
+        self.classifier_weight = settings.CLASSIFIER_WEIGHT
+        
+        # Input budgets: longer messages get a partial verdict rather than stalling a worker
+        self.max_message_length = settings.MAX_MESSAGE_LENGTH
+        self.time_budget = settings.ANALYSIS_TIME_BUDGET
+        self.scan_window = settings.SCAN_WINDOW
+        
+        # Feature layout of the active rule pack, rebuilt when the pack changes
+        self._features: Optional[RiskFeatures] = None
         if self.virustotal_enabled:
             logger.info("Threat detector initialized successfully")
         else:
             logger.warning("VirusTotal API key not provided, URL scanning disabled")
     
+    @property
+    def patterns(self) -> Dict[str, str]:
+        """Detection patterns of the active rule pack."""
+        return self.rules.current().patterns
+    
+    @property
+    def scanner(self):
+        """Compiled pattern scanner of the active rule pack."""
+        return self.rules.current().scanner
+    
+    def rule_stats(self) -> Dict:
+        """
+        Get per-rule hit counters and timings of the active rule pack.
+        
+        Returns:
+            Dictionary of rule pack statistics
+        """
+        return self.rules.current().stats()
+    
+    def _feature_space(self, rules: RulePack) -> RiskFeatures:
+        """Get the feature layout of a rule pack."""
+        features = self._features
+        if features is None or features.version != rules.version:
+            features = self._features = RiskFeatures(rules)
+        return features
+    
+    @property
+    def feature_names(self) -> List[str]:
+        """Names of the feature vector columns under the active rule pack."""
+        return self._feature_space(self.rules.current()).names
+    
+    def extract_features(self, message: str) -> np.ndarray:
+        """
+        Build the numeric feature vector of a message.
+        
+        The vector holds the message length, the URL count and the number of
+        distinct values matched per rule (see ``feature_names``). URL
+        reputation comes from cached VirusTotal verdicts only; nothing is
+        looked up.
+        
+        Args:
+            message: Message to describe
+            
+        Returns:
+            Float vector with one entry per feature
+        """
+        return self.feature_matrix([message])[0]
+    
+    def feature_matrix(self, messages: Iterable[str]) -> np.ndarray:
+        """
+        Build the feature matrix of many messages.
+        
+        Args:
+            messages: Messages to describe
+            
+        Returns:
+            Float matrix with one row per message and one column per feature
+        """
+        rules = self.rules.current()
+        features = self._feature_space(rules)
+        rows = []
+        for message in messages:
+            message = message.strip()[:self.max_message_length]
+            matches = rules.match(message)
+            self._check_blocklist(matches, message)
+            urls = self._urls_to_scan(matches)
+            if urls:
+                cached = [result for result in self.virustotal.cached_results(urls) if result is not None]
+                malicious = self._malicious_urls(self._usable_scan_results(cached)[0])
+                if malicious:
+                    matches['malicious_url_report'] = malicious
+            rows.append(features.vector(message, matches))
+        if not rows:
+            return np.zeros((0, features.width), dtype=np.float64)
+        return np.vstack(rows)
+    
+    def classify_messages(self, messages: Iterable[str]) -> Optional[np.ndarray]:
+        """
+        Run the classifier stage over many messages in one batch.
+        
+        Args:
+            messages: Messages to classify
+            
+        Returns:
+            Vector of probabilities that each message is malicious, or None
+            without a classifier model
+        """
+        if self.classifier is None:
+            return None
+        return self.classifier.predict_proba(message.strip() for message in messages)
+    
+    def score_features(
+        self,
+        features: np.ndarray,
+        weights: Optional[Dict[str, float]] = None,
+        thresholds: Optional[Dict[str, float]] = None,
+        probabilities: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score a feature matrix with the active rule pack's scoring table.
+        
+        This re-scores stored traffic without scanning it again, e.g. to try
+        new rule weights. The matrix must come from the same rule pack version.
+        
+        Args:
+            features: Feature matrix from ``feature_matrix``
+            weights: Scoring rule name -> score overrides (optional)
+            thresholds: Risk level -> minimum score overrides (optional)
+            probabilities: Classifier probabilities from ``classify_messages``,
+                added to the risk scores as in ``analyze_message`` (optional)
+            
+        Returns:
+            Tuple of (risk scores, risk levels), one entry per row
+        """
+        space = self._feature_space(self.rules.current())
+        features = np.atleast_2d(features)
+        if features.shape[1] != space.width:
+            raise ValueError(
+                f"Feature matrix has {features.shape[1]} columns, rule pack expects {space.width}"
+            )
+        risk_scores = space.score(features, weights)
+        if probabilities is not None:
+            probabilities = np.asarray(probabilities, dtype=np.float64)
+            bonus = np.where(probabilities >= self.classifier_threshold, self.classifier_weight * probabilities, 0.0)
+            risk_scores = np.round(risk_scores + bonus, 2)
+        return risk_scores, space.levels(risk_scores, thresholds)
+    
     def scan_url(self, url: str) -> Dict:
         """
         Scan a URL using VirusTotal API.
@@ -80,98 +315,38 @@ class ThreatDetector:
         if not self.virustotal_enabled:
             return {"error": "VirusTotal API key not configured"}
         
-        try:
-            # Strip any leading/trailing whitespace
-            url = url.strip()
-            
-            # Check if URL is properly formatted
-            parsed_url = urlparse(url)
-            if not all([parsed_url.scheme, parsed_url.netloc]):
-                return {"error": "Invalid URL format"}
-            
-            # Prepare the API request
-            headers = {
-                "x-apikey": self.virustotal_api_key,
-                "Content-Type": "application/json"
-            }
-            
-            # First, check if URL has been analyzed before
-            url_id = requests.utils.quote(url, safe='')
-            response = requests.get(f"https://www.virustotal.com/api/v3/urls/{url_id}", headers=headers)
-            
-            # If not found, submit for analysis
-            if response.status_code == 404:
-                logger.info(f"URL {url} not found in VirusTotal, submitting for analysis")
-                payload = {"url": url}
-                response = requests.post("https://www.virustotal.com/api/v3/urls", headers=headers, data=payload)
-                
-                if response.status_code == 200:
-                    analysis_id = response.json().get("data", {}).get("id")
-                    
-                    # Wait for analysis to complete (with timeout)
-                    max_attempts = 5
-                    for attempt in range(max_attempts):
-                        logger.info(f"Analysis for {url} is queued, waiting...")
-                        
-                        # Wait before checking again
-                        import time
-                        time.sleep(5)
-                        
-                        # Check analysis status
-                        response = requests.get(f"https://www.virustotal.com/api/v3/analyses/{analysis_id}", headers=headers)
-                        
-                        if response.status_code == 200:
-                            data = response.json().get("data", {})
-                            status = data.get("attributes", {}).get("status")
-                            
-                            if status == "completed":
-                                break
-                        
-                        # Last attempt, return what we have
-                        if attempt == max_attempts - 1:
-                            logger.warning(f"Analysis for {url} timed out")
-                            return {"status": "timeout", "message": "Analysis taking too long"}
-                else:
-                    logger.error(f"Error submitting URL to VirusTotal: {response.status_code}")
-                    return {"error": f"API error: {response.status_code}"}
-            
-            # Process the result
-            if response.status_code == 200:
-                result = response.json()
-                
-                # For completed analysis, extract the stats
-                try:
-                    # Extract relevant threat information
-                    stats = result.get("data", {}).get("attributes", {}).get("stats", {})
-                    malicious = stats.get("malicious", 0)
-                    suspicious = stats.get("suspicious", 0)
-                    total = sum(stats.values())
-                    
-                    return {
-                        "status": "complete",
-                        "malicious": malicious,
-                        "suspicious": suspicious,
-                        "total": total,
-                        "score": (malicious + suspicious) / total if total > 0 else 0,
-                        "url": url
-                    }
-                except Exception as e:
-                    logger.error(f"Error processing VirusTotal results: {e}")
-                    return {"error": f"Error processing results: {str(e)}"}
-            else:
-                logger.error(f"VirusTotal API error: {response.status_code}")
-                return {"error": f"API error: {response.status_code}"}
-                
-        except Exception as e:
-            logger.error(f"Error in VirusTotal scan: {e}")
-            return {"error": str(e)}
+        return self.enrichment.submit(self.virustotal, [url]).result()[0]
     
-    def analyze_message(self, message: str) -> Dict:
+    def analyze_message(
+        self,
+        message: str,
+        on_enriched: Optional[Callable[[Dict], None]] = None,
+        priority: int = PRIORITY_INTERACTIVE,
+        scan_urls: bool = True
+    ) -> Dict:
         """
         Analyze a message for potential cybersecurity threats.
         
+        URLs without a cached reputation verdict are looked up on VirusTotal
+        in the background: the verdict from the local rules is returned at
+        once, marked with "enrichment": "pending", and the complete analysis
+        is passed to ``on_enriched`` (on a worker thread) when the lookups
+        finish. It is also cached, so the same message then gets the
+        complete analysis directly. With ``background_enrichment`` disabled
+        the lookups are waited for instead, as they always are for batch
+        priority.
+        
+        Only the first ``max_message_length`` characters are analyzed, and
+        matching stops once ``time_budget`` seconds have passed. Either way
+        the result is marked with "analysis": "partial" and the number of
+        characters analyzed.
+        
         Args:
             message: User message to analyze
+            on_enriched: Called with the complete analysis when background
+                URL lookups finish (optional)
+            priority: Priority of the URL lookups (PRIORITY_INTERACTIVE or PRIORITY_BATCH)
+            scan_urls: Whether to look up URLs on VirusTotal (if it is enabled)
             
         Returns:
             Dictionary with threat analysis results
@@ -187,31 +362,420 @@ class ThreatDetector:
         # Skip empty messages
         if not message or message.strip() == "":
             return result
+        watch = metrics.stopwatch("analysis_seconds")
+        message = message.strip()
+        length = len(message)
+        message = message[:self.max_message_length]
         
-        # Find pattern matches
-        matches = {}
-        for pattern_name, pattern in self.patterns.items():
-            found = re.findall(pattern, message, re.MULTILINE)
-            if found:
-                matches[pattern_name] = found
+        # Use one rule pack for the whole analysis, even if it is reloaded meanwhile
+        rules = self.rules.current()
         
-        # Check for URLs
-        urls = matches.get('url', [])
+        # Repeated messages (spam, copy-pasted scams) are answered from the cache
+        scan_urls = scan_urls and self.virustotal_enabled
+        cache_key = self._cache_key(message, rules, scan_urls)
+        cached = _analysis_cache.get(cache_key) if _analysis_cache is not None else MISSING
+        if cached is not MISSING:
+            watch.lap("cache")
+            self._count_verdict(cached, "cache")
+            return _copy_result(cached)
         
-        # If we have VirusTotal API key and found URLs, check them
-        virustotal_results = []
-        if self.virustotal_enabled and urls:
-            for url in urls[:3]:  # Limit to first 3 URLs to avoid rate limits
-                scan_result = self.scan_url(url)
-                if "error" not in scan_result:
-                    virustotal_results.append(scan_result)
+        # Find pattern and phrase matches in a single pass over the message
+        matches, analyzed = self._match_message(message, rules)
+        watch.lap("match")
+        
+        # Check URLs against the local blocklist
+        self._check_blocklist(matches, analyzed)
+        watch.lap("blocklist")
+        
+        # Check remaining URLs with VirusTotal; batch results must include the verdicts
+        urls = self._urls_to_scan(matches) if scan_urls else []
+        if urls and self.background_enrichment and priority == PRIORITY_INTERACTIVE:
+            future = self.enrichment.submit(self.virustotal, urls, priority)
+            if future.done():
+                # Every verdict was cached
+                virustotal_results, complete = self._usable_scan_results(future.result())
+            else:
+                future.add_done_callback(partial(
+                    self._finish_enrichment, analyzed, length, matches, rules, cache_key, on_enriched
+                ))
+                virustotal_results, complete = [], False
+                result["enrichment"] = "pending"
+        elif urls:
+            virustotal_results, complete = self._scan_matched_urls(matches, priority)
+        else:
+            virustotal_results, complete = [], True
+        watch.lap("virustotal")
         
         # Analyze the pattern matches to determine threats
-        self._evaluate_threats(message, matches, virustotal_results, result)
+        self._evaluate_threats(analyzed, matches, virustotal_results, result, rules)
+        self._mark_partial(result, len(analyzed), length)
         
+        # A verdict cut short by the time budget may be complete next time
+        self._cache_result(cache_key, result, complete and len(analyzed) == len(message))
+        watch.total()
+        self._count_verdict(result, "analysis")
         return result
     
-    def _evaluate_threats(self, message: str, matches: Dict, virustotal_results: List, result: Dict) -> None:
+    @staticmethod
+    def _count_verdict(result: Dict, source: str) -> None:
+        """Count a verdict by risk level and by where it came from."""
+        if metrics.enabled:
+            labels = {"risk_level": result["risk_level"], "source": source}
+            metrics.increment("analysis_verdicts_total", labels=labels)
+            if result.get("analysis") == "partial":
+                metrics.increment("analysis_partial_total")
+    
+    def _match_message(self, message: str, rules: RulePack) -> Tuple[Dict, str]:
+        """
+        Match a message within the time budget.
+        
+        Args:
+            message: Message to match (already capped in length)
+            rules: Rule pack to match with
+            
+        Returns:
+            Tuple of (matches, the leading part of the message that was matched)
+        """
+        deadline = time.monotonic() + self.time_budget
+        matches, analyzed = rules.match_within(message, deadline, self.scan_window, overlap=4096)
+        if analyzed < len(message):
+            logger.warning(f"Analysis time budget exceeded after {analyzed} of {len(message)} characters")
+        return matches, message[:analyzed]
+    
+    @staticmethod
+    def _mark_partial(result: Dict, analyzed: int, length: int) -> None:
+        """Mark a result as covering only the first ``analyzed`` of ``length`` characters."""
+        if analyzed >= length:
+            return
+        result["analysis"] = "partial"
+        result["analyzed_chars"] = analyzed
+        result["recommendations"].append(
+            f"Only the first {analyzed} of {length} characters were analyzed; treat the rest with caution"
+        )
+    
+    def _finish_enrichment(
+        self,
+        message: str,
+        length: int,
+        matches: Dict,
+        rules: RulePack,
+        cache_key: str,
+        on_enriched: Optional[Callable[[Dict], None]],
+        future: Future
+    ) -> None:
+        """
+        Complete an analysis once its background URL lookups are done.
+        
+        Args:
+            message: Analyzed (leading part of the) message
+            length: Length of the whole message
+            matches: Local matches of the message
+            rules: Rule pack used for the local verdict
+            cache_key: Analysis cache key of the message
+            on_enriched: Callback receiving the complete analysis (optional)
+            future: Finished lookup future
+        """
+        try:
+            virustotal_results, complete = self._usable_scan_results(future.result())
+        except Exception as e:
+            logger.error(f"Background URL lookup failed: {e}")
+            return
+        
+        result = {
+            "risk_level": "none",
+            "threat_categories": [],
+            "indicators": [],
+            "recommendations": []
+        }
+        self._evaluate_threats(message, matches, virustotal_results, result, rules)
+        self._mark_partial(result, len(message), length)
+        result["enrichment"] = "complete"
+        self._cache_result(cache_key, result, complete and len(message) == min(length, self.max_message_length))
+        self._count_verdict(result, "enrichment")
+        
+        if on_enriched is not None:
+            try:
+                on_enriched(result)
+            except Exception as e:
+                logger.error(f"Error delivering enriched threat analysis: {e}")
+    
+    def analyze_stream(
+        self,
+        source: Union[str, bytes, bytearray, memoryview, IO],
+        window_size: int = 1 << 20,
+        overlap: int = 4096,
+        encoding: str = "utf-8",
+        max_samples: int = 100,
+        time_budget: Optional[float] = None
+    ) -> Dict:
+        """
+        Analyze a large input (pasted logs, email dumps, files) in fixed-size windows.
+        
+        The input is never materialised as a single string: it is read and
+        scanned one window at a time, with the last ``overlap`` characters of
+        each window rescanned with the next, so URLs, card numbers and other
+        matches spanning a window boundary are neither lost nor counted twice.
+        The patterns and phrases are matched over the whole input, and the
+        classifier scores its first ``max_message_length`` characters, as
+        ``analyze_message`` does; up to that length the verdict is the same.
+        
+        Args:
+            source: Text, bytes buffer, mmap, or file object (text or binary)
+            window_size: Characters (or bytes) read per window
+            overlap: Characters rescanned across each window boundary
+            encoding: Encoding used for bytes input
+            max_samples: Maximum matched values kept per pattern
+            time_budget: Seconds after which no further window is read; the
+                result is then marked partial (default: no limit)
+            
+        Returns:
+            Dictionary with threat analysis results
+        """
+        result = {
+            "risk_level": "none",
+            "threat_categories": [],
+            "indicators": [],
+            "recommendations": []
+        }
+        
+        has_content = False
+        stopped_early = False
+        analyzed = 0
+        deadline = time.monotonic() + time_budget if time_budget is not None else None
+        # Start of the text (without leading whitespace) for the classifier
+        head: List[str] = []
+        head_length = 0
+        
+        def chunks():
+            nonlocal has_content, stopped_early, analyzed, head_length
+            for chunk in _iter_text_chunks(source, window_size, encoding):
+                if deadline is not None and analyzed and time.monotonic() > deadline:
+                    stopped_early = True
+                    return
+                has_content = has_content or (bool(chunk) and not chunk.isspace())
+                analyzed += len(chunk)
+                if head_length < self.max_message_length:
+                    piece = (chunk if head_length else chunk.lstrip())[:self.max_message_length - head_length]
+                    head.append(piece)
+                    head_length += len(piece)
+                yield chunk
+        
+        rules = self.rules.current()
+        matches = rules.match_stream(
+            chunks(), overlap=overlap, max_samples=max_samples,
+            extra_patterns={FULL_URL_RULE: FULL_URL_PATTERN.pattern}
+        )
+        full_urls = matches.pop(FULL_URL_RULE, [])
+        
+        # Skip empty input, as analyze_message does
+        if not has_content:
+            return result
+        
+        self._check_blocklist(matches, full_urls=full_urls)
+        virustotal_results, _ = self._scan_matched_urls(matches)
+        self._evaluate_threats("".join(head).rstrip(), matches, virustotal_results, result, rules)
+        if stopped_early:
+            result["analysis"] = "partial"
+            result["analyzed_chars"] = analyzed
+            result["recommendations"].append(
+                f"Only the first {analyzed} characters were analyzed; treat the rest with caution"
+            )
+        
+        return result
+    
+    def _check_blocklist(
+        self,
+        matches: Dict,
+        message: Optional[str] = None,
+        full_urls: Optional[List[str]] = None
+    ) -> None:
+        """
+        Check matched URLs against the local blocklist.
+        Adds a 'blocklisted_url' entry to the matches dictionary in place.
+        
+        Args:
+            matches: Dictionary of pattern matches
+            message: Original message, used to see full URL paths (optional)
+            full_urls: Full URLs already found in the message, instead of
+                ``message`` (optional)
+        """
+        if not self.blocklist or not matches.get('url'):
+            return
+        
+        urls = matches['url']
+        # The url rule stops at the host; prefix entries need the path
+        if message is not None:
+            urls = urls + FULL_URL_PATTERN.findall(message)
+        if full_urls:
+            urls = urls + full_urls
+        
+        blocked = []
+        for url in urls:
+            entry = self.blocklist.match_url(url)
+            if entry and entry not in blocked:
+                blocked.append(entry)
+        if blocked:
+            matches['blocklisted_url'] = blocked
+    
+    def _cache_key(self, message: str, rules: RulePack, scan_urls: bool) -> str:
+        """
+        Build the analysis cache key of a message.
+        
+        The key covers everything the verdict depends on: the message text,
+        the rule pack and classifier versions and whether URLs are looked up
+        on VirusTotal.
+        
+        Args:
+            message: Normalized message
+            rules: Rule pack used for the analysis
+            scan_urls: Whether URLs are looked up on VirusTotal
+            
+        Returns:
+            Cache key
+        """
+        digest = hashlib.sha256(message.encode("utf-8", "surrogatepass")).hexdigest()
+        classifier = self.classifier.version if self.classifier is not None else "-"
+        return f"{rules.version}:{classifier}:{int(scan_urls)}:{digest}"
+    
+    def _cache_result(self, cache_key: str, result: Dict, complete: bool) -> None:
+        """Cache an analysis result, unless some URL lookups did not complete."""
+        if _analysis_cache is not None and complete:
+            _analysis_cache.set(cache_key, _copy_result(result))
+    
+    @staticmethod
+    def _usable_scan_results(scan_results: List[Dict]) -> Tuple[List[Dict], bool]:
+        """
+        Split VirusTotal results into successful ones and a completeness flag.
+        
+        Args:
+            scan_results: Results of scan_urls
+            
+        Returns:
+            Tuple of (results without errors, whether every lookup completed)
+        """
+        complete = all(scan_result.get("status") == "complete" for scan_result in scan_results)
+        return [scan_result for scan_result in scan_results if "error" not in scan_result], complete
+    
+    @staticmethod
+    def _malicious_urls(virustotal_results: List[Dict]) -> Dict[str, int]:
+        """Map URLs that VirusTotal rates as malicious to their vendor counts."""
+        return {
+            scan_result["url"]: scan_result.get("malicious", 0)
+            for scan_result in virustotal_results if scan_result.get("score", 0) > 0.1
+        }
+    
+    def _urls_to_scan(self, matches: Dict) -> List[str]:
+        """Return the matched URLs that should be looked up on VirusTotal."""
+        if not self.virustotal_enabled:
+            return []
+        urls = matches.get('url', [])
+        if matches.get('blocklisted_url'):
+            # Already known to be malicious, no need to spend quota on them
+            urls = [url for url in urls if not self.blocklist.match_url(url)]
+        return urls[:3]  # Limit to first 3 URLs to avoid rate limits
+    
+    def _scan_matched_urls(
+        self,
+        matches: Dict,
+        priority: int = PRIORITY_INTERACTIVE
+    ) -> Tuple[List[Dict], bool]:
+        """
+        Look up matched URLs on VirusTotal through the enrichment queue and wait for them.
+        
+        Interactive callers wait at most the per-message deadline; lookups
+        still queued or running then finish in the background and only warm
+        the cache. Batch callers wait for the rate limit as long as needed.
+        
+        Args:
+            matches: Dictionary of pattern matches
+            priority: Priority of the lookups
+            
+        Returns:
+            Tuple of (successful VirusTotal scan results, whether every lookup completed)
+        """
+        urls = self._urls_to_scan(matches)
+        if not urls:
+            return [], True
+        
+        future = self.enrichment.submit(self.virustotal, urls, priority)
+        timeout = self.virustotal_deadline if priority == PRIORITY_INTERACTIVE else None
+        try:
+            scan_results = future.result(timeout)
+        except FutureTimeoutError:
+            scan_results = [{"status": "timeout", "message": "Deadline exceeded", "url": url} for url in urls]
+        return self._usable_scan_results(scan_results)
+    
+    def analyze_messages(
+        self,
+        messages: Iterable[str],
+        workers: Optional[int] = None,
+        chunk_size: int = 256,
+        max_pending_chunks: Optional[int] = None,
+        scan_urls: bool = False
+    ) -> Iterator[Dict]:
+        """
+        Analyze many messages in parallel across CPU cores.
+        
+        Messages are read lazily in chunks and fanned out to a process pool.
+        Results are yielded in input order as soon as each chunk completes, and
+        only a bounded number of chunks is in flight at any time, so arbitrarily
+        large inputs (e.g. a backfill over historical chat logs) can be streamed
+        through without holding them in memory.
+        
+        Args:
+            messages: Iterable of messages to analyze
+            workers: Number of worker processes (default: number of CPUs).
+                With 1 worker the messages are analyzed in this process.
+            chunk_size: Number of messages sent to a worker at a time
+            max_pending_chunks: Maximum chunks in flight (default: 2 per worker)
+            scan_urls: Whether to look up URLs on VirusTotal. Disabled by default
+                because bulk lookups quickly exhaust the API quota.
+            
+        Yields:
+            Threat analysis results, in the same order as the input messages
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        
+        workers = workers or os.cpu_count() or 1
+        if workers == 1:
+            for message in messages:
+                yield self.analyze_message(message, priority=PRIORITY_BATCH, scan_urls=scan_urls)
+            return
+        
+        max_pending_chunks = max_pending_chunks or workers * 2
+        iterator = iter(messages)
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_batch_worker,
+            initargs=(self.virustotal_api_key, scan_urls)
+        )
+        try:
+            pending = deque()
+            while True:
+                chunk = list(islice(iterator, chunk_size))
+                if not chunk:
+                    break
+                pending.append(pool.submit(_analyze_batch, chunk))
+                
+                # Apply backpressure once enough chunks are queued
+                if len(pending) >= max_pending_chunks:
+                    yield from pending.popleft().result()
+            
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            # Also reached when the caller stops iterating early
+            pool.shutdown(wait=True, cancel_futures=True)
+    
+    def _evaluate_threats(
+        self,
+        message: str,
+        matches: Dict,
+        virustotal_results: List,
+        result: Dict,
+        rules: Optional[RulePack] = None
+    ) -> None:
         """
         Evaluate pattern matches to determine security threats.
         Updates the result dictionary in place.
@@ -221,94 +785,37 @@ class ThreatDetector:
             matches: Dictionary of pattern matches
             virustotal_results: Results from VirusTotal scans
             result: Result dictionary to update
+            rules: Rule pack whose scoring table is applied (default: the active one)
         """
-        threat_indicators = []
-        recommendations = []
-        threat_categories = set()
-        risk_score = 0
-        
-        # Check for URLs and domains
-        if matches.get('url') or matches.get('ip_address'):
-            # Add suspicious domains to threats
-            if matches.get('suspicious_domain'):
-                threat_indicators.append("Suspicious domain detected that may be used for phishing")
-                threat_categories.add("phishing")
-                risk_score += 2
-                
-            # Add VirusTotal results
-            for result in virustotal_results:
-                if result.get("score", 0) > 0.1:
-                    threat_indicators.append(
-                        f"URL {result['url']} flagged by {result.get('malicious', 0)} security vendors as malicious"
-                    )
-                    threat_categories.add("malicious url")
-                    risk_score += 3
-        
-        # Check for credential exposure
-        if matches.get('password'):
-            threat_indicators.append("Password exposed in plaintext")
-            threat_categories.add("credential exposure")
-            recommendations.append("Never share passwords in plaintext messages")
-            risk_score += 4
-        
-        if matches.get('credit_card'):
-            threat_indicators.append("Credit card number potentially exposed")
-            threat_categories.add("data exposure")
-            recommendations.append("Avoid sharing financial information over unsecured channels")
-            risk_score += 4
-            
-        if matches.get('ssn'):
-            threat_indicators.append("Social Security Number potentially exposed")
-            threat_categories.add("data exposure")
-            recommendations.append("Never share Social Security Numbers via messaging")
-            risk_score += 4
-        
-        # Check for malware indicators
-        if matches.get('executable') or matches.get('double_extension'):
-            threat_indicators.append("Suspicious file attachment with executable extension")
-            threat_categories.add("malware")
-            recommendations.append("Do not open unexpected executable files")
-            risk_score += 3
-        
-        if matches.get('suspicious_command'):
-            threat_indicators.append("Suspicious command that may execute malicious code")
-            threat_categories.add("malware")
-            threat_categories.add("command execution")
-            recommendations.append("Do not run commands from untrusted sources")
-            risk_score += 4
-        
-        # Check for phishing indicators
-        phishing_score = 0
-        
-        if matches.get('urgency'):
-            phishing_score += 1
-            threat_indicators.append("Message creates a false sense of urgency")
-        
-        if matches.get('threat'):
-            phishing_score += 1
-            threat_indicators.append("Message contains threatening language about accounts or security")
-        
-        if phishing_score >= 1:
-            threat_categories.add("phishing")
-            risk_score += phishing_score
-            
-            if 'url' in matches and phishing_score >= 1:
-                threat_categories.add("credential harvesting")
-                recommendations.append("Verify suspicious links before clicking")
-                recommendations.append("Contact organizations directly through official channels")
-        
-        # Set the overall risk level
-        if risk_score >= 4:
-            result["risk_level"] = "high"
-        elif risk_score >= 2:
-            result["risk_level"] = "medium"
-        elif risk_score >= 1:
-            result["risk_level"] = "low"
+        rules = rules or self.rules.current()
+        
+        # VirusTotal verdicts are scored like any other match, by URL
+        malicious = self._malicious_urls(virustotal_results)
+        if malicious:
+            matches['malicious_url_report'] = malicious
+        
+        watch = metrics.stopwatch("analysis_seconds")
+        threat_indicators, recommendations, threat_categories, risk_score = rules.score(matches)
+        watch.lap("score")
+        
+        # Second stage: the classifier catches paraphrased scams the rules miss
+        if self.classifier is not None and message:
+            probability = float(self.classifier.predict_proba([message])[0])
+            watch.lap("classifier")
+            result["ml_probability"] = round(probability, 4)
+            if probability >= self.classifier_threshold:
+                risk_score = round(risk_score + self.classifier_weight * probability, 2)
+                threat_indicators.append(
+                    f"Message resembles known scam or phishing messages ({probability:.0%} model confidence)"
+                )
+                if "phishing" not in threat_categories:
+                    threat_categories.append("phishing")
         
         # Update the result
+        result["risk_level"] = rules.risk_level(risk_score)
         result["indicators"] = threat_indicators
         result["recommendations"] = recommendations
-        result["threat_categories"] = list(threat_categories)
+        result["threat_categories"] = threat_categories
         result["risk_score"] = risk_score
     
     def get_security_recommendations(self, threat_analysis: Dict) -> List[str]:
@@ -337,6 +844,9 @@ class ThreatDetector:
             recommendations.append("Be cautious of messages creating urgency or requesting sensitive information")
             recommendations.append("Verify the authenticity of links before clicking them")
             
+        if "scam" in threat_categories:
+            recommendations.append("Be wary of unexpected offers of money, prizes or investments")
+            
         if "malware" in threat_categories:
             recommendations.append("Do not download or open unexpected file attachments")
             recommendations.append("Keep your antivirus software up to date")
@@ -6,18 +6,19 @@ CyberGuard AI - OpenRouter Integration
 This module provides integration with the OpenRouter API for accessing advanced AI models.
 """
 
+import asyncio
 import logging
-import requests
-import json
 import os
 import sys
 import uuid
-from typing import Dict, List, Optional, Any
+from typing import AsyncIterator, Dict, List, Optional, Any
 
 # Add parent directory to path to allow imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from core.chatbot import BaseChatbot
 from config import settings
+from utils.openrouter_client import OpenRouterError
+from utils.model_router import get_model_router
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -62,9 +63,58 @@ class OpenRouterCyberGuardBot(BaseChatbot):
         self.model_name = model_name or settings.OPENROUTER_MODEL_NAME
         logger.info(f"Using OpenRouter model: {self.model_name}")
         
+        # Model router (and connection pool) shared by all sessions using this API key;
+        # a failing model is replaced by the next one of the fallback chain
+        self.router = get_model_router(self.api_key)
+        self.last_model_used: Optional[str] = None
+        
         # Generate a unique ID for this chatbot instance
         self.session_id = str(uuid.uuid4())
     
+    def _prepare_messages(self, user_input: str) -> List[Dict[str, str]]:
+        """
+        Analyze a message for threats and build the chat messages for it.
+        
+        Args:
+            user_input: The user's input message
+            
+        Returns:
+            Chat messages including any security recommendations
+        """
+        # Analyze for security threats
+        threat_analysis = self.analyze_security_threats(user_input)
+        security_recommendations = []
+        
+        # Extract security recommendations if threats were found
+        if threat_analysis["risk_level"] != "none" and self.threat_detector:
+            security_recommendations = self.threat_detector.get_security_recommendations(threat_analysis)
+        
+        # Create the chat messages
+        return self._create_chat_messages(user_input, security_recommendations)
+    
+    def _finish(self, user_input: str, result: Dict) -> str:
+        """
+        Extract the reply from a completion response and record the exchange.
+        
+        Args:
+            user_input: The user's input message
+            result: Decoded completion response
+            
+        Returns:
+            The chatbot's response
+        """
+        # Extract the assistant's response
+        if "choices" in result and len(result["choices"]) > 0:
+            content = result["choices"][0]["message"]["content"]
+            
+            # Add to conversation history
+            self._remember(user_input, content)
+            
+            return content
+        else:
+            logger.error(f"Unexpected response format: {result}")
+            return "Error: Unexpected response from the AI service."
+    
     def chat(
         self, 
         user_input: str,
@@ -74,6 +124,8 @@ class OpenRouterCyberGuardBot(BaseChatbot):
         """
         Process a user message and generate a response using OpenRouter.
         
+        Blocks until the completion arrives; async code should use achat().
+        
         Args:
             user_input: The user's input message
             max_tokens: Maximum number of tokens to generate
@@ -83,58 +135,86 @@ class OpenRouterCyberGuardBot(BaseChatbot):
             The chatbot's response
         """
         try:
-            # Analyze for security threats
-            threat_analysis = self.analyze_security_threats(user_input)
-            security_recommendations = []
-            
-            # Extract security recommendations if threats were found
-            if threat_analysis["risk_level"] != "none" and self.threat_detector:
-                security_recommendations = self.threat_detector.get_security_recommendations(threat_analysis)
+            self.last_model_used = None
+            messages = self._prepare_messages(user_input)
+            self.last_model_used, result = self.router.complete(messages, self.model_name, max_tokens, temperature)
+            return self._finish(user_input, result)
             
-            # Create the chat messages
-            messages = self._create_chat_messages(user_input, security_recommendations)
-            
-            # Prepare the OpenRouter API request
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            data = {
-                "model": self.model_name,
-                "messages": messages,
-                "max_tokens": max_tokens,
-                "temperature": temperature
-            }
+        except OpenRouterError as e:
+            return f"Error: Unable to process your request. {e}"
+        except Exception as e:
+            logger.error(f"Error in OpenRouter chat: {e}")
+            return f"Error: An unexpected error occurred: {str(e)}"
+    
+    async def achat(
+        self, 
+        user_input: str,
+        max_tokens: int = 1024,
+        temperature: float = 0.7
+    ) -> str:
+        """
+        Process a user message and generate a response without blocking the event loop.
+        
+        The completion is requested over the shared connection pool, so other
+        users on the same worker are served while it is generated.
+        
+        Args:
+            user_input: The user's input message
+            max_tokens: Maximum number of tokens to generate
+            temperature: Temperature for response generation
             
-            # Make the API request
-            response = requests.post(
-                "https://openrouter.ai/api/v1/chat/completions",
-                headers=headers,
-                data=json.dumps(data)
+        Returns:
+            The chatbot's response
+        """
+        try:
+            self.last_model_used = None
+            # Threat analysis may wait for VirusTotal lookups, so keep it off the event loop
+            messages = await asyncio.to_thread(self._prepare_messages, user_input)
+            self.last_model_used, result = await self.router.acomplete(
+                messages, self.model_name, max_tokens, temperature
             )
+            return self._finish(user_input, result)
             
-            # Check for successful response
-            if response.status_code == 200:
-                result = response.json()
-                
-                # Extract the assistant's response
-                if "choices" in result and len(result["choices"]) > 0:
-                    content = result["choices"][0]["message"]["content"]
-                    
-                    # Add to conversation history
-                    self.history.append({"role": "user", "content": user_input})
-                    self.history.append({"role": "assistant", "content": content})
-                    
-                    return content
-                else:
-                    logger.error(f"Unexpected response format: {result}")
-                    return "Error: Unexpected response from the AI service."
-            else:
-                error_info = response.json() if response.content else {"error": f"Status code: {response.status_code}"}
-                logger.error(f"OpenRouter API error: {error_info}")
-                return f"Error: Unable to process your request. {error_info.get('error', {}).get('message', 'Unknown error')}"
-                
+        except OpenRouterError as e:
+            return f"Error: Unable to process your request. {e}"
         except Exception as e:
             logger.error(f"Error in OpenRouter chat: {e}")
             return f"Error: An unexpected error occurred: {str(e)}"
+    
+    async def astream_chat(
+        self, 
+        user_input: str,
+        max_tokens: int = 1024,
+        temperature: float = 0.7
+    ) -> AsyncIterator[str]:
+        """
+        Process a user message and yield the response as it is generated.
+        
+        The exchange is added to the conversation history only once the
+        response is complete; if the caller stops iterating early (for example
+        because the client disconnected), the history is left unchanged.
+        
+        Args:
+            user_input: The user's input message
+            max_tokens: Maximum number of tokens to generate
+            temperature: Temperature for response generation
+            
+        Yields:
+            Pieces of the chatbot's response, in order
+            
+        Raises:
+            OpenRouterError: If the completion fails
+        """
+        self.last_model_used = None
+        messages = await asyncio.to_thread(self._prepare_messages, user_input)
+        parts = []
+        stream = self.router.astream(messages, self.model_name, max_tokens, temperature)
+        try:
+            async for model, delta in stream:
+                self.last_model_used = model
+                parts.append(delta)
+                yield delta
+        finally:
+            await stream.aclose()
+        
+        self._remember(user_input, "".join(parts))
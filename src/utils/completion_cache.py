@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+CyberGuard AI - Completion Cache
+This module caches chat completions of deterministic (low temperature)
+requests, so that common questions asked by many users are answered
+without another paid upstream call.
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# Add parent directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import settings
+from utils.cache import LRUCache, MISSING
+from utils.metrics import metrics
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Number of writes between purges of expired rows from the SQLite tier
+PURGE_INTERVAL = 500
+
+
+def normalize_messages(messages: List[Dict[str, str]]) -> List[Tuple[str, str]]:
+    """
+    Reduce chat messages to what decides the completion.
+
+    Roles are lower-cased and runs of whitespace in the content collapsed,
+    so that "What is  phishing? " and "What is phishing?" share an entry.
+
+    Args:
+        messages: Chat messages as sent upstream
+
+    Returns:
+        List of (role, content) pairs
+    """
+    return [
+        (str(message.get("role", "")).strip().lower(), " ".join(str(message.get("content", "")).split()))
+        for message in messages
+    ]
+
+
+class CompletionCache:
+    """
+    Two-tier cache of chat completions.
+
+    Entries are keyed on the model, the normalized messages and the sampling
+    parameters. Only requests with a temperature of at most
+    ``max_temperature`` are cached; sampled answers at higher temperatures
+    are meant to differ. The first tier is an in-process LRU with a TTL, the
+    optional second tier a SQLite table shared by worker processes that
+    survives restarts.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        max_size: Optional[int] = None,
+        ttl: Optional[float] = None,
+        max_temperature: Optional[float] = None
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            db_path: SQLite file for the persistent tier (default: from settings;
+                an empty string disables the persistent tier)
+            max_size: Maximum number of entries in the in-process tier
+            ttl: Lifetime of an entry in seconds
+            max_temperature: Highest temperature of requests that are cached
+        """
+        self.db_path = settings.COMPLETION_CACHE_PATH if db_path is None else db_path
+        self.ttl = settings.COMPLETION_CACHE_TTL if ttl is None else ttl
+        self.max_temperature = (
+            settings.COMPLETION_CACHE_MAX_TEMPERATURE if max_temperature is None else max_temperature
+        )
+
+        self.memory = LRUCache(max_size or settings.COMPLETION_CACHE_SIZE, default_ttl=self.ttl)
+        self.disk_hits = 0
+        self.disk_misses = 0
+        self.coalesced = 0
+        self._writes = 0
+
+        self._conn = None
+        self._lock = threading.Lock()
+        if self.db_path:
+            self._init_db()
+
+    def _init_db(self) -> None:
+        """Open the persistent tier and create its table if needed"""
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=5)
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS llm_completions (
+                    key TEXT PRIMARY KEY,
+                    result TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            ''')
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Completion cache unavailable on disk, using memory only: {e}")
+            self._conn = None
+
+    def key(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        max_tokens: int,
+        temperature: float
+    ) -> Optional[str]:
+        """
+        Compute the cache key of a request.
+
+        Args:
+            messages: Chat messages
+            model: Model name
+            max_tokens: Maximum number of tokens to generate
+            temperature: Temperature for response generation
+
+        Returns:
+            The key, or None if the request is not cacheable
+        """
+        if temperature is None or temperature > self.max_temperature:
+            return None
+        request = {
+            "model": model,
+            "messages": normalize_messages(messages),
+            "max_tokens": max_tokens,
+            "temperature": round(float(temperature), 2)
+        }
+        return hashlib.sha256(json.dumps(request, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Look up a cached completion.
+
+        Args:
+            key: Key returned by key()
+
+        Returns:
+            The cached completion response, or None on a miss
+        """
+        result = self.memory.get(key)
+        if result is not MISSING:
+            return result
+        if self._conn is None:
+            return None
+
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT result, expires_at FROM llm_completions WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Completion cache read error: {e}")
+            return None
+
+        remaining = row[1] - time.time() if row else 0
+        if remaining <= 0:
+            self.disk_misses += 1
+            return None
+
+        self.disk_hits += 1
+        result = json.loads(row[0])
+        self.memory.set(key, result, ttl=remaining)
+        return result
+
+    def set(self, key: str, result: Dict) -> None:
+        """
+        Store a completion in both tiers.
+
+        Args:
+            key: Key returned by key()
+            result: Decoded completion response
+        """
+        if self.ttl <= 0:
+            return
+        self.memory.set(key, result)
+        if self._conn is None:
+            return
+
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_completions (key, result, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(result), time.time() + self.ttl)
+                )
+                self._writes += 1
+                if self._writes % PURGE_INTERVAL == 0:
+                    self._conn.execute("DELETE FROM llm_completions WHERE expires_at < ?", (time.time(),))
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Completion cache write error: {e}")
+
+    def clear(self) -> None:
+        """Remove all cached completions from both tiers."""
+        self.memory.clear()
+        if self._conn is None:
+            return
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_completions")
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        """
+        Get cache counters.
+
+        Returns:
+            Dictionary with in-memory tier counters, persistent tier hits/misses
+            and the number of requests coalesced with an identical one in flight
+        """
+        return {
+            "memory": self.memory.stats(),
+            "disk": {
+                "enabled": self._conn is not None,
+                "hits": self.disk_hits,
+                "misses": self.disk_misses
+            },
+            "coalesced": self.coalesced
+        }
+
+    def counters(self) -> List[Tuple[str, Dict[str, str], float]]:
+        """Export lookup outcomes as metric counters."""
+        memory = self.memory.stats()
+        return [
+            ("completion_cache_lookups_total", {"result": "memory_hit"}, memory["hits"]),
+            ("completion_cache_lookups_total", {"result": "disk_hit"}, self.disk_hits),
+            # Lookups that missed memory either hit the disk tier or went upstream
+            ("completion_cache_lookups_total", {"result": "miss"}, memory["misses"] - self.disk_hits),
+            ("completion_cache_coalesced_total", {}, self.coalesced),
+        ]
+
+
+# Cache shared by all chatbots in this process
+_shared_cache: Optional[CompletionCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_completion_cache() -> Optional[CompletionCache]:
+    """
+    Get the process-wide completion cache.
+
+    Returns:
+        The shared cache, or None if COMPLETION_CACHE_SIZE is 0
+    """
+    global _shared_cache
+    if settings.COMPLETION_CACHE_SIZE <= 0:
+        return None
+    with _shared_lock:
+        if _shared_cache is None:
+            cache = CompletionCache()
+            # Hit rates are exported on demand
+            metrics.add_collector(cache.counters)
+            _shared_cache = cache
+        return _shared_cache
+
+
+def _reset_after_fork() -> None:
+    """Drop the cache inherited by a forked child; its SQLite connection belongs to the parent."""
+    global _shared_cache, _shared_lock
+    _shared_cache = None
+    _shared_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
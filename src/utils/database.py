@@ -7,11 +7,15 @@ This module handles database connections and operations for user authentication.
 """
 
 import os
+import asyncio
 import logging
 import sqlite3
 import hashlib
 import secrets
 import time
+import weakref
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import json
 from typing import Dict, List, Optional, Tuple, Any
@@ -20,6 +24,9 @@ import sys
 # Add parent directory to path to allow imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import settings
+from utils.cache import LRUCache, MISSING
+from utils.passwords import get_hasher, hash_password, verify_password
+from utils.metrics import metrics
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -27,26 +34,126 @@ logger = logging.getLogger(__name__)
 # Database file path
 DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data', 'cyberguard.db')
 
+# Prepared statements kept per connection (sqlite3 compiles each distinct query once)
+STATEMENT_CACHE_SIZE = 128
+
+# fsync policy of the connections (NORMAL unless configured to one of the SQLite modes)
+SYNCHRONOUS = settings.DATABASE_SYNCHRONOUS if settings.DATABASE_SYNCHRONOUS in ("OFF", "NORMAL", "FULL", "EXTRA") else "NORMAL"
+
+# Pause between batches of the expired-session sweep, in seconds, so that writers get the lock
+SWEEP_PAUSE = 0.05
+
+# Every Database and AsyncDatabase instance, so that connections and threads can be dropped in forked children
+_instances = weakref.WeakSet()
+
 class Database:
     """
     SQLite database handler for CyberGuard AI.
     Implements secure user authentication and session management.
+    
+    Each thread keeps one persistent connection, opened on first use and
+    configured for concurrent access (WAL journal, relaxed fsync, larger page
+    cache, busy timeout), so that an auth check costs a prepared query rather
+    than opening the database file. Under uvicorn the threadpool reuses its
+    threads, so the number of connections stays bounded by its size.
+    
+    Verified sessions are cached in process, keyed by a hash of the token, so
+    repeated auth checks skip the database. Deleted sessions are dropped from
+    the cache at once and recorded in a revocation table that the other worker
+    processes poll, so a logout takes effect everywhere within a second.
     """
     
-    def __init__(self, db_path: Optional[str] = None):
-        """Initialize the database connection"""
+    def __init__(self, db_path: Optional[str] = None, session_cache_size: Optional[int] = None):
+        """
+        Initialize the database connection
+        
+        Args:
+            db_path: SQLite file (default: data/cyberguard.db)
+            session_cache_size: Verified sessions cached in process (default: from settings; 0 disables)
+        """
         self.db_path = db_path or DB_PATH
         
+        # Per-thread connections, plus every open connection by thread id for close()
+        self._local = threading.local()
+        self._connections: Dict[int, sqlite3.Connection] = {}
+        self._lock = threading.Lock()
+        _instances.add(self)
+        
+        # Verified sessions by token hash; a check records the deletion count before reading
+        # the database and skips caching if a session was deleted meanwhile
+        cache_size = settings.SESSION_CACHE_SIZE if session_cache_size is None else session_cache_size
+        self.session_cache = LRUCache(cache_size, default_ttl=settings.SESSION_CACHE_TTL) if cache_size > 0 else None
+        self._deletions = 0
+        
+        # Cross-process invalidation: last revocation seen and when the table was last polled
+        self.revocation_interval = settings.SESSION_REVOCATION_INTERVAL
+        self.max_sessions_per_user = settings.SESSION_MAX_PER_USER
+        self._revocation_id = 0
+        self._revocations_checked = 0.0
+        
         # Create data directory if it doesn't exist
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
         
         # Initialize the database
         self._init_db()
     
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Get the calling thread's connection, opening it on first use
+        
+        Returns:
+            Persistent connection of the current thread
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+        
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=settings.DATABASE_BUSY_TIMEOUT,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            check_same_thread=False
+        )
+        # WAL lets readers proceed while a writer commits; NORMAL only syncs at checkpoints,
+        # which is still safe against corruption in WAL mode
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={SYNCHRONOUS}")
+        conn.execute(f"PRAGMA cache_size={-int(settings.DATABASE_CACHE_SIZE_KB)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        
+        with self._lock:
+            # Drop the connections of threads that have exited
+            alive = {thread.ident for thread in threading.enumerate()}
+            for ident in [ident for ident in self._connections if ident not in alive]:
+                self._connections.pop(ident).close()
+            self._connections[threading.get_ident()] = conn
+        self._local.conn = conn
+        return conn
+    
+    def close(self) -> None:
+        """Close every open connection (they are reopened on next use)"""
+        with self._lock:
+            connections = list(self._connections.values())
+            self._connections.clear()
+            self._local = threading.local()
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                logger.warning(f"Error closing database connection: {e}")
+    
+    def _reset_after_fork(self) -> None:
+        """Forget connections inherited from the parent process without using them"""
+        self._connections = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        if self.session_cache is not None:
+            self.session_cache = LRUCache(self.session_cache.max_size, default_ttl=self.session_cache.default_ttl)
+    
     def _init_db(self) -> None:
         """Initialize the database schema if it doesn't exist"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             # Create users table
@@ -74,14 +181,54 @@ class Database:
                 )
             ''')
             
+            # Index expiry for the sweeper and user for the per-user cap
+            # (the index on user_id is ordered by id, i.e. by creation, within each user)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions (expires_at)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessions_user_id ON sessions (user_id)")
+            
+            # Create session revocations table (read by other worker processes)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS session_revocations (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    token_hash TEXT NOT NULL,
+                    revoked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_session_revocations_revoked_at ON session_revocations (revoked_at)")
+            
             conn.commit()
-            conn.close()
+            
+            # Revocations made before this process started cannot concern its cache
+            self._revocation_id = cursor.execute("SELECT COALESCE(MAX(id), 0) FROM session_revocations").fetchone()[0]
             logger.info("Database initialized successfully")
         
         except sqlite3.Error as e:
             logger.error(f"Database initialization error: {e}")
             raise
     
+    @staticmethod
+    def _token_key(token: str) -> str:
+        """Session cache key of a token, so that raw tokens are not kept in memory"""
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+    
+    def _revocations_due(self) -> bool:
+        """Tell whether the revocations of other processes should be checked now"""
+        return self.revocation_interval > 0 and time.monotonic() - self._revocations_checked >= self.revocation_interval
+    
+    def _sync_revocations(self) -> None:
+        """Drop cached sessions revoked by other processes (at most once per interval)"""
+        if not self._revocations_due():
+            return
+        self._revocations_checked = time.monotonic()
+        
+        rows = self._connect().execute(
+            "SELECT id, token_hash FROM session_revocations WHERE id > ? ORDER BY id",
+            (self._revocation_id,)
+        ).fetchall()
+        for revocation_id, token_hash in rows:
+            self.session_cache.pop(token_hash)
+            self._revocation_id = max(self._revocation_id, revocation_id)
+    
     def _hash_password(self, password: str, salt: Optional[str] = None) -> Tuple[str, str]:
         """
         Hash a password using PBKDF2 with SHA-256
@@ -93,20 +240,58 @@ class Database:
         Returns:
             Tuple of (password_hash, salt)
         """
-        if not salt:
-            salt = secrets.token_hex(16)
+        return hash_password(password, salt)
+    
+    def _user_exists(self, email: str) -> bool:
+        """Tell whether an account uses this email (checked before spending time on hashing)"""
+        return self._connect().execute("SELECT id FROM users WHERE email = ?", (email,)).fetchone() is not None
+    
+    def _insert_user(self, email: str, fullname: str, password_hash: str, salt: str) -> Optional[int]:
+        """
+        Insert a user whose password is already hashed
+        
+        Returns:
+            The new user's ID, or None if the email is taken
+        """
+        conn = self._connect()
+        try:
+            # Committed on success, rolled back on error
+            with conn:
+                cursor = conn.execute(
+                    "INSERT INTO users (email, fullname, password_hash, salt) VALUES (?, ?, ?, ?)",
+                    (email, fullname, password_hash, salt)
+                )
+        except sqlite3.IntegrityError:
+            logger.warning(f"Attempted to create duplicate user: {email}")
+            return None
         
-        # Use PBKDF2 with 100,000 iterations (good balance of security and performance)
-        key = hashlib.pbkdf2_hmac(
-            'sha256',
-            password.encode('utf-8'),
-            salt.encode('utf-8'),
-            100000
-        ).hex()
+        logger.info(f"User created successfully: {email}")
+        return cursor.lastrowid
+    
+    def _get_credentials(self, email: str) -> Optional[Tuple]:
+        """Get (id, email, fullname, password_hash, salt) of a user, or None"""
+        return self._connect().execute(
+            "SELECT id, email, fullname, password_hash, salt FROM users WHERE email = ?", 
+            (email,)
+        ).fetchone()
+    
+    def _record_login(self, user: Tuple) -> Dict[str, Any]:
+        """Update the last login time of a verified user and return their data"""
+        user_id, email, fullname = user[:3]
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = ?",
+                (user_id,)
+            )
         
-        return key, salt
+        return {
+            "id": user_id,
+            "email": email,
+            "fullname": fullname
+        }
     
-    def create_user(self, email: str, fullname: str, password: str) -> bool:
+    def create_user(self, email: str, fullname: str, password: str) -> Optional[int]:
         """
         Create a new user
         
@@ -116,37 +301,21 @@ class Database:
             password: User's plain text password
             
         Returns:
-            Success status
+            The new user's ID, or None if the user exists or on error
         """
         try:
-            # Hash the password
-            password_hash, salt = self._hash_password(password)
-            
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             # Check if user already exists
-            cursor.execute("SELECT id FROM users WHERE email = ?", (email,))
-            if cursor.fetchone():
-                conn.close()
+            if self._user_exists(email):
                 logger.warning(f"Attempted to create duplicate user: {email}")
-                return False
-            
-            # Insert the new user
-            cursor.execute(
-                "INSERT INTO users (email, fullname, password_hash, salt) VALUES (?, ?, ?, ?)",
-                (email, fullname, password_hash, salt)
-            )
-            
-            conn.commit()
-            conn.close()
+                return None
             
-            logger.info(f"User created successfully: {email}")
-            return True
+            # Hash the password and insert the new user
+            password_hash, salt = self._hash_password(password)
+            return self._insert_user(email, fullname, password_hash, salt)
             
         except sqlite3.Error as e:
             logger.error(f"Database error creating user: {e}")
-            return False
+            return None
     
     def verify_user(self, email: str, password: str) -> Optional[dict]:
         """
@@ -160,43 +329,11 @@ class Database:
             User data if valid, None otherwise
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Get user data
-            cursor.execute(
-                "SELECT id, email, fullname, password_hash, salt FROM users WHERE email = ?", 
-                (email,)
-            )
-            user = cursor.fetchone()
-            
-            if not user:
-                conn.close()
-                return None
-            
-            user_id, email, fullname, stored_hash, salt = user
-            
-            # Verify password
-            input_hash, _ = self._hash_password(password, salt)
-            
-            if input_hash != stored_hash:
-                conn.close()
+            user = self._get_credentials(email)
+            if not user or not verify_password(password, user[4], user[3]):
                 return None
             
-            # Update last login
-            cursor.execute(
-                "UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = ?",
-                (user_id,)
-            )
-            
-            conn.commit()
-            conn.close()
-            
-            return {
-                "id": user_id,
-                "email": email,
-                "fullname": fullname
-            }
+            return self._record_login(user)
             
         except sqlite3.Error as e:
             logger.error(f"Database error verifying user: {e}")
@@ -218,29 +355,39 @@ class Database:
             token = secrets.token_hex(32)
             expires_at = datetime.now() + timedelta(seconds=expires_in)
             
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Insert new session
-            cursor.execute(
-                "INSERT INTO sessions (user_id, token, expires_at) VALUES (?, ?, ?)",
-                (user_id, token, expires_at)
-            )
-            
-            # Get user info
-            cursor.execute("SELECT email, fullname FROM users WHERE id = ?", (user_id,))
-            user = cursor.fetchone()
-            
-            if not user:
-                conn.rollback()
-                conn.close()
-                return None
+            conn = self._connect()
             
+            with conn:
+                # Insert new session
+                conn.execute(
+                    "INSERT INTO sessions (user_id, token, expires_at) VALUES (?, ?, ?)",
+                    (user_id, token, expires_at)
+                )
+                
+                # Get user info
+                user = conn.execute("SELECT email, fullname FROM users WHERE id = ?", (user_id,)).fetchone()
+                
+                if not user:
+                    conn.rollback()
+                    return None
+                
+                # Evict the user's oldest sessions beyond the per-user cap
+                evicted = []
+                if self.max_sessions_per_user > 0:
+                    evicted = [row[0] for row in conn.execute(
+                        "SELECT token FROM sessions WHERE user_id = ? ORDER BY id DESC LIMIT -1 OFFSET ?",
+                        (user_id, self.max_sessions_per_user)
+                    )]
+                    if evicted:
+                        self._delete_tokens(conn, evicted)
+            
+            self._forget_tokens(evicted)
+            if evicted:
+                logger.info(f"Evicted {len(evicted)} old sessions of user {user_id}")
+                if metrics.enabled:
+                    metrics.increment("sessions_evicted_total", len(evicted))
             email, fullname = user
             
-            conn.commit()
-            conn.close()
-            
             return {
                 "user_id": user_id,
                 "email": email,
@@ -263,12 +410,17 @@ class Database:
         Returns:
             Session data if valid, None otherwise
         """
+        key = self._token_key(token)
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            if self.session_cache is not None:
+                self._sync_revocations()
+                data = self._cached_session(key)
+                if data is not None:
+                    return data
+            deletions = self._deletions
             
             # Get session data
-            cursor.execute(
+            session = self._connect().execute(
                 """
                 SELECT s.id, s.user_id, s.expires_at, u.email, u.fullname
                 FROM sessions s
@@ -276,10 +428,7 @@ class Database:
                 WHERE s.token = ?
                 """, 
                 (token,)
-            )
-            
-            session = cursor.fetchone()
-            conn.close()
+            ).fetchone()
             
             if not session:
                 return None
@@ -287,11 +436,12 @@ class Database:
             session_id, user_id, expires_at, email, fullname = session
             
             # Check if session is expired
-            if datetime.fromisoformat(expires_at) < datetime.now():
+            expires_ts = datetime.fromisoformat(expires_at).timestamp()
+            if expires_ts < time.time():
                 self._delete_session(token)
                 return None
             
-            return {
+            data = {
                 "session_id": session_id,
                 "user_id": user_id,
                 "email": email,
@@ -299,10 +449,59 @@ class Database:
                 "expires": expires_at
             }
             
+            # Cache until the next cache expiry or the session expiry, whichever comes first
+            if self.session_cache is not None and deletions == self._deletions:
+                ttl = min(self.session_cache.default_ttl, expires_ts - time.time())
+                self.session_cache.set(key, (data, expires_ts), ttl=ttl)
+            
+            return dict(data)
+            
         except sqlite3.Error as e:
             logger.error(f"Database error verifying session: {e}")
             return None
     
+    def _cached_session(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get an unexpired session from the cache by token hash, or None"""
+        cached = self.session_cache.get(key)
+        if cached is MISSING:
+            return None
+        data, expires_ts = cached
+        if expires_ts > time.time():
+            return dict(data)
+        self.session_cache.pop(key)
+        return None
+    
+    def cached_session(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        Verify a session token from the cache alone, without any database access
+        
+        Args:
+            token: Session token
+            
+        Returns:
+            Session data if cached and valid; None if the database has to be asked
+            (not cached, or revocations by other processes are due to be checked)
+        """
+        if self.session_cache is None or self._revocations_due():
+            return None
+        return self._cached_session(self._token_key(token))
+    
+    def _delete_tokens(self, conn: sqlite3.Connection, tokens: List[str]) -> None:
+        """Delete sessions within the caller's transaction and record their revocation for other processes"""
+        self._deletions += 1
+        conn.executemany("DELETE FROM sessions WHERE token = ?", [(token,) for token in tokens])
+        if self.revocation_interval > 0:
+            conn.executemany(
+                "INSERT INTO session_revocations (token_hash) VALUES (?)",
+                [(self._token_key(token),) for token in tokens]
+            )
+    
+    def _forget_tokens(self, tokens: List[str]) -> None:
+        """Drop deleted sessions from this process's cache (after their deletion is committed)"""
+        if self.session_cache is not None:
+            for token in tokens:
+                self.session_cache.pop(self._token_key(token))
+    
     def _delete_session(self, token: str) -> bool:
         """
         Delete a session
@@ -314,14 +513,12 @@ class Database:
             Success status
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            conn = self._connect()
             
-            cursor.execute("DELETE FROM sessions WHERE token = ?", (token,))
-            
-            conn.commit()
-            conn.close()
+            with conn:
+                self._delete_tokens(conn, [token])
             
+            self._forget_tokens([token])
             return True
             
         except sqlite3.Error as e:
@@ -340,29 +537,284 @@ class Database:
         """
         return self._delete_session(token)
     
-    # Cleanup expired sessions periodically
-    def cleanup_expired_sessions(self) -> int:
+    def _delete_expired_batch(self, batch_size: int) -> int:
         """
-        Clean up expired sessions
+        Delete up to batch_size expired sessions in one short transaction
         
+        Args:
+            batch_size: Maximum number of sessions to delete
+            
         Returns:
             Number of sessions removed
         """
+        conn = self._connect()
+        
+        # expires_at is stored by the sqlite3 datetime adapter in local time, so compare in the same format
+        with conn:
+            return conn.execute(
+                """
+                DELETE FROM sessions WHERE id IN (
+                    SELECT id FROM sessions WHERE expires_at < ? LIMIT ?
+                )
+                """,
+                (datetime.now().isoformat(" "), batch_size)
+            ).rowcount
+    
+    def _prune_revocations(self) -> None:
+        """Delete revocations older than any cache entry they could concern"""
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "DELETE FROM session_revocations WHERE revoked_at < datetime('now', ?)",
+                (f"-{int(settings.SESSION_CACHE_TTL) + 60} seconds",)
+            )
+    
+    def session_count(self) -> int:
+        """
+        Count the stored sessions (expired ones included until they are swept)
+        
+        Returns:
+            Number of rows in the sessions table, or 0 on error
+        """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            return self._connect().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        except sqlite3.Error as e:
+            logger.error(f"Database error counting sessions: {e}")
+            return 0
+    
+    # Cleanup expired sessions periodically
+    def cleanup_expired_sessions(self, batch_size: Optional[int] = None) -> int:
+        """
+        Clean up expired sessions, in batches so that the write lock is only held briefly
+        
+        Args:
+            batch_size: Sessions deleted per transaction (default: from settings)
             
-            cursor.execute("DELETE FROM sessions WHERE expires_at < CURRENT_TIMESTAMP")
-            removed = cursor.rowcount
+        Returns:
+            Number of sessions removed
+        """
+        batch_size = batch_size or settings.SESSION_SWEEP_BATCH
+        removed = 0
+        try:
+            while True:
+                deleted = self._delete_expired_batch(batch_size)
+                removed += deleted
+                if deleted < batch_size:
+                    break
             
-            conn.commit()
-            conn.close()
+            self._prune_revocations()
+            return removed
             
+        except sqlite3.Error as e:
+            logger.error(f"Database error cleaning up sessions: {e}")
             return removed
+
+def _reset_after_fork() -> None:
+    """Drop connections inherited by a forked child; SQLite connections must not cross a fork."""
+    for instance in list(_instances):
+        instance._reset_after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+class AsyncDatabase:
+    """
+    Awaitable interface to a Database for async request handlers.
+    
+    Queries run on a dedicated thread pool, each thread with its own
+    persistent connection, and password hashing runs on the shared hashing
+    pool, so the event loop never waits for SQLite or PBKDF2. Sessions found
+    in the session cache are returned without leaving the event loop.
+    """
+    
+    def __init__(self, database: Database, workers: Optional[int] = None):
+        """
+        Initialize the interface. Threads start with the first query.
+        
+        Args:
+            database: Database to run the queries on
+            workers: Number of query threads (default: from settings)
+        """
+        self.database = database
+        self.workers = workers or settings.DATABASE_WORKERS
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        _instances.add(self)
+    
+    def _reset_after_fork(self) -> None:
+        """Forget the pool inherited from the parent process; its threads do not exist here"""
+        self._executor = None
+        self._lock = threading.Lock()
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Get the query pool, starting a new one on first use or after close()"""
+        executor = self._executor
+        if executor is None:
+            with self._lock:
+                executor = self._executor
+                if executor is None:
+                    executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="database")
+                    self._executor = executor
+        return executor
+    
+    async def _run(self, func, *args):
+        """Run a blocking database call on the query threads"""
+        return await asyncio.wrap_future(self._get_executor().submit(func, *args))
+    
+    async def verify_session(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        Verify a session token
+        
+        Args:
+            token: Session token
+            
+        Returns:
+            Session data if valid, None otherwise
+        """
+        data = self.database.cached_session(token)
+        if data is not None:
+            return data
+        return await self._run(self.database.verify_session, token)
+    
+    async def create_session(self, user_id: int, expires_in: int = 86400) -> Optional[Dict[str, Any]]:
+        """
+        Create a new session token for a user
+        
+        Args:
+            user_id: User's ID
+            expires_in: Session lifetime in seconds (default: 24 hours)
+            
+        Returns:
+            Session data if successful, None otherwise
+        """
+        return await self._run(self.database.create_session, user_id, expires_in)
+    
+    async def create_user(self, email: str, fullname: str, password: str) -> Optional[int]:
+        """
+        Create a new user
+        
+        Args:
+            email: User's email
+            fullname: User's full name
+            password: User's plain text password
+            
+        Returns:
+            The new user's ID, or None if the user exists or on error
+            
+        Raises:
+            PasswordHasherBusy: If too many passwords are waiting to be hashed
+        """
+        try:
+            if await self._run(self.database._user_exists, email):
+                logger.warning(f"Attempted to create duplicate user: {email}")
+                return None
+            
+            password_hash, salt = await get_hasher().hash(password)
+            return await self._run(self.database._insert_user, email, fullname, password_hash, salt)
+            
+        except sqlite3.Error as e:
+            logger.error(f"Database error creating user: {e}")
+            return None
+    
+    async def verify_user(self, email: str, password: str) -> Optional[dict]:
+        """
+        Verify a user's credentials
+        
+        Args:
+            email: User's email
+            password: User's plain text password
+            
+        Returns:
+            User data if valid, None otherwise
+            
+        Raises:
+            PasswordHasherBusy: If too many passwords are waiting to be hashed
+        """
+        try:
+            user = await self._run(self.database._get_credentials, email)
+            if not user or not await get_hasher().verify(password, user[4], user[3]):
+                return None
+            
+            return await self._run(self.database._record_login, user)
+            
+        except sqlite3.Error as e:
+            logger.error(f"Database error verifying user: {e}")
+            return None
+    
+    async def logout(self, token: str) -> bool:
+        """
+        Log out a user by invalidating their session
+        
+        Args:
+            token: Session token
+            
+        Returns:
+            Success status
+        """
+        return await self._run(self.database.logout, token)
+    
+    async def cleanup_expired_sessions(self, batch_size: Optional[int] = None) -> int:
+        """
+        Clean up expired sessions in small batches, pausing between them so that
+        logins and logouts are not held up behind the sweep
+        
+        Args:
+            batch_size: Sessions deleted per transaction (default: from settings)
+            
+        Returns:
+            Number of sessions removed
+        """
+        batch_size = batch_size or settings.SESSION_SWEEP_BATCH
+        started = time.perf_counter()
+        removed = 0
+        try:
+            while True:
+                deleted = await self._run(self.database._delete_expired_batch, batch_size)
+                removed += deleted
+                if deleted < batch_size:
+                    break
+                await asyncio.sleep(SWEEP_PAUSE)
+            
+            await self._run(self.database._prune_revocations)
             
         except sqlite3.Error as e:
             logger.error(f"Database error cleaning up sessions: {e}")
-            return 0
+        
+        if metrics.enabled:
+            metrics.observe("session_sweep_seconds", time.perf_counter() - started)
+            metrics.increment("sessions_expired_total", removed)
+            metrics.set_gauge("sessions", await self._run(self.database.session_count))
+        return removed
+    
+    async def sweep_sessions(self, interval: Optional[float] = None) -> None:
+        """
+        Delete expired sessions periodically until cancelled
+        
+        Args:
+            interval: Seconds between sweeps (default: from settings)
+        """
+        interval = interval or settings.SESSION_SWEEP_INTERVAL
+        while True:
+            await asyncio.sleep(interval)
+            removed = await self.cleanup_expired_sessions()
+            if removed:
+                logger.info(f"Removed {removed} expired sessions")
+    
+    def close(self) -> None:
+        """
+        Wait for running queries, stop the threads and close the connections.
+        
+        The interface stays usable: the next query starts a new pool.
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        self.database.close()
 
 # Create a singleton instance
 db = Database()
+
+# Awaitable interface to it for the API server
+async_db = AsyncDatabase(db)
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+CyberGuard AI - Reputation Enrichment Queue
+This module runs VirusTotal URL lookups in background worker threads,
+ordered by priority and kept within a per-API-key rate limit.
+"""
+
+import os
+import sys
+import time
+import heapq
+import logging
+import itertools
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+# Add parent directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import settings
+from utils.rate_limit import TokenBucket
+from utils.metrics import metrics
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Job priorities (lower runs first)
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+
+class _Job:
+    """URL lookups waiting in the queue."""
+
+    __slots__ = ("client", "urls", "results", "missing", "future", "queued_at")
+
+    def __init__(self, client, urls: List[str], results: List[Optional[Dict]], missing: List[int]):
+        self.client = client
+        self.urls = urls
+        self.results = results
+        self.missing = missing
+        self.future: Future = Future()
+        self.queued_at = time.monotonic()
+
+
+class EnrichmentQueue:
+    """
+    Priority queue of VirusTotal lookups served by background threads.
+
+    Each submitted batch of URLs resolves a Future with one result per URL.
+    URLs with a cached verdict are answered at once; the rest wait until
+    their API key's token bucket allows the lookups. The jobs of an API key
+    run in priority order, so interactive requests overtake batch jobs and a
+    large job is not starved by smaller ones queued after it, while a
+    rate-limited API key does not hold up jobs for other keys.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        rate_per_minute: Optional[float] = None,
+        burst: Optional[float] = None,
+        deadline: Optional[float] = None,
+        max_pending: Optional[int] = None
+    ):
+        """
+        Initialize the queue. Worker threads start with the first job.
+
+        Args:
+            workers: Number of worker threads
+            rate_per_minute: URL lookups allowed per minute and API key
+            burst: Lookups allowed in a burst per API key
+            deadline: Time budget in seconds for the lookups of one job
+            max_pending: Maximum number of queued jobs; further jobs are
+                answered with a "skipped" status for uncached URLs
+        """
+        self.workers = workers or settings.ENRICHMENT_WORKERS
+        self.rate = (rate_per_minute or settings.VIRUSTOTAL_RATE_LIMIT) / 60.0
+        self.burst = burst or settings.VIRUSTOTAL_BURST
+        self.deadline = settings.VIRUSTOTAL_DEADLINE if deadline is None else deadline
+        self.max_pending = max_pending or settings.ENRICHMENT_QUEUE_SIZE
+
+        self._jobs: List = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._threads: List[threading.Thread] = []
+        self._closed = False
+
+    def _bucket(self, api_key: str) -> TokenBucket:
+        """Get the token bucket of an API key (condition lock held)."""
+        bucket = self._buckets.get(api_key)
+        if bucket is None:
+            bucket = self._buckets[api_key] = TokenBucket(self.rate, self.burst)
+        return bucket
+
+    def _start_workers(self) -> None:
+        """Start the worker threads (condition lock held)."""
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(
+                target=self._work, name=f"enrichment-{len(self._threads)}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, client, urls: List[str], priority: int = PRIORITY_INTERACTIVE) -> Future:
+        """
+        Queue URL lookups.
+
+        Args:
+            client: VirusTotalClient to look the URLs up with
+            urls: URLs to look up
+            priority: Job priority (PRIORITY_INTERACTIVE or PRIORITY_BATCH)
+
+        Returns:
+            Future resolving to one scan result per URL, in order
+        """
+        urls = list(urls)
+        results = client.cached_results(urls)
+        missing = [index for index, result in enumerate(results) if result is None]
+        job = _Job(client, urls, results, missing)
+        if not missing:
+            job.future.set_result(results)
+            return job.future
+
+        with self._condition:
+            if self._closed or len(self._jobs) >= self.max_pending:
+                logger.warning("Enrichment queue full, skipping URL lookups")
+                for index in missing:
+                    results[index] = {"status": "skipped", "message": "Lookup queue full", "url": urls[index]}
+                job.future.set_result(results)
+                return job.future
+
+            heapq.heappush(self._jobs, (priority, next(self._sequence), job))
+            self._start_workers()
+            self._condition.notify()
+        return job.future
+
+    def _take(self) -> Optional[_Job]:
+        """Wait for the first queued job of an API key once that key has tokens for it."""
+        with self._condition:
+            while not self._closed:
+                wait = None
+                blocked = set()
+                for entry in sorted(self._jobs):
+                    job = entry[2]
+                    api_key = job.client.api_key
+                    if api_key in blocked:
+                        # Smaller jobs behind it must not take the tokens it is waiting for
+                        continue
+                    delay = self._bucket(api_key).try_acquire(len(job.missing))
+                    if delay == 0:
+                        self._jobs.remove(entry)
+                        heapq.heapify(self._jobs)
+                        return job
+                    blocked.add(api_key)
+                    wait = delay if wait is None else min(wait, delay)
+                # Sleep until tokens are due or a new job arrives
+                self._condition.wait(wait)
+            return None
+
+    def _work(self) -> None:
+        """Worker thread: run jobs until the queue is closed."""
+        while True:
+            job = self._take()
+            if job is None:
+                return
+            try:
+                self._run(job)
+            except Exception as e:
+                logger.error(f"Error enriching URLs: {e}")
+                if not job.future.done():
+                    job.future.set_exception(e)
+
+    def _run(self, job: _Job) -> None:
+        """Look up the uncached URLs of a job and resolve its future."""
+        if metrics.enabled:
+            metrics.observe("enrichment_wait_seconds", time.monotonic() - job.queued_at)
+        client = job.client
+        urls = [job.urls[index] for index in job.missing]
+
+        # Another job may have looked some of these up while this one waited
+        cached = client.cached_results(urls)
+        fresh = [url for url, result in zip(urls, cached) if result is None]
+        unused = min(len(job.missing), self.burst) - min(len(fresh), self.burst)
+        if unused > 0:
+            with self._condition:
+                self._bucket(client.api_key).refund(unused)
+                self._condition.notify()
+
+        fetched = iter(client.scan_urls(fresh, deadline=self.deadline) if fresh else [])
+        for index, result in zip(job.missing, cached):
+            job.results[index] = result if result is not None else next(fetched)
+        job.future.set_result(job.results)
+
+    def pending(self) -> int:
+        """Return the number of queued jobs."""
+        with self._condition:
+            return len(self._jobs)
+
+    def close(self) -> None:
+        """Stop the workers; queued jobs are answered with a "skipped" status."""
+        with self._condition:
+            self._closed = True
+            jobs, self._jobs = self._jobs, []
+            self._condition.notify_all()
+        for _, _, job in jobs:
+            for index in job.missing:
+                job.results[index] = {"status": "skipped", "message": "Queue closed", "url": job.urls[index]}
+            job.future.set_result(job.results)
+        for thread in self._threads:
+            thread.join()
+
+
+# Queue shared by all detectors in this process
+_shared_queue: Optional[EnrichmentQueue] = None
+_shared_lock = threading.Lock()
+
+
+def get_enrichment_queue() -> EnrichmentQueue:
+    """
+    Get the process-wide enrichment queue.
+
+    Sharing the queue means all sessions share one rate limit per API key.
+
+    Returns:
+        The shared enrichment queue
+    """
+    global _shared_queue
+    with _shared_lock:
+        if _shared_queue is None:
+            _shared_queue = EnrichmentQueue()
+        return _shared_queue
+
+
+def _reset_after_fork() -> None:
+    """Drop the queue inherited by a forked child; its worker threads do not exist there."""
+    global _shared_queue, _shared_lock
+    _shared_queue = None
+    _shared_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+CyberGuard AI - Metrics
+This module aggregates in-process latency histograms and counters for the
+detection pipeline and exports them as JSON or in the Prometheus text format.
+Recording can be switched on and off at runtime and costs next to nothing
+while it is off.
+"""
+
+import os
+import sys
+import time
+import bisect
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Add parent directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import settings
+
+# Histogram bucket upper bounds in seconds, from 10 microseconds to 10 seconds
+DEFAULT_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# Prefix of exported metric names
+PREFIX = "cyberguard_"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram of observed values.
+
+    Observations are not locked, to keep them cheap on the hot path; with
+    several threads recording at once an occasional observation may be
+    lost, which does not matter for latency statistics.
+    """
+
+    def __init__(self, bounds: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Initialize an empty histogram.
+
+        Args:
+            bounds: Sorted bucket upper bounds; larger values go to an overflow bucket
+        """
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """
+        Record a value.
+
+        Args:
+            value: Observed value
+        """
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, fraction: float) -> float:
+        """
+        Estimate a quantile as the upper bound of the bucket it falls in.
+
+        Args:
+            fraction: Quantile between 0 and 1
+
+        Returns:
+            Estimated value (the largest bound for the overflow bucket, 0 if empty)
+        """
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.bounds[-1]
+
+    def snapshot(self) -> Dict:
+        """
+        Get the current state.
+
+        Returns:
+            Dictionary with count, sum, p50/p99 estimates and cumulative bucket counts
+        """
+        counts = list(self.counts)
+        count, total = sum(counts), self.sum
+        cumulative, buckets = 0, {}
+        for bound, bucket in zip(self.bounds, counts):
+            cumulative += bucket
+            buckets[repr(bound)] = cumulative
+        buckets["+Inf"] = count
+        return {
+            "count": count,
+            "sum": total,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "buckets": buckets,
+        }
+
+
+class Stopwatch:
+    """Records the time between successive laps of one operation into a histogram."""
+
+    __slots__ = ("_metrics", "_name", "_started", "_last")
+
+    def __init__(self, metrics: "Metrics", name: str):
+        self._metrics = metrics
+        self._name = name
+        self._started = self._last = time.perf_counter()
+
+    def lap(self, stage: str) -> None:
+        """Record the time since the previous lap (or the start) as ``stage``."""
+        now = time.perf_counter()
+        self._metrics.stage_histogram(self._name, stage).observe(now - self._last)
+        self._last = now
+
+    def total(self) -> None:
+        """Record the time since the start as stage "total"."""
+        self._metrics.stage_histogram(self._name, "total").observe(time.perf_counter() - self._started)
+
+
+class _NullStopwatch:
+    """Stopwatch handed out while recording is off."""
+
+    __slots__ = ()
+
+    def lap(self, stage: str) -> None:
+        pass
+
+    def total(self) -> None:
+        pass
+
+
+_NULL_STOPWATCH = _NullStopwatch()
+
+
+class Metrics:
+    """
+    Registry of labelled histograms, counters and gauges.
+
+    Call sites check ``enabled`` (a plain attribute) before measuring, or
+    use ``stopwatch``, which returns a no-op object while recording is off.
+    Collectors registered with ``add_collector`` are asked for their values
+    at export time only, so state that is already tracked elsewhere (such as
+    per-rule hit counts) costs nothing on the hot path.
+    """
+
+    def __init__(self, enabled: bool = False):
+        """
+        Initialize an empty registry.
+
+        Args:
+            enabled: Whether to record from the start
+        """
+        self.enabled = enabled
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._stages: Dict[Tuple[str, str], Histogram] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._gauges: Dict[Tuple[str, Labels], float] = {}
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[bool], None]] = []
+        self._collectors: List[Callable[[], List[Tuple[str, Dict[str, str], float]]]] = []
+
+    def set_enabled(self, enabled: bool) -> None:
+        """
+        Switch recording on or off and notify the listeners.
+
+        Args:
+            enabled: Whether to record
+        """
+        self.enabled = bool(enabled)
+        for listener in list(self._listeners):
+            listener(self.enabled)
+
+    def add_listener(self, listener: Callable[[bool], None]) -> None:
+        """Register a function called with the new state whenever recording is switched."""
+        self._listeners.append(listener)
+
+    def add_collector(self, collector: Callable[[], List[Tuple[str, Dict[str, str], float]]]) -> None:
+        """Register a function returning (name, labels, value) counters at export time."""
+        self._collectors.append(collector)
+
+    def stopwatch(self, name: str):
+        """
+        Start timing an operation whose stages are recorded into histogram ``name``.
+
+        Args:
+            name: Histogram name; each lap is labelled with its stage
+
+        Returns:
+            A Stopwatch, or a no-op stand-in while recording is off
+        """
+        if not self.enabled:
+            return _NULL_STOPWATCH
+        return Stopwatch(self, name)
+
+    def histogram(self, name: str, labels: Optional[Dict[str, str]] = None) -> Histogram:
+        """
+        Get a histogram series, creating it on first use.
+
+        Args:
+            name: Histogram name
+            labels: Label values distinguishing series of the same name (optional)
+
+        Returns:
+            The histogram
+        """
+        key = (name, tuple(sorted(labels.items())) if labels else ())
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram())
+        return histogram
+
+    def stage_histogram(self, name: str, stage: str) -> Histogram:
+        """Get the series of histogram ``name`` labelled with ``stage``, looked up in one step."""
+        histogram = self._stages.get((name, stage))
+        if histogram is None:
+            histogram = self._stages[(name, stage)] = self.histogram(name, {"stage": stage})
+        return histogram
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, str]] = None) -> None:
+        """
+        Record a value in a histogram.
+
+        Args:
+            name: Histogram name
+            value: Observed value (seconds for latencies)
+            labels: Label values distinguishing series of the same name (optional)
+        """
+        self.histogram(name, labels).observe(value)
+
+    def increment(self, name: str, amount: float = 1, labels: Optional[Dict[str, str]] = None) -> None:
+        """
+        Add to a counter.
+
+        Args:
+            name: Counter name
+            amount: Amount to add
+            labels: Label values distinguishing series of the same name (optional)
+        """
+        key = (name, tuple(sorted(labels.items())) if labels else ())
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set_gauge(self, name: str, value: float, labels: Optional[Dict[str, str]] = None) -> None:
+        """
+        Set a value that can go up and down, such as a table size.
+
+        Args:
+            name: Gauge name
+            value: Current value
+            labels: Label values distinguishing series of the same name (optional)
+        """
+        key = (name, tuple(sorted(labels.items())) if labels else ())
+        with self._lock:
+            self._gauges[key] = value
+
+    def reset(self) -> None:
+        """Drop every recorded value."""
+        with self._lock:
+            self._histograms.clear()
+            self._stages.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+    def _collected(self) -> Dict[Tuple[str, Labels], float]:
+        """Counters recorded here plus those reported by the collectors."""
+        with self._lock:
+            counters = dict(self._counters)
+        for collector in self._collectors:
+            for name, labels, value in collector():
+                counters[(name, tuple(sorted(labels.items())))] = value
+        return counters
+
+    def snapshot(self) -> Dict:
+        """
+        Get every histogram, counter and gauge.
+
+        Returns:
+            Dictionary with the recording state, histograms, counters and gauges;
+            series are keyed by name followed by their labels, as in Prometheus
+        """
+        with self._lock:
+            histograms = list(self._histograms.items())
+            gauges = sorted(self._gauges.items())
+        return {
+            "enabled": self.enabled,
+            "histograms": {_series(name, labels): histogram.snapshot() for (name, labels), histogram in sorted(histograms)},
+            "counters": {_series(name, labels): value for (name, labels), value in sorted(self._collected().items())},
+            "gauges": {_series(name, labels): value for (name, labels), value in gauges},
+        }
+
+    def prometheus(self) -> str:
+        """
+        Export every histogram, counter and gauge in the Prometheus text format.
+
+        Returns:
+            Exposition text
+        """
+        lines: List[str] = []
+        typed = set()
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            gauges = sorted(self._gauges.items())
+        for (name, labels), histogram in histograms:
+            metric = PREFIX + name
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} histogram")
+            state = histogram.snapshot()
+            for bound, count in state["buckets"].items():
+                lines.append(f"{_series(metric + '_bucket', labels + (('le', bound),))} {count}")
+            lines.append(f"{_series(metric + '_sum', labels)} {state['sum']!r}")
+            lines.append(f"{_series(metric + '_count', labels)} {state['count']}")
+        for (name, labels), value in sorted(self._collected().items()):
+            metric = PREFIX + name
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{_series(metric, labels)} {value!r}")
+        for (name, labels), value in gauges:
+            metric = PREFIX + name
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{_series(metric, labels)} {value!r}")
+        return "\n".join(lines) + "\n"
+
+
+def _series(name: str, labels: Labels) -> str:
+    """Format a series name with its labels."""
+    if not labels:
+        return name
+    escaped = ",".join(
+        '{}="{}"'.format(key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels
+    )
+    return f"{name}{{{escaped}}}"
+
+
+# Registry shared by the whole process
+metrics = Metrics(settings.METRICS_ENABLED)
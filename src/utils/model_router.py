@@ -0,0 +1,540 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+CyberGuard AI - Model Router
+This module routes chat completions across a chain of OpenRouter models,
+tracking the latency and error rate of each model, opening a circuit
+breaker on a failing model and optionally hedging slow requests.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+# Add parent directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import settings
+from utils.metrics import metrics
+from utils.openrouter_client import OpenRouterClient, OpenRouterError, get_openrouter_client
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Circuit breaker states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def is_model_failure(error: OpenRouterError) -> bool:
+    """
+    Tell whether an error says the model is unavailable rather than the request invalid.
+
+    Timeouts, connection errors, rate limiting, unknown models and server errors
+    are worth retrying on another model; a rejected request or API key is not.
+
+    Args:
+        error: Error raised by the client
+
+    Returns:
+        Whether the error counts against the model
+    """
+    return error.status is None or error.status in (404, 408, 429) or error.status >= 500
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker of one model.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and the
+    model is skipped. Once ``reset_timeout`` seconds have passed, a single
+    probe request is let through (half open); its success closes the breaker
+    and its failure opens it again. A probe that never reports back (e.g. it
+    was cancelled) is replaced after another ``reset_timeout``. Callers hold
+    the router's lock.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        """
+        Initialize a closed breaker.
+
+        Args:
+            failure_threshold: Consecutive failures that open the breaker
+            reset_timeout: Seconds the breaker stays open before a probe
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.trips = 0
+        self._opened_at = 0.0
+
+    def allow(self) -> bool:
+        """
+        Decide whether a request may be sent, taking the probe slot when half open.
+
+        Returns:
+            Whether to send the request
+        """
+        if self.state == CLOSED:
+            return True
+        now = time.monotonic()
+        if now - self._opened_at >= self.reset_timeout:
+            self.state = HALF_OPEN
+            self._opened_at = now
+            return True
+        return False
+
+    def available(self) -> bool:
+        """Tell whether the breaker is closed, without taking a probe slot."""
+        return self.state == CLOSED
+
+    def record_success(self) -> None:
+        """Close the breaker after a successful request."""
+        self.state = CLOSED
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        """Count a failed request, opening the breaker at the threshold or after a failed probe."""
+        self.failures += 1
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+            self.state = OPEN
+            self.trips += 1
+            self._opened_at = time.monotonic()
+
+
+class ModelHealth:
+    """Rolling latency and error statistics of one model, with its circuit breaker."""
+
+    def __init__(self, window: int, failure_threshold: int, reset_timeout: float):
+        """
+        Initialize empty statistics.
+
+        Args:
+            window: Number of recent requests kept
+            failure_threshold: Consecutive failures that open the breaker
+            reset_timeout: Seconds the breaker stays open before a probe
+        """
+        self.latencies: deque = deque(maxlen=window)
+        self.outcomes: deque = deque(maxlen=window)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.requests = 0
+
+    def quantile(self, fraction: float) -> Optional[float]:
+        """Latency quantile of the recent successful requests (None without samples)."""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+    def error_rate(self) -> float:
+        """Fraction of the recent requests that failed."""
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def snapshot(self) -> Dict:
+        """Current statistics as a dictionary."""
+        p50, p95 = self.quantile(0.50), self.quantile(0.95)
+        return {
+            "state": self.breaker.state,
+            "requests": self.requests,
+            "error_rate": round(self.error_rate(), 3),
+            "p50_ms": None if p50 is None else round(p50 * 1e3, 1),
+            "p95_ms": None if p95 is None else round(p95 * 1e3, 1),
+            "trips": self.breaker.trips
+        }
+
+
+class ModelRouter:
+    """
+    Sends each completion to the first healthy model of a fallback chain.
+
+    The chain is the requested model followed by the configured fallback
+    models. A model whose circuit breaker is open is skipped; a model that
+    fails with a model failure (see is_model_failure) makes the request move
+    on to the next model. With hedging enabled, a request still running
+    after the model's recent p95 latency (at least ``hedge_min_delay``) is
+    duplicated to the next healthy model in the chain, or to the same model
+    if there is none, and the first reply wins.
+
+    Streamed completions fall back only until the first piece of text has
+    been sent; they are not hedged.
+    """
+
+    def __init__(
+        self,
+        client: OpenRouterClient,
+        fallback_models: Optional[List[str]] = None,
+        hedge: Optional[bool] = None,
+        hedge_min_delay: Optional[float] = None,
+        hedge_min_samples: Optional[int] = None,
+        window: Optional[int] = None,
+        failure_threshold: Optional[int] = None,
+        reset_timeout: Optional[float] = None
+    ):
+        """
+        Initialize the router.
+
+        Args:
+            client: Client sending the completions
+            fallback_models: Models tried in order when the requested one fails (default: from settings)
+            hedge: Whether to hedge slow requests (default: from settings)
+            hedge_min_delay: Minimum seconds before a request is hedged
+            hedge_min_samples: Successful requests of a model needed before its requests are hedged
+            window: Number of recent requests kept per model
+            failure_threshold: Consecutive failures that open a model's breaker
+            reset_timeout: Seconds a breaker stays open before a probe request
+        """
+        self.client = client
+        self.fallback_models = list(settings.OPENROUTER_FALLBACK_MODELS if fallback_models is None else fallback_models)
+        self.hedge = settings.OPENROUTER_HEDGE if hedge is None else hedge
+        self.hedge_min_delay = settings.OPENROUTER_HEDGE_MIN_DELAY if hedge_min_delay is None else hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples or settings.OPENROUTER_HEDGE_MIN_SAMPLES
+        self.window = window or settings.OPENROUTER_ROUTER_WINDOW
+        self.failure_threshold = failure_threshold or settings.OPENROUTER_BREAKER_FAILURES
+        self.reset_timeout = settings.OPENROUTER_BREAKER_RESET if reset_timeout is None else reset_timeout
+
+        self._health: Dict[str, ModelHealth] = {}
+        self._lock = threading.Lock()
+        self.fallbacks = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def chain(self, model: str) -> List[str]:
+        """
+        Get the models tried for a request, in order.
+
+        Args:
+            model: Requested model
+
+        Returns:
+            The requested model followed by the fallback models
+        """
+        return [model] + [fallback for fallback in self.fallback_models if fallback != model]
+
+    def _get_health(self, model: str) -> ModelHealth:
+        """Return the statistics of a model, creating them on first use (lock held)."""
+        health = self._health.get(model)
+        if health is None:
+            health = self._health[model] = ModelHealth(self.window, self.failure_threshold, self.reset_timeout)
+        return health
+
+    def _allow(self, model: str) -> bool:
+        """Tell whether a request may be sent to a model."""
+        with self._lock:
+            return self._get_health(model).breaker.allow()
+
+    def _record(self, model: str, latency: Optional[float], error: Optional[OpenRouterError] = None) -> None:
+        """
+        Record the outcome of a request.
+
+        Args:
+            model: Model the request was sent to
+            latency: Seconds until the reply (None if unknown, e.g. for streams)
+            error: The error if the request failed
+        """
+        if error is not None and not is_model_failure(error):
+            # The model answered, the request itself was refused
+            with self._lock:
+                self._get_health(model).breaker.record_success()
+            return
+        with self._lock:
+            health = self._get_health(model)
+            health.requests += 1
+            health.outcomes.append(error is None)
+            if error is None:
+                if latency is not None:
+                    health.latencies.append(latency)
+                health.breaker.record_success()
+            else:
+                was_open = health.breaker.state == OPEN
+                health.breaker.record_failure()
+                if not was_open and health.breaker.state == OPEN:
+                    logger.warning(f"Circuit opened for model {model} after {health.breaker.failures} failures")
+            state = health.breaker.state
+
+        if metrics.enabled:
+            metrics.increment("model_requests_total", labels={"model": model, "outcome": "ok" if error is None else "error"})
+            if latency is not None and error is None:
+                metrics.observe("model_latency_seconds", latency, {"model": model})
+            metrics.set_gauge("model_circuit_open", 0 if state == CLOSED else 1, {"model": model})
+
+    def _hedge_delay(self, model: str) -> Optional[float]:
+        """Seconds after which a request to a model is hedged (None: do not hedge)."""
+        if not self.hedge:
+            return None
+        with self._lock:
+            health = self._get_health(model)
+            if len(health.latencies) < self.hedge_min_samples:
+                return None
+            return max(self.hedge_min_delay, health.quantile(0.95))
+
+    def _hedge_target(self, model: str, chain: List[str]) -> str:
+        """Model receiving the duplicate of a slow request: the next healthy one after ``model``."""
+        with self._lock:
+            for candidate in chain[chain.index(model) + 1:]:
+                if self._get_health(candidate).breaker.available():
+                    return candidate
+        return model
+
+    def _note(self, counter: str, model: str) -> None:
+        """Count a fallback or hedge."""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+        if metrics.enabled:
+            metrics.increment(f"model_{counter}_total", labels={"model": model})
+
+    @staticmethod
+    def _latency(outcome: Dict, started: float) -> Optional[float]:
+        """Latency of a reply, or None if it did not come from the model (cached or coalesced)."""
+        return time.perf_counter() - started if outcome.get("source") == "upstream" else None
+
+    async def _timed(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        temperature: float
+    ) -> Dict:
+        """Request a completion from one model and record the outcome."""
+        outcome: Dict = {}
+        started = time.perf_counter()
+        try:
+            result = await self.client.acomplete(messages, model, max_tokens, temperature, outcome)
+        except OpenRouterError as e:
+            self._record(model, None, e)
+            raise
+        self._record(model, self._latency(outcome, started))
+        return result
+
+    async def _attempt(
+        self,
+        model: str,
+        chain: List[str],
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        temperature: float
+    ) -> Tuple[str, Dict]:
+        """Request a completion from one model, hedging it if it is slow."""
+        primary = asyncio.ensure_future(self._timed(model, messages, max_tokens, temperature))
+        tasks = {primary: model}
+        try:
+            delay = self._hedge_delay(model)
+            if delay is not None:
+                await asyncio.wait({primary}, timeout=delay)
+            if delay is None or primary.done():
+                return model, await primary
+
+            target = self._hedge_target(model, chain)
+            self._note("hedges", target)
+            hedge = asyncio.ensure_future(self._timed(target, messages, max_tokens, temperature))
+            tasks[hedge] = target
+
+            pending, error = set(tasks), None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._note("hedge_wins", target)
+                        return tasks[task], task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # Cancel the slower request (or both if the caller gave up)
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def acomplete(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        max_tokens: int = 1024,
+        temperature: float = 0.7
+    ) -> Tuple[str, Dict]:
+        """
+        Request a chat completion from the first healthy model of the chain.
+
+        Args:
+            messages: Chat messages
+            model: Requested model
+            max_tokens: Maximum number of tokens to generate
+            temperature: Temperature for response generation
+
+        Returns:
+            Tuple of (model that answered, decoded completion response)
+
+        Raises:
+            OpenRouterError: If the request is invalid or no model could answer it
+        """
+        chain = self.chain(model)
+        last_error = None
+        for candidate in chain:
+            if not self._allow(candidate):
+                continue
+            if last_error is not None:
+                self._note("fallbacks", candidate)
+            try:
+                return await self._attempt(candidate, chain, messages, max_tokens, temperature)
+            except OpenRouterError as e:
+                if not is_model_failure(e):
+                    raise
+                logger.warning(f"Model {candidate} failed: {e}")
+                last_error = e
+        raise last_error or OpenRouterError("No model available: every circuit breaker is open", 503)
+
+    async def astream(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        max_tokens: int = 1024,
+        temperature: float = 0.7
+    ) -> AsyncIterator[Tuple[str, str]]:
+        """
+        Request a streamed chat completion from the first healthy model of the chain.
+
+        Args:
+            messages: Chat messages
+            model: Requested model
+            max_tokens: Maximum number of tokens to generate
+            temperature: Temperature for response generation
+
+        Yields:
+            Tuples of (model that answers, piece of the reply text)
+
+        Raises:
+            OpenRouterError: If the request is invalid, no model could answer it,
+                or the stream failed after text was sent
+        """
+        last_error = None
+        for candidate in self.chain(model):
+            if not self._allow(candidate):
+                continue
+            if last_error is not None:
+                self._note("fallbacks", candidate)
+            streamed = False
+            stream = self.client.astream(messages, candidate, max_tokens, temperature)
+            try:
+                async for delta in stream:
+                    streamed = True
+                    yield candidate, delta
+            except OpenRouterError as e:
+                self._record(candidate, None, e)
+                if streamed or not is_model_failure(e):
+                    raise
+                logger.warning(f"Model {candidate} failed: {e}")
+                last_error = e
+                continue
+            finally:
+                await stream.aclose()
+            self._record(candidate, None)
+            return
+        raise last_error or OpenRouterError("No model available: every circuit breaker is open", 503)
+
+    def complete(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        max_tokens: int = 1024,
+        temperature: float = 0.7
+    ) -> Tuple[str, Dict]:
+        """
+        Request a chat completion from synchronous code, falling back without hedging.
+
+        Args:
+            messages: Chat messages
+            model: Requested model
+            max_tokens: Maximum number of tokens to generate
+            temperature: Temperature for response generation
+
+        Returns:
+            Tuple of (model that answered, decoded completion response)
+
+        Raises:
+            OpenRouterError: If the request is invalid or no model could answer it
+        """
+        last_error = None
+        for candidate in self.chain(model):
+            if not self._allow(candidate):
+                continue
+            if last_error is not None:
+                self._note("fallbacks", candidate)
+            outcome: Dict = {}
+            started = time.perf_counter()
+            try:
+                result = self.client.complete(messages, candidate, max_tokens, temperature, outcome)
+            except OpenRouterError as e:
+                self._record(candidate, None, e)
+                if not is_model_failure(e):
+                    raise
+                logger.warning(f"Model {candidate} failed: {e}")
+                last_error = e
+                continue
+            self._record(candidate, self._latency(outcome, started))
+            return candidate, result
+        raise last_error or OpenRouterError("No model available: every circuit breaker is open", 503)
+
+    def stats(self) -> Dict:
+        """
+        Get routing statistics.
+
+        Returns:
+            Dictionary with the fallback chain, per-model health and fallback/hedge counts
+        """
+        with self._lock:
+            return {
+                "fallback_models": list(self.fallback_models),
+                "hedging": self.hedge,
+                "models": {model: health.snapshot() for model, health in sorted(self._health.items())},
+                "fallbacks": self.fallbacks,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins
+            }
+
+
+# Process-wide routers, one per API key
+_routers: Dict[str, ModelRouter] = {}
+_routers_lock = threading.Lock()
+
+
+def get_model_router(api_key: str) -> ModelRouter:
+    """
+    Get the shared router for an API key.
+
+    Sharing the router means every chat session sees the same model health,
+    so one session's failures spare the others a slow request.
+
+    Args:
+        api_key: OpenRouter API key
+
+    Returns:
+        The process-wide router for that key
+    """
+    with _routers_lock:
+        router = _routers.get(api_key)
+        if router is None:
+            router = _routers[api_key] = ModelRouter(get_openrouter_client(api_key))
+        return router
+
+
+def get_model_routers() -> List[ModelRouter]:
+    """Return the routers created in this process."""
+    with _routers_lock:
+        return list(_routers.values())
+
+
+def _reset_after_fork() -> None:
+    """Drop routers inherited by a forked child; their clients belong to the parent."""
+    global _routers_lock
+    _routers.clear()
+    _routers_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
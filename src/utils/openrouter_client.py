@@ -0,0 +1,566 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+CyberGuard AI - OpenRouter Client
+This module provides a pooled HTTP client for the OpenRouter chat
+completions API, with an async path for the API server and a synchronous
+path for the command line.
+"""
+
+import os
+import sys
+import json
+import asyncio
+import logging
+import threading
+import importlib.util
+import weakref
+from concurrent.futures import Future
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+# Add parent directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import settings
+from utils.completion_cache import CompletionCache, get_completion_cache
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# HTTP/2 needs the optional h2 package (pip install httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class OpenRouterError(Exception):
+    """Raised when a completion request fails."""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class OpenRouterClient:
+    """
+    Keep-alive, connection-pooled client for chat completions.
+
+    Async callers share one httpx connection pool per event loop (the API
+    server has one loop per worker), using HTTP/2 when h2 is installed.
+    At most ``max_concurrency`` completions run at once per loop; further
+    requests wait for a slot instead of opening more connections. Every
+    request has explicit connect and read timeouts. Synchronous callers
+    share a requests session with the same timeouts.
+
+    With a completion cache, cacheable (low temperature) requests are
+    answered from it when possible, and identical requests arriving while
+    one is in flight wait for that request instead of calling upstream again.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: Optional[str] = None,
+        max_connections: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        connect_timeout: Optional[float] = None,
+        read_timeout: Optional[float] = None,
+        http2: Optional[bool] = None,
+        cache: Optional[CompletionCache] = None
+    ):
+        """
+        Initialize the client. No connection is opened until the first request.
+
+        Args:
+            api_key: OpenRouter API key
+            base_url: API base URL (default: from settings, e.g. a local fake server)
+            max_connections: Size of the HTTP connection pool
+            max_concurrency: Maximum number of completions in flight
+            connect_timeout: Seconds allowed to establish a connection
+            read_timeout: Seconds allowed between bytes of the response
+            http2: Whether to use HTTP/2 (default: from settings, if h2 is installed)
+            cache: Completion cache shared with other clients (default: no caching)
+        """
+        self.api_key = api_key
+        self.base_url = (base_url or settings.OPENROUTER_API_URL).rstrip("/")
+        self.max_connections = max_connections or settings.OPENROUTER_MAX_CONNECTIONS
+        self.max_concurrency = max_concurrency or settings.OPENROUTER_MAX_CONCURRENCY
+        self.connect_timeout = connect_timeout or settings.OPENROUTER_CONNECT_TIMEOUT
+        self.read_timeout = read_timeout or settings.OPENROUTER_READ_TIMEOUT
+        self.http2 = (settings.OPENROUTER_HTTP2 if http2 is None else http2) and HTTP2_AVAILABLE
+
+        self.headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        # Connection pool and concurrency limit of each event loop using the client
+        self._pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Tuple[httpx.AsyncClient, asyncio.Semaphore]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._session: Optional[requests.Session] = None
+        self._lock = threading.Lock()
+
+        self.cache = cache
+        # Cacheable requests in flight, by cache key: futures of each event loop, futures of threads
+        self._flights: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Future]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._sync_flights: Dict[str, Future] = {}
+
+    def _pool(self) -> Tuple[httpx.AsyncClient, asyncio.Semaphore]:
+        """Return the HTTP client and semaphore of the running event loop, creating them on first use."""
+        loop = asyncio.get_running_loop()
+        pool = self._pools.get(loop)
+        if pool is None:
+            client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                http2=self.http2,
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                )
+            )
+            pool = self._pools[loop] = (client, asyncio.Semaphore(self.max_concurrency))
+        return pool
+
+    def _get_session(self) -> requests.Session:
+        """Return the pooled session of synchronous callers."""
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                session.headers.update(self.headers)
+                session.mount("https://", HTTPAdapter(pool_maxsize=self.max_connections))
+                session.mount("http://", HTTPAdapter(pool_maxsize=self.max_connections))
+                self._session = session
+        return self._session
+
+    @staticmethod
+    def _payload(messages: List[Dict[str, str]], model: str, max_tokens: int, temperature: float,
+                 stream: bool = False) -> Dict:
+        """Build the body of a completion request."""
+        payload = {
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        }
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    @staticmethod
+    def _parse(status: int, body: bytes, decode) -> Dict:
+        """
+        Check a completion response.
+
+        Args:
+            status: HTTP status code
+            body: Raw response body
+            decode: Function returning the decoded JSON body
+
+        Returns:
+            The decoded response
+
+        Raises:
+            OpenRouterError: On an error status or a malformed body
+        """
+        if status != 200:
+            error_info = {"error": f"Status code: {status}"}
+            if body:
+                try:
+                    decoded = decode()
+                    if isinstance(decoded, dict):
+                        error_info = decoded
+                except ValueError:
+                    pass
+            logger.error(f"OpenRouter API error: {error_info}")
+            error = error_info.get("error")
+            message = error.get("message", "Unknown error") if isinstance(error, dict) else "Unknown error"
+            raise OpenRouterError(message, status)
+        try:
+            return decode()
+        except ValueError as e:
+            raise OpenRouterError(f"Invalid response: {e}", status)
+
+    async def acomplete(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        max_tokens: int = 1024,
+        temperature: float = 0.7,
+        outcome: Optional[Dict] = None
+    ) -> Dict:
+        """
+        Request a chat completion without blocking the event loop.
+
+        Args:
+            messages: Chat messages
+            model: OpenRouter model name
+            max_tokens: Maximum number of tokens to generate
+            temperature: Temperature for response generation
+            outcome: Filled in with the "source" of the result: "upstream",
+                "cache" or "coalesced" (an identical request in flight) (optional)
+
+        Returns:
+            The decoded completion response
+
+        Raises:
+            OpenRouterError: If the request fails or times out
+        """
+        outcome = {} if outcome is None else outcome
+        outcome["source"] = "upstream"
+        key = self.cache.key(messages, model, max_tokens, temperature) if self.cache is not None else None
+        if key is None:
+            return await self._acomplete(messages, model, max_tokens, temperature)
+
+        result = self.cache.get(key)
+        if result is not None:
+            outcome["source"] = "cache"
+            return result
+
+        flights = self._flights.setdefault(asyncio.get_running_loop(), {})
+        result = await self._join(flights, key)
+        if result is not None:
+            outcome["source"] = "coalesced"
+            return result
+        flight = flights[key] = asyncio.ensure_future(
+            self._acomplete_and_store(key, messages, model, max_tokens, temperature)
+        )
+        flight.add_done_callback(lambda task: self._landed(flights, key, task))
+        # A caller that gives up (e.g. a closed connection) does not cancel the others' request
+        return await asyncio.shield(flight)
+
+    async def _join(self, flights: Dict[str, "asyncio.Future"], key: str) -> Optional[Dict]:
+        """
+        Wait for the result of an identical request in flight.
+
+        Args:
+            flights: Requests in flight on the running event loop
+            key: Cache key of the request
+
+        Returns:
+            The completion response, or None if no identical request is in
+            flight (or the stream that was is abandoned by its caller)
+
+        Raises:
+            OpenRouterError: If the request in flight fails
+        """
+        while True:
+            flight = flights.get(key)
+            if flight is None:
+                return None
+            try:
+                result = await asyncio.shield(flight)
+            except asyncio.CancelledError:
+                if not flight.cancelled():
+                    raise
+                if flights.get(key) is flight:
+                    del flights[key]
+                continue
+            self.cache.coalesced += 1
+            return result
+
+    async def _acomplete(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        max_tokens: int,
+        temperature: float
+    ) -> Dict:
+        """Send a completion request upstream."""
+        client, slots = self._pool()
+        async with slots:
+            try:
+                response = await client.post(
+                    "/chat/completions", json=self._payload(messages, model, max_tokens, temperature)
+                )
+            except httpx.TimeoutException as e:
+                raise OpenRouterError(f"Request timed out: {e.__class__.__name__}")
+            except httpx.HTTPError as e:
+                raise OpenRouterError(f"Connection error: {e}")
+        return self._parse(response.status_code, response.content, response.json)
+
+    async def _acomplete_and_store(
+        self,
+        key: str,
+        messages: List[Dict[str, str]],
+        model: str,
+        max_tokens: int,
+        temperature: float
+    ) -> Dict:
+        """Send a cacheable completion request upstream and cache its result."""
+        result = await self._acomplete(messages, model, max_tokens, temperature)
+        if result.get("choices"):
+            self.cache.set(key, result)
+        return result
+
+    @staticmethod
+    def _landed(flights: Dict[str, "asyncio.Future"], key: str, task: "asyncio.Future") -> None:
+        """Forget a finished request, so that the next identical one goes to the cache."""
+        if flights.get(key) is task:
+            del flights[key]
+        # Retrieve the error, which is not logged as unhandled if every waiter gave up
+        if not task.cancelled():
+            task.exception()
+
+    async def astream(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        max_tokens: int = 1024,
+        temperature: float = 0.7
+    ) -> AsyncIterator[str]:
+        """
+        Request a streamed chat completion and yield its text as it is generated.
+
+        The completion holds a concurrency slot until the stream ends or the
+        caller stops iterating. The read timeout applies between chunks.
+        Identical cacheable requests made while it streams wait for its reply
+        and get it as a single piece, as they would from the cache.
+
+        Args:
+            messages: Chat messages
+            model: OpenRouter model name
+            max_tokens: Maximum number of tokens to generate
+            temperature: Temperature for response generation
+
+        Yields:
+            Pieces of the reply text, in order
+
+        Raises:
+            OpenRouterError: If the request fails, times out or the stream reports an error
+        """
+        key = self.cache.key(messages, model, max_tokens, temperature) if self.cache is not None else None
+        flight = None
+        if key is not None:
+            # A cached or in-flight identical request is sent as a single piece
+            flights = self._flights.setdefault(asyncio.get_running_loop(), {})
+            result = self.cache.get(key)
+            if result is None:
+                result = await self._join(flights, key)
+            if result is not None:
+                content = result["choices"][0]["message"]["content"]
+                if content:
+                    yield content
+                return
+            # Identical requests made meanwhile wait for this stream's reply
+            flight = flights[key] = asyncio.get_running_loop().create_future()
+            flight.add_done_callback(lambda future: self._landed(flights, key, future))
+
+        parts = []
+        outcome: Dict = {}
+        stream = self._astream(messages, model, max_tokens, temperature, outcome)
+        try:
+            async for delta in stream:
+                parts.append(delta)
+                yield delta
+            if flight is not None:
+                result = {
+                    "object": "chat.completion",
+                    "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(parts)},
+                                 "finish_reason": outcome.get("finish_reason")}]
+                }
+                # A reply cut short (e.g. by max_tokens or a filter) is not cached
+                if parts and outcome.get("finish_reason") == "stop":
+                    self.cache.set(key, result)
+                flight.set_result(result)
+        except OpenRouterError as e:
+            if flight is not None:
+                flight.set_exception(e)
+            raise
+        finally:
+            # Release the connection at once if the caller stopped early
+            await stream.aclose()
+            if flight is not None and not flight.done():
+                # The caller stopped early; the waiting requests are sent on their own
+                flight.cancel()
+
+    async def _astream(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        outcome: Dict
+    ) -> AsyncIterator[str]:
+        """Send a streamed completion request upstream and yield its text; the finish reason is put in ``outcome``."""
+        client, slots = self._pool()
+        async with slots:
+            try:
+                async with client.stream(
+                    "POST", "/chat/completions",
+                    json=self._payload(messages, model, max_tokens, temperature, stream=True)
+                ) as response:
+                    if response.status_code != 200:
+                        body = await response.aread()
+                        self._parse(response.status_code, body, response.json)
+
+                    # Server-sent events: "data: {json}" lines, ":" comments as keep-alives
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[5:].strip()
+                        if data == "[DONE]":
+                            return
+                        try:
+                            chunk = json.loads(data)
+                        except ValueError as e:
+                            raise OpenRouterError(f"Invalid stream chunk: {e}", response.status_code)
+                        if "error" in chunk:
+                            error = chunk["error"]
+                            raise OpenRouterError(
+                                error.get("message", "Unknown error") if isinstance(error, dict) else str(error),
+                                response.status_code
+                            )
+                        choices = chunk.get("choices") or [{}]
+                        if choices[0].get("finish_reason"):
+                            outcome["finish_reason"] = choices[0]["finish_reason"]
+                        delta = (choices[0].get("delta") or {}).get("content")
+                        if delta:
+                            yield delta
+            except httpx.TimeoutException as e:
+                raise OpenRouterError(f"Request timed out: {e.__class__.__name__}")
+            except httpx.HTTPError as e:
+                raise OpenRouterError(f"Connection error: {e}")
+
+    def complete(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        max_tokens: int = 1024,
+        temperature: float = 0.7,
+        outcome: Optional[Dict] = None
+    ) -> Dict:
+        """
+        Request a chat completion from synchronous code.
+
+        Args:
+            messages: Chat messages
+            model: OpenRouter model name
+            max_tokens: Maximum number of tokens to generate
+            temperature: Temperature for response generation
+            outcome: Filled in with the "source" of the result: "upstream",
+                "cache" or "coalesced" (an identical request in flight) (optional)
+
+        Returns:
+            The decoded completion response
+
+        Raises:
+            OpenRouterError: If the request fails or times out
+        """
+        outcome = {} if outcome is None else outcome
+        outcome["source"] = "upstream"
+        key = self.cache.key(messages, model, max_tokens, temperature) if self.cache is not None else None
+        if key is None:
+            return self._complete(messages, model, max_tokens, temperature)
+
+        result = self.cache.get(key)
+        if result is not None:
+            outcome["source"] = "cache"
+            return result
+
+        with self._lock:
+            flight = self._sync_flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._sync_flights[key] = Future()
+            else:
+                self.cache.coalesced += 1
+        if not leader:
+            outcome["source"] = "coalesced"
+            return flight.result()
+
+        try:
+            result = self._complete(messages, model, max_tokens, temperature)
+            if result.get("choices"):
+                self.cache.set(key, result)
+            flight.set_result(result)
+            return result
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._sync_flights[key]
+
+    def _complete(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        max_tokens: int,
+        temperature: float
+    ) -> Dict:
+        """Send a completion request upstream from synchronous code."""
+        try:
+            response = self._get_session().post(
+                f"{self.base_url}/chat/completions",
+                json=self._payload(messages, model, max_tokens, temperature),
+                timeout=(self.connect_timeout, self.read_timeout)
+            )
+        except requests.Timeout as e:
+            raise OpenRouterError(f"Request timed out: {e.__class__.__name__}")
+        except requests.RequestException as e:
+            raise OpenRouterError(f"Connection error: {e}")
+        return self._parse(response.status_code, response.content, response.json)
+
+    async def aclose(self) -> None:
+        """Close the connection pool of the running event loop."""
+        pool = self._pools.pop(asyncio.get_running_loop(), None)
+        if pool is not None:
+            await pool[0].aclose()
+
+    def close(self) -> None:
+        """Close the session of synchronous callers."""
+        with self._lock:
+            session, self._session = self._session, None
+        if session is not None:
+            session.close()
+
+
+# Process-wide clients, one per API key
+_clients: Dict[str, OpenRouterClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_openrouter_client(api_key: str) -> OpenRouterClient:
+    """
+    Get the shared client for an API key.
+
+    Every chat session creates its own chatbot; sharing the client means
+    they also share one connection pool, concurrency limit and completion cache.
+
+    Args:
+        api_key: OpenRouter API key
+
+    Returns:
+        The process-wide client for that key
+    """
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = _clients[api_key] = OpenRouterClient(api_key, cache=get_completion_cache())
+        return client
+
+
+async def aclose_openrouter_clients() -> None:
+    """Close the connection pools the running event loop opened."""
+    with _clients_lock:
+        clients = list(_clients.values())
+    for client in clients:
+        await client.aclose()
+
+
+def _reset_after_fork() -> None:
+    """Drop clients inherited by a forked child; their connections belong to the parent."""
+    global _clients_lock
+    _clients.clear()
+    _clients_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+CyberGuard AI - Password Hashing
+This module hashes and verifies passwords with PBKDF2 and runs that work
+in a bounded thread pool, so that async request handlers do not block the
+event loop while a password is hashed.
+"""
+
+import os
+import sys
+import hmac
+import asyncio
+import hashlib
+import secrets
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Tuple
+
+# Add parent directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import settings
+from utils.metrics import metrics
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# PBKDF2 iterations (stored hashes depend on it, so it cannot change without rehashing)
+ITERATIONS = 100000
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Raised when too many hashing jobs are already waiting."""
+
+
+def hash_password(password: str, salt: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Hash a password using PBKDF2 with SHA-256.
+
+    Args:
+        password: Plain text password
+        salt: Optional salt, if not provided, a new one will be generated
+
+    Returns:
+        Tuple of (password_hash, salt)
+    """
+    if not salt:
+        salt = secrets.token_hex(16)
+
+    # Use PBKDF2 with 100,000 iterations (good balance of security and performance)
+    key = hashlib.pbkdf2_hmac(
+        'sha256',
+        password.encode('utf-8'),
+        salt.encode('utf-8'),
+        ITERATIONS
+    ).hex()
+
+    return key, salt
+
+
+def verify_password(password: str, salt: str, password_hash: str) -> bool:
+    """
+    Check a password against a stored hash in constant time.
+
+    Args:
+        password: Plain text password
+        salt: Stored salt
+        password_hash: Stored hash
+
+    Returns:
+        Whether the password matches
+    """
+    return hmac.compare_digest(hash_password(password, salt)[0], password_hash)
+
+
+class PasswordHasher:
+    """
+    Bounded pool of threads hashing passwords.
+
+    hashlib releases the GIL while PBKDF2 runs, so threads hash in parallel
+    without the cost of sending passwords to other processes. Jobs beyond
+    ``max_pending`` (running or queued) are refused with PasswordHasherBusy,
+    so that a login storm is shed instead of queueing without bound.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_pending: Optional[int] = None):
+        """
+        Initialize the pool. Threads start with the first job.
+
+        Args:
+            workers: Number of hashing threads (default: from settings)
+            max_pending: Maximum number of running and queued jobs (default: from settings)
+        """
+        self.workers = workers or settings.PASSWORD_HASH_WORKERS
+        self.max_pending = max_pending or settings.PASSWORD_HASH_QUEUE_SIZE
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def submit(self, func, *args) -> Future:
+        """
+        Run a hashing function in the pool.
+
+        Args:
+            func: hash_password or verify_password
+            *args: Its arguments
+
+        Returns:
+            Future resolving to the function's result
+
+        Raises:
+            PasswordHasherBusy: If max_pending jobs are already waiting
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                if metrics.enabled:
+                    metrics.increment("password_hash_rejected_total")
+                raise PasswordHasherBusy("Too many password hashing jobs waiting")
+            self._pending += 1
+        try:
+            future = self._executor.submit(func, *args)
+        except RuntimeError:
+            self._done(None)
+            raise
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future: Optional[Future]) -> None:
+        """Release the slot of a finished job."""
+        with self._lock:
+            self._pending -= 1
+
+    async def hash(self, password: str, salt: Optional[str] = None) -> Tuple[str, str]:
+        """
+        Hash a password without blocking the running event loop.
+
+        Args:
+            password: Plain text password
+            salt: Optional salt, if not provided, a new one will be generated
+
+        Returns:
+            Tuple of (password_hash, salt)
+
+        Raises:
+            PasswordHasherBusy: If the pool is saturated
+        """
+        return await asyncio.wrap_future(self.submit(hash_password, password, salt))
+
+    async def verify(self, password: str, salt: str, password_hash: str) -> bool:
+        """
+        Check a password without blocking the running event loop.
+
+        Args:
+            password: Plain text password
+            salt: Stored salt
+            password_hash: Stored hash
+
+        Returns:
+            Whether the password matches
+
+        Raises:
+            PasswordHasherBusy: If the pool is saturated
+        """
+        return await asyncio.wrap_future(self.submit(verify_password, password, salt, password_hash))
+
+    def pending(self) -> int:
+        """Return the number of running and queued jobs."""
+        return self._pending
+
+    def close(self) -> None:
+        """Wait for running jobs and stop the threads."""
+        self._executor.shutdown(wait=True)
+
+
+# Pool shared by all requests in this process
+_shared_hasher: Optional[PasswordHasher] = None
+_shared_lock = threading.Lock()
+
+
+def get_hasher() -> PasswordHasher:
+    """
+    Get the process-wide password hashing pool.
+
+    Returns:
+        The shared pool
+    """
+    global _shared_hasher
+    with _shared_lock:
+        if _shared_hasher is None:
+            _shared_hasher = PasswordHasher()
+        return _shared_hasher
+
+
+def _reset_after_fork() -> None:
+    """Drop the pool inherited by a forked child; its threads do not exist there."""
+    global _shared_hasher, _shared_lock
+    _shared_hasher = None
+    _shared_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+CyberGuard AI - URL Reputation Cache
+This module provides a two-tier cache for URL reputation verdicts: an
+in-process LRU in front of a SQLite table that survives restarts.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# Add parent directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import settings
+from utils.cache import LRUCache, MISSING
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Number of writes between purges of expired rows from the SQLite tier
+PURGE_INTERVAL = 500
+
+
+class ReputationCache:
+    """
+    Two-tier cache of URL scan results.
+
+    The first tier is an in-process LRU, so repeated URLs cost a dictionary
+    lookup. The second tier is a SQLite table that is shared by worker
+    processes and survives restarts. The lifetime of an entry depends on the
+    verdict: malicious verdicts are kept longest, clean ones shorter, and
+    negative (pending or timed out) and error results only briefly so that
+    they are retried soon.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        max_size: Optional[int] = None,
+        ttl_malicious: Optional[float] = None,
+        ttl_clean: Optional[float] = None,
+        ttl_negative: Optional[float] = None,
+        ttl_error: Optional[float] = None
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            db_path: SQLite file for the persistent tier (default: from settings;
+                an empty string disables the persistent tier)
+            max_size: Maximum number of entries in the in-process tier
+            ttl_malicious: Lifetime in seconds of malicious verdicts
+            ttl_clean: Lifetime in seconds of clean verdicts
+            ttl_negative: Lifetime in seconds of pending/timed out results
+            ttl_error: Lifetime in seconds of error results
+        """
+        self.db_path = settings.REPUTATION_CACHE_PATH if db_path is None else db_path
+        self.ttl_malicious = settings.REPUTATION_TTL_MALICIOUS if ttl_malicious is None else ttl_malicious
+        self.ttl_clean = settings.REPUTATION_TTL_CLEAN if ttl_clean is None else ttl_clean
+        self.ttl_negative = settings.REPUTATION_TTL_NEGATIVE if ttl_negative is None else ttl_negative
+        self.ttl_error = settings.REPUTATION_TTL_ERROR if ttl_error is None else ttl_error
+
+        self.memory = LRUCache(max_size or settings.REPUTATION_CACHE_SIZE)
+        self.disk_hits = 0
+        self.disk_misses = 0
+        self._writes = 0
+
+        self._conn = None
+        self._lock = threading.Lock()
+        if self.db_path:
+            self._init_db()
+
+    def _init_db(self) -> None:
+        """Open the persistent tier and create its table if needed"""
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=5)
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS url_reputation (
+                    url TEXT PRIMARY KEY,
+                    result TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            ''')
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Reputation cache unavailable, using memory only: {e}")
+            self._conn = None
+
+    def ttl_for(self, result: Dict) -> float:
+        """
+        Choose the lifetime of a scan result based on its verdict.
+
+        Args:
+            result: Scan result
+
+        Returns:
+            Lifetime in seconds
+        """
+        if "error" in result:
+            return self.ttl_error
+        if result.get("status") != "complete":
+            return self.ttl_negative
+        if result.get("score", 0) > 0.1:
+            return self.ttl_malicious
+        return self.ttl_clean
+
+    def get(self, url: str) -> Optional[Dict]:
+        """
+        Look up a cached scan result.
+
+        Args:
+            url: Scanned URL
+
+        Returns:
+            The cached result, or None on a miss
+        """
+        url = url.strip()
+        result = self.memory.get(url)
+        if result is not MISSING:
+            return dict(result)
+        if self._conn is None:
+            return None
+
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT result, expires_at FROM url_reputation WHERE url = ?", (url,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Reputation cache read error: {e}")
+            return None
+
+        remaining = row[1] - time.time() if row else 0
+        if remaining <= 0:
+            self.disk_misses += 1
+            return None
+
+        self.disk_hits += 1
+        result = json.loads(row[0])
+        self.memory.set(url, result, ttl=remaining)
+        return dict(result)
+
+    def set(self, url: str, result: Dict) -> None:
+        """
+        Store a scan result in both tiers.
+
+        Args:
+            url: Scanned URL
+            result: Scan result
+        """
+        url = url.strip()
+        ttl = self.ttl_for(result)
+        if ttl <= 0:
+            return
+        self.memory.set(url, dict(result), ttl=ttl)
+        if self._conn is None:
+            return
+
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO url_reputation (url, result, expires_at) VALUES (?, ?, ?)",
+                    (url, json.dumps(result), time.time() + ttl)
+                )
+                self._writes += 1
+                if self._writes % PURGE_INTERVAL == 0:
+                    self._conn.execute("DELETE FROM url_reputation WHERE expires_at < ?", (time.time(),))
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Reputation cache write error: {e}")
+
+    def clear(self) -> None:
+        """Remove all cached results from both tiers."""
+        self.memory.clear()
+        if self._conn is None:
+            return
+        with self._lock:
+            self._conn.execute("DELETE FROM url_reputation")
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        """
+        Get cache counters.
+
+        Returns:
+            Dictionary with in-memory tier counters and persistent tier hits/misses
+        """
+        return {
+            "memory": self.memory.stats(),
+            "disk": {
+                "enabled": self._conn is not None,
+                "hits": self.disk_hits,
+                "misses": self.disk_misses
+            }
+        }
+
+    def counters(self) -> List[Tuple[str, Dict[str, str], float]]:
+        """Export lookup outcomes as metric counters."""
+        memory = self.memory.stats()
+        return [
+            ("reputation_cache_lookups_total", {"result": "memory_hit"}, memory["hits"]),
+            ("reputation_cache_lookups_total", {"result": "disk_hit"}, self.disk_hits),
+            # Lookups that missed memory either hit the disk tier or went to VirusTotal
+            ("reputation_cache_lookups_total", {"result": "miss"}, memory["misses"] - self.disk_hits),
+            ("reputation_cache_evictions_total", {}, memory["evictions"]),
+        ]
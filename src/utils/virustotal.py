@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+CyberGuard AI - VirusTotal Client
+This module provides an asyncio-based, connection-pooled client for the
+VirusTotal URL reputation API.
+"""
+
+import os
+import sys
+import time
+import base64
+import asyncio
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+# Add parent directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import settings
+from utils.reputation_cache import ReputationCache
+from utils.metrics import metrics
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def url_identifier(url: str) -> str:
+    """
+    Build the VirusTotal identifier of a URL (unpadded URL-safe base64).
+
+    Args:
+        url: URL to identify
+
+    Returns:
+        Identifier used in /urls/{id} lookups
+    """
+    return base64.urlsafe_b64encode(url.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def parse_stats(url: str, payload: Dict) -> Dict:
+    """
+    Turn a VirusTotal URL or analysis object into a scan result.
+
+    Args:
+        url: The scanned URL
+        payload: Decoded JSON response
+
+    Returns:
+        Dictionary with scan results
+    """
+    attributes = payload.get("data", {}).get("attributes", {})
+    # URL objects carry last_analysis_stats, analysis objects carry stats
+    stats = attributes.get("last_analysis_stats") or attributes.get("stats") or {}
+    malicious = stats.get("malicious", 0)
+    suspicious = stats.get("suspicious", 0)
+    total = sum(stats.values())
+
+    return {
+        "status": "complete",
+        "malicious": malicious,
+        "suspicious": suspicious,
+        "total": total,
+        "score": (malicious + suspicious) / total if total > 0 else 0,
+        "url": url
+    }
+
+
+class VirusTotalClient:
+    """
+    Asynchronous VirusTotal client with a pooled, keep-alive HTTP session.
+
+    All network I/O runs on a private event loop in a daemon thread, so the
+    same connection pool serves synchronous callers on any thread. URLs are
+    looked up concurrently, pending analyses are polled with ``asyncio.sleep``
+    rather than blocking a worker, and every batch has an overall deadline
+    after which the results gathered so far are returned.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: Optional[str] = None,
+        max_connections: Optional[int] = None,
+        timeout: Optional[float] = None,
+        poll_interval: Optional[float] = None,
+        max_polls: Optional[int] = None,
+        cache: Optional[ReputationCache] = None
+    ):
+        """
+        Initialize the client. No connection is opened until the first lookup.
+
+        Args:
+            api_key: VirusTotal API key
+            base_url: API base URL (default: from settings, e.g. a local fake server)
+            max_connections: Size of the HTTP connection pool
+            timeout: Per-request timeout in seconds
+            poll_interval: Seconds between polls of a queued analysis
+            max_polls: Maximum number of polls before giving up on an analysis
+            cache: Reputation cache consulted before any request (optional)
+        """
+        self.api_key = api_key
+        self.base_url = (base_url or settings.VIRUSTOTAL_API_URL).rstrip("/")
+        self.max_connections = max_connections or settings.VIRUSTOTAL_MAX_CONNECTIONS
+        self.timeout = timeout or settings.VIRUSTOTAL_TIMEOUT
+        self.poll_interval = settings.VIRUSTOTAL_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.max_polls = settings.VIRUSTOTAL_MAX_POLLS if max_polls is None else max_polls
+        self.cache = cache
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Start the client's event loop thread on first use."""
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="virustotal-client", daemon=True)
+                thread.start()
+                self._loop, self._thread = loop, thread
+        return self._loop
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the pooled HTTP client (must be called on the client's loop)."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"x-apikey": self.api_key, "Accept": "application/json"},
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                )
+            )
+        return self._client
+
+    async def _lookup(self, url: str) -> Dict:
+        """
+        Look up a single URL, submitting it for analysis if it is unknown.
+
+        Args:
+            url: URL to scan
+
+        Returns:
+            Dictionary with scan results
+        """
+        # Strip any leading/trailing whitespace
+        url = url.strip()
+
+        # Check if URL is properly formatted
+        parsed_url = urlparse(url)
+        if not all([parsed_url.scheme, parsed_url.netloc]):
+            return {"error": "Invalid URL format"}
+
+        client = self._get_client()
+        try:
+            # First, check if URL has been analyzed before
+            response = await client.get(f"/urls/{url_identifier(url)}")
+            if response.status_code == 200:
+                return parse_stats(url, response.json())
+            if response.status_code != 404:
+                logger.error(f"VirusTotal API error: {response.status_code}")
+                return {"error": f"API error: {response.status_code}"}
+
+            # If not found, submit for analysis
+            logger.info(f"URL {url} not found in VirusTotal, submitting for analysis")
+            response = await client.post("/urls", data={"url": url})
+            if response.status_code != 200:
+                logger.error(f"Error submitting URL to VirusTotal: {response.status_code}")
+                return {"error": f"API error: {response.status_code}"}
+            analysis_id = response.json().get("data", {}).get("id")
+
+            # Poll the analysis without blocking the event loop
+            for _ in range(self.max_polls):
+                await asyncio.sleep(self.poll_interval)
+                response = await client.get(f"/analyses/{analysis_id}")
+                if response.status_code == 200:
+                    payload = response.json()
+                    if payload.get("data", {}).get("attributes", {}).get("status") == "completed":
+                        return parse_stats(url, payload)
+
+            logger.warning(f"Analysis for {url} timed out")
+            return {"status": "timeout", "message": "Analysis taking too long", "url": url}
+
+        except httpx.HTTPError as e:
+            logger.error(f"Error in VirusTotal scan: {e}")
+            return {"error": str(e)}
+        except ValueError as e:
+            logger.error(f"Error processing VirusTotal results: {e}")
+            return {"error": f"Error processing results: {str(e)}"}
+
+    async def _timed_lookup(self, url: str) -> Dict:
+        """Look up a single URL and record its latency by outcome."""
+        began = time.perf_counter()
+        result = await self._lookup(url)
+        outcome = "error" if "error" in result else result.get("status", "unknown")
+        metrics.observe("virustotal_lookup_seconds", time.perf_counter() - began, {"outcome": outcome})
+        return result
+
+    async def _lookup_many(self, urls: List[str], deadline: Optional[float]) -> List[Dict]:
+        """
+        Look up URLs concurrently, returning partial results at the deadline.
+
+        Args:
+            urls: URLs to scan
+            deadline: Overall time budget in seconds (None waits for all)
+
+        Returns:
+            One result per URL, in order. URLs still pending at the deadline
+            get a "timeout" status.
+        """
+        if not urls:
+            return []
+        lookup = self._timed_lookup if metrics.enabled else self._lookup
+        tasks = [asyncio.ensure_future(lookup(url)) for url in urls]
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning(f"VirusTotal deadline of {deadline}s reached with {len(pending)} lookups pending")
+            if metrics.enabled:
+                metrics.increment("virustotal_lookups_cut_total", len(pending))
+
+        results = []
+        for url, task in zip(urls, tasks):
+            if task in done and not task.cancelled() and task.exception() is None:
+                results.append(task.result())
+                # Lookups cut short by the deadline are not cached
+                if self.cache is not None:
+                    self.cache.set(url, task.result())
+            elif task in done:
+                results.append({"error": str(task.exception())})
+            else:
+                results.append({"status": "timeout", "message": "Deadline exceeded", "url": url})
+        return results
+
+    def _split_cached(self, urls: Iterable[str]):
+        """Serve what the cache can and return the URLs that still need a lookup."""
+        urls = list(urls)
+        results: List[Optional[Dict]] = [None] * len(urls)
+        missing = []
+        for index, url in enumerate(urls):
+            cached = self.cache.get(url) if self.cache is not None else None
+            if cached is None:
+                missing.append(index)
+            else:
+                results[index] = cached
+        return urls, results, missing
+
+    def cached_results(self, urls: Iterable[str]) -> List[Optional[Dict]]:
+        """
+        Look up URLs in the reputation cache only.
+
+        Args:
+            urls: URLs to look up
+
+        Returns:
+            The cached result of each URL, in order (None where not cached)
+        """
+        return self._split_cached(urls)[1]
+
+    def _submit(self, urls: List[str], deadline: Optional[float]):
+        """Schedule a batch of lookups on the client's loop."""
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self._lookup_many(urls, deadline), loop)
+
+    def scan_urls(self, urls: Iterable[str], deadline: Optional[float] = None) -> List[Dict]:
+        """
+        Scan URLs concurrently from synchronous code.
+
+        Cached verdicts are returned without touching the network.
+
+        Args:
+            urls: URLs to scan
+            deadline: Overall time budget in seconds
+
+        Returns:
+            One result per URL, in order
+        """
+        urls, results, missing = self._split_cached(urls)
+        if missing:
+            fetched = self._submit([urls[index] for index in missing], deadline).result()
+            for index, result in zip(missing, fetched):
+                results[index] = result
+        return results
+
+    def scan_url(self, url: str) -> Dict:
+        """
+        Scan a single URL from synchronous code.
+
+        Args:
+            url: URL to scan
+
+        Returns:
+            Dictionary with scan results
+        """
+        return self.scan_urls([url])[0]
+
+    def close(self) -> None:
+        """Close the connection pool and stop the event loop thread."""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        if self._client is not None:
+            asyncio.run_coroutine_threadsafe(self._client.aclose(), loop).result()
+            self._client = None
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join()
+        loop.close()
+
+
+# Process-wide clients, one per API key, sharing one reputation cache
+_clients: Dict[str, VirusTotalClient] = {}
+_clients_lock = threading.Lock()
+_shared_cache: Optional[ReputationCache] = None
+
+
+def get_client(api_key: str) -> VirusTotalClient:
+    """
+    Get the shared client for an API key.
+
+    Chat sessions each create their own ThreatDetector; sharing the client
+    means they also share one connection pool, event loop thread and
+    reputation cache.
+
+    Args:
+        api_key: VirusTotal API key
+
+    Returns:
+        The process-wide client for that key
+    """
+    global _shared_cache
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            if _shared_cache is None:
+                _shared_cache = ReputationCache()
+                # Hit rates are exported on demand
+                metrics.add_collector(_shared_cache.counters)
+            client = VirusTotalClient(api_key, cache=_shared_cache)
+            _clients[api_key] = client
+        return client
+
+
+def _reset_after_fork() -> None:
+    """Drop clients inherited by a forked child; their loop thread does not exist there."""
+    global _clients_lock, _shared_cache
+    _clients.clear()
+    _clients_lock = threading.Lock()
+    _shared_cache = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)